@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import importlib.util
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Tuple
+
+import httpx
+import requests
+
+from deezer_client import (
+    SEARCH_TYPES, ApiRequest, Background, Blocking, DeezerClient, HttpGet, Sleep, Step, Steps, request_key,
+)
+from models import Record, SearchResults, parse_items
+
+# HTTP/2 needs the optional 'h2' package (pip install httpx[http2])
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+# Connections kept to api.deezer.com. With HTTP/2 all requests are
+# multiplexed over one of them.
+DEFAULT_MAX_CONNECTIONS = len(SEARCH_TYPES)
+
+
+def _as_request_error(error: httpx.HTTPError) -> requests.exceptions.RequestException:
+    """Translates an httpx error into the requests exception DeezerClient's request steps handle."""
+    if isinstance(error, httpx.TimeoutException):
+        return requests.exceptions.Timeout(str(error))
+    if isinstance(error, httpx.TransportError):
+        return requests.exceptions.ConnectionError(str(error))
+    return requests.exceptions.RequestException(str(error))
+
+
+class AsyncDeezerClient:
+    """An asyncio client to interact with the Deezer API, built on httpx.
+
+    Offers the search surface of DeezerClient as coroutines, by running the
+    request steps of a DeezerClient (see DeezerClient.request_steps) on the
+    event loop, so caching, stale-while-revalidate, conditional requests, rate
+    limiting, retries, the circuit breaker and the entity index behave exactly
+    as in the synchronous client, and are shared with it.
+
+    Concurrent searches (search_many, prefetch, background refreshes) share
+    one httpx connection pool and, when the 'h2' package is installed, a single
+    multiplexed HTTP/2 connection, without a thread per request. Blocking
+    SQLite and lock-file calls run in worker threads (asyncio.to_thread).
+    """
+
+    def __init__(self, client: Optional[DeezerClient] = None, http2: bool = True,
+                 max_connections: int = DEFAULT_MAX_CONNECTIONS,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        """Initialize the client.
+
+        Args:
+            client: The DeezerClient whose settings, cache, rate limiter, circuit
+                breaker, entity index and metrics are used; a default one is
+                created if omitted.
+            http2: Use HTTP/2 if the 'h2' package is installed.
+            max_connections: Size of the connection pool.
+            transport: Optional httpx transport, e.g. httpx.MockTransport in tests.
+        """
+        self.client = client if client is not None else DeezerClient()
+        # Single-flight bookkeeping: identical requests in flight share one HTTP call
+        self._inflight: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], asyncio.Future] = {}
+        self.coalesced = 0  # Requests answered by another caller's in-flight request
+        self._background: Set[asyncio.Task] = set()
+        headers = {"Authorization": f"Bearer {self.client.access_token}"} if self.client.access_token else None
+        connect_timeout, read_timeout = self.client.timeout
+        self.http = httpx.AsyncClient(
+            headers=headers,
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            http2=http2 and HTTP2_AVAILABLE,
+            transport=transport,
+        )
+
+    async def __aenter__(self) -> "AsyncDeezerClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Cancels pending background searches and closes the connection pool."""
+        for task in list(self._background):
+            task.cancel()
+        await asyncio.gather(*self._background, return_exceptions=True)
+        await self.http.aclose()
+
+    async def _run(self, steps: Steps) -> Any:
+        """Runs request steps on the event loop and returns their result."""
+        value, error = None, None
+        while True:
+            try:
+                step = steps.throw(error) if error is not None else steps.send(value)
+            except StopIteration as done:
+                return done.value
+            value, error = None, None
+            try:
+                value = await self._perform(step)
+            except Exception as e:
+                error = e
+
+    async def _perform(self, step: Step) -> Any:
+        """Does the I/O of one request step without blocking the event loop."""
+        if isinstance(step, Blocking):
+            return await asyncio.to_thread(step.call)
+        if isinstance(step, Sleep):
+            await asyncio.sleep(step.seconds)
+            return None
+        if isinstance(step, HttpGet):
+            try:
+                with self.client.metrics.stage("http"):
+                    response = await self.http.get(step.url, params=step.params, headers=step.headers or None)
+            except httpx.HTTPError as e:
+                raise _as_request_error(e) from e
+            if response.status_code >= 400:
+                raise requests.exceptions.HTTPError(
+                    f"{response.status_code} Error for url: {response.url}", response=response
+                )
+            return response
+        if isinstance(step, ApiRequest):
+            return await self._make_request(step.endpoint, step.params)
+        task = asyncio.ensure_future(self._run(step.steps))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return None
+
+    async def _make_request(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Makes a GET request to the Deezer API, sharing identical requests already in flight.
+
+        Args:
+            endpoint: The API endpoint path (e.g., '/search/album').
+            params: Optional dictionary of query parameters.
+
+        Returns:
+            The JSON response from the API as a dictionary.
+
+        Raises:
+            requests.exceptions.RequestException: If the request fails.
+            ValueError: If the API returns an error.
+        """
+        key = request_key(endpoint, params)
+        call = self._inflight.get(key)
+        if call is not None:
+            self.coalesced += 1
+            return await asyncio.shield(call)  # Re-raises the leader's exception
+
+        call = self._inflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            data = await self._run(self.client.request_steps(endpoint, params))
+        except asyncio.CancelledError:
+            call.cancel()
+            raise
+        except BaseException as e:
+            call.set_exception(e)
+            call.exception()  # Mark as retrieved when no other caller was waiting
+            raise
+        else:
+            call.set_result(data)
+            return data
+        finally:
+            del self._inflight[key]
+
+    async def search(self, query: str, search_type: str = "track", limit: Optional[int] = None) -> SearchResults:
+        """Performs a search on Deezer for a specific type.
+
+        Args:
+            query: The search term.
+            search_type: Type of search (track, album, artist, playlist).
+            limit: Optional number of items to request.
+
+        Returns:
+            Search result records (see models), flagged stale when they came
+            from an expired cache entry.
+        """
+        page, stale = await self._run(self.client.page_steps(query, search_type, limit=limit))
+        return SearchResults(parse_items(page.get("data", []), search_type), stale=stale)
+
+    async def search_many(self, query: str, search_types: Iterable[str],
+                          cancelled: Optional[Callable[[], bool]] = None,
+                          limit: Optional[int] = None) -> Dict[str, SearchResults]:
+        """Runs several typed searches concurrently on the shared connection.
+
+        Args:
+            query: The search term.
+            search_types: Types to search (track, album, artist, playlist).
+            cancelled: Optional callback; searches are skipped (and return no
+                items) once it returns True.
+            limit: Optional number of items to request per type.
+
+        Returns:
+            A dictionary mapping each requested type to its result records.
+        """
+        async def run(search_type: str) -> SearchResults:
+            if cancelled is not None and cancelled():
+                return SearchResults()
+            return await self.search(query, search_type=search_type, limit=limit)
+
+        search_types = list(dict.fromkeys(search_types))  # Drop duplicates, keep order
+        results = await asyncio.gather(*(run(search_type) for search_type in search_types))
+        return dict(zip(search_types, results))
+
+    def prefetch(self, query: str, search_types: Iterable[str], limit: Optional[int] = None) -> None:
+        """Refreshes searches in the background so their responses land in the cache.
+
+        Must be called from a running event loop. Pending searches are
+        cancelled by aclose().
+        """
+        for search_type in dict.fromkeys(search_types):
+            task = asyncio.ensure_future(self.search(query, search_type=search_type, limit=limit))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+
+    async def search_albums(self, query: str) -> SearchResults:
+        """Searches specifically for albums using the /search/album endpoint."""
+        return await self.search(query, search_type="album")
+
+    async def search_artists(self, query: str) -> SearchResults:
+        """Searches specifically for artists using the /search/artist endpoint."""
+        return await self.search(query, search_type="artist")
+
+    async def search_playlists(self, query: str) -> SearchResults:
+        """Searches specifically for playlists using the /search/playlist endpoint."""
+        return await self.search(query, search_type="playlist")
+
+    def get_item_url(self, item: Record) -> Optional[str]:
+        """Returns the web URL of a track, album, artist, or playlist record."""
+        return self.client.get_item_url(item)
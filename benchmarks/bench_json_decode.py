@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks the JSON decoders on /search/track response payloads.
+
+Usage:
+    python benchmarks/bench_json_decode.py [payload.json ...]
+
+Pass response bodies recorded from https://api.deezer.com/search/track to
+benchmark on real data. Without arguments, a payload with the shape and size
+of a default 25-item /search/track page is generated.
+"""
+import json
+import os
+import sys
+import timeit
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json_decoder  # noqa: E402
+from models import parse_items  # noqa: E402
+
+ITERATIONS = 2000
+
+
+def make_track_payload(count: int = 25) -> bytes:
+    """Builds a response body shaped like Deezer's /search/track page."""
+    tracks: List[Dict[str, Any]] = []
+    for index in range(count):
+        artist_id, album_id, track_id = 119 + index, 7000 + index, 3135556 + index
+        tracks.append({
+            "id": track_id,
+            "readable": True,
+            "title": f"Master of Puppets (Remastered {index})",
+            "title_short": "Master of Puppets",
+            "title_version": f"(Remastered {index})",
+            "link": f"https://www.deezer.com/track/{track_id}",
+            "duration": 515,
+            "rank": 912345 - index,
+            "explicit_lyrics": False,
+            "explicit_content_lyrics": 0,
+            "explicit_content_cover": 0,
+            "preview": f"https://cdns-preview-d.dzcdn.net/stream/c-{track_id:032x}-8.mp3",
+            "md5_image": f"{album_id:032x}",
+            "artist": {
+                "id": artist_id,
+                "name": "Metallica",
+                "link": f"https://www.deezer.com/artist/{artist_id}",
+                "picture": f"https://api.deezer.com/artist/{artist_id}/image",
+                "picture_small": f"https://e-cdns-images.dzcdn.net/images/artist/{artist_id:032x}/56x56-000000-80-0-0.jpg",
+                "picture_medium": f"https://e-cdns-images.dzcdn.net/images/artist/{artist_id:032x}/250x250-000000-80-0-0.jpg",
+                "picture_big": f"https://e-cdns-images.dzcdn.net/images/artist/{artist_id:032x}/500x500-000000-80-0-0.jpg",
+                "picture_xl": f"https://e-cdns-images.dzcdn.net/images/artist/{artist_id:032x}/1000x1000-000000-80-0-0.jpg",
+                "tracklist": f"https://api.deezer.com/artist/{artist_id}/top?limit=50",
+                "type": "artist",
+            },
+            "album": {
+                "id": album_id,
+                "title": "Master of Puppets (Remastered)",
+                "cover": f"https://api.deezer.com/album/{album_id}/image",
+                "cover_small": f"https://e-cdns-images.dzcdn.net/images/cover/{album_id:032x}/56x56-000000-80-0-0.jpg",
+                "cover_medium": f"https://e-cdns-images.dzcdn.net/images/cover/{album_id:032x}/250x250-000000-80-0-0.jpg",
+                "cover_big": f"https://e-cdns-images.dzcdn.net/images/cover/{album_id:032x}/500x500-000000-80-0-0.jpg",
+                "cover_xl": f"https://e-cdns-images.dzcdn.net/images/cover/{album_id:032x}/1000x1000-000000-80-0-0.jpg",
+                "md5_image": f"{album_id:032x}",
+                "tracklist": f"https://api.deezer.com/album/{album_id}/tracks",
+                "type": "album",
+            },
+            "type": "track",
+        })
+    response = {"data": tracks, "total": 1843, "next": "https://api.deezer.com/search/track?q=master&index=25"}
+    return json.dumps(response).encode("utf-8")
+
+
+def load_payloads(paths: List[str]) -> List[bytes]:
+    """Reads recorded response bodies, or generates one if no paths are given."""
+    if not paths:
+        return [make_track_payload()]
+    payloads = []
+    for path in paths:
+        with open(path, "rb") as payload_file:
+            payloads.append(payload_file.read())
+    return payloads
+
+
+def main(paths: List[str]) -> None:
+    """Prints the decode time per response for each installed decoder."""
+    payloads = load_payloads(paths)
+    size = sum(len(payload) for payload in payloads)
+    print(f"{len(payloads)} payload(s), {size / 1024:.1f} KiB, {ITERATIONS} iterations")
+    baseline = None
+    for name in json_decoder.PREFERRED_DECODERS[::-1]:  # stdlib first, as the baseline
+        try:
+            _, decode = json_decoder.get_decoder(name)
+        except ImportError:
+            print(f"  {name:8s} not installed")
+            continue
+
+        def run() -> None:
+            for payload in payloads:
+                decode(payload)
+
+        per_call = min(timeit.repeat(run, number=ITERATIONS, repeat=5)) / ITERATIONS / len(payloads)
+        baseline = baseline or per_call
+        print(f"  {name:8s} {per_call * 1e6:8.1f} us/response  ({baseline / per_call:.2f}x vs json)")
+
+    decoded = [json_decoder.loads(payload).get("data", []) for payload in payloads]
+    per_call = min(timeit.repeat(
+        lambda: [parse_items(items, "track") for items in decoded], number=ITERATIONS, repeat=5,
+    )) / ITERATIONS / len(payloads)
+    print(f"  records  {per_call * 1e6:8.1f} us/response  (models.parse_items, after decoding)")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks DeezerControl.query end to end against a local fake Deezer API.
+
+Usage:
+    python benchmarks/bench_query.py [--latency S] [--jitter S] [--error-rate F]
+                                     [--payloads DIR] [--queries FILE] [--modes serial,concurrent,cached]
+
+Every query of the corpus is typed one keystroke at a time ("m", "me", "met",
+...) and each keystroke is answered by DeezerControl.query, as Flow Launcher
+would, with debouncing disabled. The API is a FakeDeezerApi on 127.0.0.1, so
+runs are reproducible and need no network. Modes:
+
+    serial      one search type at a time, no caches
+    concurrent  search types requested concurrently, no caches
+    cached      concurrent, with the search cache and the local entity index;
+                the corpus is typed twice to show the cold and the warm cache
+
+Reports per-keystroke latency percentiles, keystrokes per second and the
+number of API requests sent.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, Iterator, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import main  # noqa: E402
+from debounce import QueryDebouncer  # noqa: E402
+from deezer_client import DeezerClient, SEARCH_TYPES  # noqa: E402
+from entity_index import EntityIndex  # noqa: E402
+from fake_deezer_api import FakeDeezerApi  # noqa: E402
+from metrics import Histogram, PERCENTILES  # noqa: E402
+from rate_limiter import TokenBucket  # noqa: E402
+from search_cache import SearchCache  # noqa: E402
+
+MODES = ("serial", "concurrent", "cached")
+DEFAULT_QUERIES = ["metallica", "daft punk", "master of puppets", "bohemian rhapsody", "miles davis"]
+# The fake API is not rate limited, neither is the benchmark
+UNLIMITED_RATE = 10 ** 9
+
+
+def keystrokes(queries: List[str]) -> Iterator[str]:
+    """Yields what the query box holds after each keystroke of each query."""
+    for query in queries:
+        for length in range(1, len(query) + 1):
+            yield query[:length]
+
+
+def make_plugin(api_base: str, mode: str, cache_dir: str) -> main.DeezerControl:
+    """Creates a plugin instance talking to the API at api_base in the given mode."""
+    plugin = main.DeezerControl(dispatch=False, cache_dir=cache_dir)
+    plugin.debouncer = QueryDebouncer(0)
+    cached = mode == "cached"
+    plugin.deezer = DeezerClient(
+        max_workers=1 if mode == "serial" else len(SEARCH_TYPES),
+        cache=SearchCache(os.path.join(cache_dir, "search_cache.sqlite3")) if cached else None,
+        entity_index=EntityIndex(os.path.join(cache_dir, "entities.sqlite3")) if cached else None,
+        rate_limiter=TokenBucket(rate=UNLIMITED_RATE),
+        api_base=api_base,
+    )
+    return plugin
+
+
+def run_mode(api: FakeDeezerApi, mode: str, queries: List[str]) -> List[Dict[str, float]]:
+    """Types the corpus in one mode and returns one row of measurements per pass."""
+    rows = []
+    with tempfile.TemporaryDirectory() as cache_dir:
+        plugin = make_plugin(api.base_url, mode, cache_dir)
+        for label in ([f"{mode} cold", f"{mode} warm"] if mode == "cached" else [mode]):
+            histogram = Histogram()
+            requests_before = api.total_requests
+            started = time.perf_counter()
+            count = 0
+            for text in keystrokes(queries):
+                keystroke_started = time.perf_counter()
+                plugin.query(text)
+                histogram.record(time.perf_counter() - keystroke_started)
+                count += 1
+            elapsed = time.perf_counter() - started
+            row: Dict[str, float] = {"mode": label, "keystrokes": count, "per_second": count / elapsed,
+                                     "requests": api.total_requests - requests_before}
+            row.update({f"p{percent}": histogram.percentile(percent) for percent in PERCENTILES})
+            rows.append(row)
+        plugin.deezer.shutdown(wait=True)  # Let background refreshes finish before the next mode
+        if plugin.deezer.cache is not None:
+            plugin.deezer.cache.close()
+        if plugin.deezer.entity_index is not None:
+            plugin.deezer.entity_index.close()
+    return rows
+
+
+def load_queries(path: Optional[str]) -> List[str]:
+    """Reads one query per line, or returns the default corpus."""
+    if not path:
+        return DEFAULT_QUERIES
+    with open(path, "r", encoding="utf-8") as queries_file:
+        return [line.strip() for line in queries_file if line.strip()]
+
+
+def main_benchmark(argv: List[str]) -> None:
+    """Prints one line of measurements per mode (and pass)."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--latency", type=float, default=0.05, help="mean API latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.02, help="latency varies by up to this much")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of searches failing with 503")
+    parser.add_argument("--payloads", help="directory of recorded {type}.json responses")
+    parser.add_argument("--queries", help="file with one query per line")
+    parser.add_argument("--modes", default=",".join(MODES), help="comma-separated modes to run")
+    args = parser.parse_args(argv)
+
+    queries = load_queries(args.queries)
+    print(f"{len(queries)} queries, latency {args.latency * 1000:.0f}±{args.jitter * 1000:.0f} ms, "
+          f"error rate {args.error_rate:.0%}")
+    print(f"  {'mode':16s} {'keys':>5s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s} {'keys/s':>8s} {'requests':>9s}")
+    with FakeDeezerApi(args.latency, args.jitter, args.error_rate, payload_dir=args.payloads) as api:
+        for mode in args.modes.split(","):
+            for row in run_mode(api, mode.strip(), queries):
+                print(f"  {row['mode']:16s} {row['keystrokes']:5d} {row['p50'] * 1000:8.1f} {row['p95'] * 1000:8.1f} "
+                      f"{row['p99'] * 1000:8.1f} {row['per_second']:8.1f} {row['requests']:9d}")
+
+
+if __name__ == "__main__":
+    main_benchmark(sys.argv[1:])
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""A local stand-in for api.deezer.com, for offline benchmarks and tests.
+
+FakeDeezerApi serves /search and /search/{type} pages over plain HTTP on
+127.0.0.1, with configurable latency, jitter and error rate, and counts the
+requests it receives. Responses come from recorded payloads when a payload
+directory is given (one '{type}.json' file per search type, e.g. response
+bodies saved from https://api.deezer.com/search/track), otherwise pages with
+Deezer's response shape are generated from the query, so that every query
+finds items to rank.
+"""
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+FAKE_API_HOST = "127.0.0.1"
+# Items per generated page, Deezer's default page size
+GENERATED_PAGE_SIZE = 25
+SEARCH_TYPES = ("track", "album", "artist", "playlist")
+
+
+def generate_items(query: str, search_type: str, count: int = GENERATED_PAGE_SIZE) -> List[Dict[str, Any]]:
+    """Builds search results shaped like Deezer's, with titles derived from the query."""
+    name = query.title() or "Untitled"
+    seed = sum(map(ord, query))
+    items = []
+    for index in range(count):
+        item_id = seed * 100 + index
+        artist = {"id": item_id + 1, "name": f"{name} Band {index}", "link": f"https://www.deezer.com/artist/{item_id + 1}",
+                  "type": "artist"}
+        album = {"id": item_id + 2, "title": f"{name} Album {index}", "type": "album"}
+        if search_type == "artist":
+            item = dict(artist, id=item_id, name=f"{name} {index}" if index else name,
+                        link=f"https://www.deezer.com/artist/{item_id}")
+        elif search_type == "album":
+            item = dict(album, id=item_id, title=f"{name} {index}" if index else name, artist=artist,
+                        link=f"https://www.deezer.com/album/{item_id}")
+        elif search_type == "playlist":
+            item = {"id": item_id, "title": f"{name} Mix {index}", "link": f"https://www.deezer.com/playlist/{item_id}",
+                    "user": {"id": 1, "name": "Deezer Editor"}, "type": "playlist"}
+        else:
+            item = {"id": item_id, "title": f"{name} {index}" if index else name,
+                    "link": f"https://www.deezer.com/track/{item_id}", "duration": 200 + index, "artist": artist,
+                    "album": album, "type": "track"}
+        items.append(item)
+    return items
+
+
+def load_payloads(directory: Optional[str]) -> Dict[str, bytes]:
+    """Reads recorded '{type}.json' response bodies from a directory."""
+    payloads = {}
+    if not directory:
+        return payloads
+    for search_type in SEARCH_TYPES:
+        path = os.path.join(directory, f"{search_type}.json")
+        if os.path.exists(path):
+            with open(path, "rb") as payload_file:
+                payloads[search_type] = payload_file.read()
+    return payloads
+
+
+class FakeDeezerApi:
+    """Serves fake Deezer search responses from a background thread.
+
+    Use as a context manager; base_url is the value for DeezerClient's
+    api_base. Request counts are kept per path in `requests`.
+    """
+
+    def __init__(self, latency: float = 0.05, jitter: float = 0.0, error_rate: float = 0.0,
+                 payload_dir: Optional[str] = None, seed: int = 0):
+        """Initialize the server.
+
+        Args:
+            latency: Mean delay before each response, in seconds.
+            jitter: Delay varies uniformly by up to this much either way, in seconds.
+            error_rate: Fraction of search requests answered with a 503 error.
+            payload_dir: Directory of recorded payloads, generated pages are served if omitted.
+            seed: Seed for jitter and errors, so runs are reproducible.
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.payloads = load_payloads(payload_dir)
+        self.requests: Counter = Counter()
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((FAKE_API_HOST, 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """The server's URL."""
+        return f"http://{FAKE_API_HOST}:{self._server.server_address[1]}"
+
+    @property
+    def total_requests(self) -> int:
+        """Number of requests received so far."""
+        with self._lock:
+            return sum(self.requests.values())
+
+    def start(self) -> "FakeDeezerApi":
+        """Starts serving in a background thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-deezer-api", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stops the server."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeDeezerApi":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def respond(self, path: str, query_string: str):
+        """Returns (status, body) for a request, after the simulated delay."""
+        with self._lock:
+            self.requests[path] += 1
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            failed = path.startswith("/search") and self._random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        time.sleep(delay)
+        if failed:
+            return 503, b'{"error": {"type": "Exception", "message": "Service unavailable", "code": 700}}'
+        if not path.startswith("/search"):
+            return 200, b"{}"
+        search_type = path.rsplit("/", 1)[-1] if path.startswith("/search/") else "track"
+        if search_type in self.payloads:
+            return 200, self.payloads[search_type]
+        params = parse_qs(query_string)
+        limit = int(params.get("limit", [GENERATED_PAGE_SIZE])[0])
+        data = generate_items(params.get("q", [""])[0], search_type, limit)
+        return 200, json.dumps({"data": data, "total": len(data)}).encode("utf-8")
+
+    def _handler_class(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive, like the real API
+            disable_nagle_algorithm = True  # Headers and body go out separately
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                status, body = api.respond(url.path, url.query)
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_HEAD(self):
+                with api._lock:
+                    api.requests[urlparse(self.path).path] += 1
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass  # Keep benchmark output readable
+
+        return Handler
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""Replays recorded queries through DeezerControl.query, without network access.
+
+Usage:
+    python benchmarks/replay_queries.py CASSETTE [--queries FILE] [--output FILE] [--expected FILE]
+
+Record a cassette by using the plugin with the DEEZER_FLOW_CASSETTE
+environment variable set to a file path: every /search response is saved
+there (see cassette.py). Each recorded search term, or each line of the
+--queries file, is then answered by DeezerControl.query from the cassette.
+Reports queries per second and requests missing from the cassette.
+
+--output saves the result titles of every query as JSON; --expected compares
+them with an earlier output and lists the queries whose ranking changed
+(the exit status is 1 if any did).
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import cassette  # noqa: E402
+from bench_query import load_queries, make_plugin  # noqa: E402
+from deezer_client import DEEZER_API_BASE  # noqa: E402
+
+# Changed queries listed by --expected
+MAX_LISTED_CHANGES = 20
+
+
+def replay(store: cassette.CassetteStore, queries: List[str]) -> Dict[str, List[str]]:
+    """Answers every query from the cassette and prints throughput; returns the result titles per query."""
+    titles = {}
+    with tempfile.TemporaryDirectory() as cache_dir:
+        plugin = make_plugin(DEEZER_API_BASE, "concurrent", cache_dir)
+        adapter = cassette.mount(plugin.deezer.session, store, cassette.REPLAY, plugin.deezer.api_base)
+        started = time.perf_counter()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):  # One error line per miss
+            for query in queries:
+                titles[query] = [result["Title"] for result in plugin.query(query)]
+        elapsed = time.perf_counter() - started
+        plugin.deezer.shutdown(wait=True)
+    print(f"{len(queries)} queries in {elapsed:.2f} s ({len(queries) / elapsed:.0f} queries/s), "
+          f"{adapter.replayed} responses replayed, {adapter.misses} missing from the cassette")
+    return titles
+
+
+def compare(titles: Dict[str, List[str]], expected: Dict[str, List[str]]) -> int:
+    """Prints the queries whose results differ from the expected ones and returns their number."""
+    changed = [query for query in titles if query in expected and titles[query] != expected[query]]
+    for query in changed[:MAX_LISTED_CHANGES]:
+        print(f"  {query!r}: {expected[query]} -> {titles[query]}")
+    print(f"{len(changed)} of {len(titles)} queries changed")
+    return len(changed)
+
+
+def main_replay(argv: List[str]) -> int:
+    """Runs the replay; returns the exit status."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("cassette", help="cassette recorded with DEEZER_FLOW_CASSETTE")
+    parser.add_argument("--queries", help="file with one query per line, defaults to the recorded search terms")
+    parser.add_argument("--output", help="save the result titles per query to this JSON file")
+    parser.add_argument("--expected", help="compare the result titles with this earlier --output file")
+    args = parser.parse_args(argv)
+
+    store = cassette.CassetteStore(args.cassette)
+    try:
+        queries = load_queries(args.queries) if args.queries else store.queries()
+        titles = replay(store, queries)
+    finally:
+        store.close()
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(titles, output_file, indent=1, ensure_ascii=False)
+    if args.expected:
+        with open(args.expected, "r", encoding="utf-8") as expected_file:
+            return 1 if compare(titles, json.load(expected_file)) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_replay(sys.argv[1:]))
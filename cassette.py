@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+import http.client
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+RECORD = "record"
+REPLAY = "replay"
+# Only responses to these endpoints are recorded and replayed
+RECORDED_PATH_PREFIX = "/search"
+# Response headers kept with a recording (others don't matter to DeezerClient)
+RECORDED_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+# zlib level for stored bodies: JSON search pages shrink about 10x
+COMPRESSION_LEVEL = 6
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS interactions (
+    key TEXT PRIMARY KEY,
+    query TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    body BLOB NOT NULL,
+    recorded_at REAL NOT NULL
+);
+"""
+
+Interaction = Tuple[int, Dict[str, str], bytes]
+
+
+class CassetteMiss(requests.exceptions.RequestException):
+    """Raised when replaying a request that was never recorded."""
+
+
+def interaction_key(method: str, url: str) -> str:
+    """Builds the key of a request: method, path and sorted query parameters."""
+    parts = urlsplit(url)
+    return f"{method} {parts.path}?{urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))}"
+
+
+class CassetteStore:
+    """Recorded API responses, stored zlib-compressed in SQLite.
+
+    Each request (method, path and query parameters) keeps its latest
+    response. Lookups are a primary key read and one decompression, so
+    replaying large query corpora is limited by the plugin, not the store.
+    """
+
+    def __init__(self, path: str):
+        """Open (or create) the cassette database.
+
+        Args:
+            path: Path of the SQLite database file.
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Searches run on worker threads (see DeezerClient.search_many)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def put(self, key: str, query: str, status: int, headers: Dict[str, str], body: bytes) -> None:
+        """Stores (or replaces) the response recorded for a request."""
+        serialized_headers = "\n".join(f"{name}: {value}" for name, value in headers.items())
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO interactions (key, query, status, headers, body, recorded_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, query, status, serialized_headers, zlib.compress(body, COMPRESSION_LEVEL), time.time()),
+            )
+
+    def get(self, key: str) -> Optional[Interaction]:
+        """Returns the (status, headers, body) recorded for a request, None if there is none."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, headers, body FROM interactions WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        status, serialized_headers, body = row
+        headers = dict(line.split(": ", 1) for line in serialized_headers.splitlines())
+        return status, headers, zlib.decompress(body)
+
+    def queries(self) -> List[str]:
+        """Returns the distinct recorded search terms, in the order they were first recorded."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT query FROM interactions WHERE query != '' GROUP BY query ORDER BY MIN(recorded_at)"
+            ).fetchall()
+        return [query for (query,) in rows]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM interactions").fetchone()[0]
+
+    def close(self) -> None:
+        """Closes the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+class CassetteAdapter(HTTPAdapter):
+    """A requests transport adapter recording or replaying API responses.
+
+    In RECORD mode, requests go to the network as usual and every successful
+    GET below RECORDED_PATH_PREFIX is saved to the store. Conditional headers
+    are dropped while recording, so that full bodies (not 304s) are saved.
+
+    In REPLAY mode nothing is sent: recorded requests are answered from the
+    store (with a 304 if the request's ETag still matches), other requests
+    below the prefix raise CassetteMiss, and the remaining endpoints (e.g.
+    connection warm-up) get an empty 200 response.
+    """
+
+    def __init__(self, store: CassetteStore, mode: str = REPLAY,
+                 path_prefix: str = RECORDED_PATH_PREFIX, **kwargs):
+        """Initialize the adapter.
+
+        Args:
+            store: Where responses are recorded to or replayed from.
+            mode: RECORD or REPLAY.
+            path_prefix: Only requests below this path are recorded and replayed.
+            **kwargs: Passed on to HTTPAdapter (pool sizes, retries).
+        """
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        super().__init__(**kwargs)
+        self.store = store
+        self.mode = mode
+        self.path_prefix = path_prefix
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        """Sends the request, or answers it from the cassette when replaying."""
+        parts = urlsplit(request.url)
+        matches = request.method == "GET" and parts.path.startswith(self.path_prefix)
+        key = interaction_key(request.method, request.url)
+        if self.mode == REPLAY:
+            if not matches:
+                return self._build_response(request, 200, {}, b"{}")
+            interaction = self.store.get(key)
+            if interaction is None:
+                self.misses += 1
+                raise CassetteMiss(f"No recorded response for {request.url}", request=request)
+            status, headers, body = interaction
+            self.replayed += 1
+            etag = headers.get("ETag")
+            if etag and request.headers.get("If-None-Match") == etag:
+                return self._build_response(request, 304, headers, b"")
+            return self._build_response(request, status, headers, body)
+
+        if matches:
+            request.headers.pop("If-None-Match", None)
+            request.headers.pop("If-Modified-Since", None)
+        response = super().send(request, **kwargs)
+        if matches and response.status_code == 200:
+            headers = {name: response.headers[name] for name in RECORDED_HEADERS if name in response.headers}
+            query = dict(parse_qsl(parts.query)).get("q", "")
+            self.store.put(key, query, response.status_code, headers, response.content)
+            self.recorded += 1
+        return response
+
+    def _build_response(self, request: requests.PreparedRequest, status: int,
+                        headers: Dict[str, str], body: bytes) -> requests.Response:
+        response = requests.Response()
+        response.status_code = status
+        response.reason = http.client.responses.get(status, "")
+        response.headers = CaseInsensitiveDict(headers)
+        response._content = body
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+
+def mount(session: requests.Session, store: CassetteStore, mode: str, base_url: str) -> CassetteAdapter:
+    """Routes a session's requests to base_url through a new CassetteAdapter.
+
+    Args:
+        session: The session to patch, e.g. DeezerClient.session.
+        store: Where responses are recorded to or replayed from.
+        mode: RECORD or REPLAY.
+        base_url: URL prefix handled by the adapter, e.g. DeezerClient.api_base.
+
+    Returns:
+        The mounted adapter, with its recorded/replayed/misses counters.
+    """
+    adapter = CassetteAdapter(store, mode)
+    session.mount(base_url, adapter)
+    if mode == REPLAY:
+        # Nothing reaches the network, so skip scanning the environment for
+        # proxy settings on every request: the bulk of requests' own overhead
+        session.trust_env = False
+    return adapter
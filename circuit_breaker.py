@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT_SECONDS = 30.0
+
+
+class CircuitBreaker:
+    """Stops calling a failing service for a while after repeated failures.
+
+    The breaker starts closed and lets every call through. After
+    failure_threshold consecutive failures it opens and rejects calls for
+    reset_timeout seconds. Then it lets a single trial call through
+    (half-open): a success closes it again, a failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout: float = DEFAULT_RESET_TIMEOUT_SECONDS):
+        """Initialize the breaker.
+
+        Args:
+            failure_threshold: Consecutive failures that open the breaker.
+            reset_timeout: Seconds the breaker stays open before a trial call.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.rejected = 0  # Calls short-circuited while open
+        self._opened_at = 0.0
+        self._trial_at = 0.0
+        self._state = self.CLOSED
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """The current state: closed, open or half-open."""
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """Returns True if a call may go through right now."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            now = time.monotonic()
+            if ((self._state == self.OPEN and now - self._opened_at >= self.reset_timeout)
+                    or (self._state == self.HALF_OPEN and now - self._trial_at >= self.reset_timeout)):
+                # Let exactly one trial call through (another one if the
+                # previous trial never reported back)
+                self._state = self.HALF_OPEN
+                self._trial_at = now
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        """Records a successful call, closing the breaker."""
+        with self._lock:
+            self.failures = 0
+            self._state = self.CLOSED
+
+    def record_failure(self) -> None:
+        """Records a failed call, opening the breaker at the threshold."""
+        with self._lock:
+            self.failures += 1
+            if self._state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+import time
+from typing import NamedTuple, Optional
+
+DEFAULT_DEBOUNCE_SECONDS = 0.15
+
+
+class QueryTicket(NamedTuple):
+    """Identifies one query registered with a QueryDebouncer."""
+    generation: int
+    token: str
+
+
+class QueryDebouncer:
+    """Drops queries that are superseded while the user is still typing.
+
+    Flow Launcher sends a query for every intermediate prefix ("m", "me", "met", ...).
+    Each query registers a ticket, waits for the debounce window and only goes
+    to the network if no newer query arrived in the meantime. Responses for
+    queries that were superseded while in flight are discarded as well.
+
+    Queries handled by the same process (the plugin daemon) are tracked with a
+    generation counter. One-shot plugin processes see each other through a small
+    state file holding the token of the latest query.
+    """
+
+    def __init__(self, window: float = DEFAULT_DEBOUNCE_SECONDS, state_path: Optional[str] = None):
+        """Initialize the debouncer.
+
+        Args:
+            window: Seconds to wait for a newer query before searching, 0 disables the wait.
+            state_path: Optional file used to share the latest query between processes.
+        """
+        self.window = window
+        self.state_path = state_path
+        self.dropped = 0  # Superseded before reaching the network
+        self.discarded = 0  # Superseded while in flight
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def begin(self, query: str) -> QueryTicket:
+        """Registers a new query, superseding all earlier ones.
+
+        Args:
+            query: The search term (only used to make the token readable when debugging).
+
+        Returns:
+            The ticket to pass to wait() and is_stale().
+        """
+        with self._lock:
+            self._generation += 1
+            ticket = QueryTicket(self._generation, f"{os.getpid()}:{self._generation}:{os.urandom(4).hex()}")
+        if self.state_path:
+            self._write_token(f"{ticket.token}\n{query}")
+        return ticket
+
+    def wait(self, ticket: QueryTicket) -> bool:
+        """Waits out the debounce window.
+
+        Args:
+            ticket: The ticket returned by begin().
+
+        Returns:
+            True if the query is still the latest one and should be run.
+        """
+        if self.window > 0:
+            time.sleep(self.window)
+        if self.is_stale(ticket):
+            with self._lock:
+                self.dropped += 1
+            return False
+        return True
+
+    def is_stale(self, ticket: QueryTicket) -> bool:
+        """Returns True if a newer query has been registered since the ticket was issued."""
+        if ticket.generation != self._generation:
+            return True
+        if self.state_path:
+            latest = self._read_token()
+            # A missing or unreadable file must not block searching
+            return latest is not None and latest != ticket.token
+        return False
+
+    def discard(self, ticket: QueryTicket) -> bool:
+        """Checks a finished query and counts it as discarded if it went stale.
+
+        Args:
+            ticket: The ticket returned by begin().
+
+        Returns:
+            True if the response should be thrown away.
+        """
+        if not self.is_stale(ticket):
+            return False
+        with self._lock:
+            self.discarded += 1
+        return True
+
+    def _write_token(self, content: str) -> None:
+        tmp_path = f"{self.state_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            directory = os.path.dirname(self.state_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as state_file:
+                state_file.write(content)
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            print(f"Error writing debounce state {self.state_path}: {e}")
+
+    def _read_token(self) -> Optional[str]:
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as state_file:
+                return state_file.readline().rstrip("\n")
+        except OSError:
+            return None
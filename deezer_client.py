@@ -1,30 +1,280 @@
 # -*- coding: utf-8 -*-
-from typing import List, Dict, Any, Optional
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from functools import partial
+from typing import (
+    List, Dict, Any, Optional, Iterable, Iterator, Callable, Generator, NamedTuple, Set, Tuple, Union,
+)
 import requests
+from requests.adapters import HTTPAdapter
 
-# TODO: Add fuzzy search library import if used here
+import json_decoder
+from circuit_breaker import CircuitBreaker
+from entity_index import EntityIndex
+from metrics import MetricsRecorder, NULL_METRICS
+from models import Record, SearchResults, embedded_albums, embedded_artists, parse_items
+from rate_limiter import TokenBucket, RateLimitTimeout
+from search_cache import SearchCache, CacheEntry, Validators
+from thread_pool import DaemonThreadPoolExecutor
 
-# TODO: Add Pydantic models for API responses if desired
+# TODO: Add fuzzy search library import if used here
 
 DEEZER_API_BASE = "https://api.deezer.com"
+SEARCH_TYPES = ("track", "album", "artist", "playlist")
+# Search type requesting Deezer's generic /search endpoint, which returns tracks
+GENERIC_SEARCH = "all"
+# Types search_combined derives from one generic search: tracks and their embedded artists and albums
+EMBEDDED_TYPES = ("track", "artist", "album")
+# Items per page Deezer returns when no limit is given
+DEFAULT_PAGE_SIZE = 25
+# (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT = (3.05, 5.0)
+DEFAULT_MAX_RETRIES = 2
+RETRY_BACKOFF_BASE = 0.2
+RETRY_BACKOFF_MAX = 2.0
+# Longest a request waits for rate-limit budget before giving up
+DEFAULT_MAX_RATE_LIMIT_WAIT = 5.0
+# Error code Deezer returns in the JSON body when the request quota is exceeded
+QUOTA_EXCEEDED_CODE = 4
+# Expired cache entries younger than this are served while being refreshed
+DEFAULT_MAX_STALENESS = 7 * 24 * 60 * 60
+# Cheap endpoint requested to open connections ahead of the first search
+WARM_UP_ENDPOINT = "/infos"
+# Threads running prefetches and background refreshes, apart from the searches
+# someone is waiting for
+BACKGROUND_WORKERS = 2
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of sending a request while the circuit breaker is open."""
+
+
+class RateLimitedError(requests.exceptions.RequestException):
+    """Raised when the client-side rate limiter had no budget for a request in time."""
+
+
+def _is_retryable(error: requests.exceptions.RequestException) -> bool:
+    """Returns True for transient failures worth retrying (timeouts, connection errors, 5xx, 429)."""
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    response = getattr(error, "response", None)
+    return response is not None and (response.status_code >= 500 or response.status_code == 429)
+
+
+def request_key(endpoint: str, params: Optional[Dict[str, Any]] = None) -> Tuple[str, Tuple[Tuple[str, str], ...]]:
+    """Identifies a request, so that identical requests in flight can share one HTTP call."""
+    return endpoint, tuple(sorted((str(name), str(value)) for name, value in (params or {}).items()))
+
+
+def _conditional_headers(validators: Optional[Validators]) -> Dict[str, str]:
+    """Builds the If-None-Match/If-Modified-Since headers revalidating a cached response."""
+    headers = {}
+    if validators is not None:
+        if validators.etag:
+            headers["If-None-Match"] = validators.etag
+        if validators.last_modified:
+            headers["If-Modified-Since"] = validators.last_modified
+    return headers
+
+
+# --- Request steps ---
+#
+# The request, cache and circuit breaker logic is written once, as generators
+# yielding the I/O they need (see DeezerClient.request_steps). DeezerClient runs
+# the steps on the calling thread; AsyncDeezerClient runs them on an event loop,
+# sending HTTP requests with httpx and blocking calls to a worker thread.
+
+
+class Blocking(NamedTuple):
+    """A step calling a function that blocks (SQLite, lock files); yields its result."""
+    call: Callable[[], Any]
+
+
+class Sleep(NamedTuple):
+    """A step waiting before a retry."""
+    seconds: float
+
+
+class HttpGet(NamedTuple):
+    """A step sending a GET request; yields the response or raises a RequestException.
+
+    Error responses (4xx, 5xx) raise requests.exceptions.HTTPError, like
+    requests.Response.raise_for_status.
+    """
+    url: str
+    params: Optional[Dict[str, Any]]
+    headers: Dict[str, str]
+
+
+class ApiRequest(NamedTuple):
+    """A step making an API request, shared with identical ones in flight; yields the JSON response."""
+    endpoint: str
+    params: Optional[Dict[str, Any]]
+
+
+class Background(NamedTuple):
+    """A step starting other steps in the background; yields None right away."""
+    steps: "Steps"
+
+
+Step = Union[Blocking, Sleep, HttpGet, ApiRequest, Background]
+Steps = Generator[Step, Any, Any]
+
+
+def records_from_generic(items: List[Dict[str, Any]], search_type: str) -> List[Record]:
+    """Parses generic /search items (tracks) into records of a type embedded in them."""
+    if search_type == "artist":
+        return embedded_artists(items)
+    if search_type == "album":
+        return embedded_albums(items)
+    return parse_items(items, "track")
+
 
 class DeezerClient:
     """A client to interact with the Deezer API."""
 
-    def __init__(self, access_token: Optional[str] = None):
+    def __init__(self, access_token: Optional[str] = None, max_workers: int = len(SEARCH_TYPES),
+                 cache: Optional[SearchCache] = None, timeout: Tuple[float, float] = DEFAULT_TIMEOUT,
+                 max_retries: int = DEFAULT_MAX_RETRIES, breaker: Optional[CircuitBreaker] = None,
+                 rate_limiter: Optional[TokenBucket] = None,
+                 max_rate_limit_wait: float = DEFAULT_MAX_RATE_LIMIT_WAIT,
+                 entity_index: Optional[EntityIndex] = None,
+                 decoder: Optional[json_decoder.Decoder] = None, warm_up: bool = False,
+                 max_staleness: Optional[float] = DEFAULT_MAX_STALENESS,
+                 metrics: Optional[MetricsRecorder] = None, api_base: str = DEEZER_API_BASE):
         """Initialize the client.
 
         Args:
             access_token: Optional OAuth access token for authenticated requests.
+            max_workers: Maximum number of searches run concurrently by search_many.
+            cache: Optional persistent cache for search responses.
+            timeout: (connect, read) timeout in seconds for each request.
+            max_retries: Retries for transient failures, with jittered exponential backoff.
+            breaker: Circuit breaker guarding the API, a default one is created if omitted.
+            rate_limiter: Token bucket shared by all requests, a default in-process one
+                matching Deezer's quota is created if omitted.
+            max_rate_limit_wait: Longest a request waits for rate-limit budget, in seconds.
+            entity_index: Optional local index filled with every entity the API returns.
+            decoder: Function decoding response bodies, defaults to the fastest
+                JSON decoder installed (see json_decoder).
+            warm_up: Open a connection to the API in the background right away
+                (see warm_up), so the first search skips DNS, TCP and TLS setup.
+            max_staleness: Oldest expired cache entry (age in seconds) served
+                right away while it is refreshed in the background. None always
+                waits for the API once an entry has expired.
+            metrics: Optional recorder timing rate-limit waits, HTTP round trips
+                and JSON decoding.
+            api_base: Base URL of the API, e.g. a local stand-in for benchmarks.
         """
         self.access_token = access_token
+        self.api_base = api_base.rstrip("/")
+        self.cache = cache
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.rate_limiter = rate_limiter if rate_limiter is not None else TokenBucket()
+        self.max_rate_limit_wait = max_rate_limit_wait
+        self.entity_index = entity_index
+        self.decode = decoder if decoder is not None else json_decoder.loads
+        self.max_staleness = max_staleness
+        self.metrics = metrics if metrics is not None else NULL_METRICS
+        self._refreshing: Set[str] = set()  # Cache keys being revalidated in the background
+        self._refreshing_lock = threading.Lock()
+        # Single-flight bookkeeping: identical requests in flight share one HTTP call
+        self._inflight: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], Future] = {}
+        self._inflight_lock = threading.Lock()
+        self.coalesced = 0  # Requests answered by another caller's in-flight request
+        self.max_workers = max_workers
+        self._executor: Optional[DaemonThreadPoolExecutor] = None
+        self._background: Optional[DaemonThreadPoolExecutor] = None
         self.session = requests.Session()
+        # Keep a kept-alive connection for each concurrent search (search_many)
+        # and each background one (prefetch, revalidation)
+        self.session.mount(
+            "https://", HTTPAdapter(pool_connections=1, pool_maxsize=max_workers + BACKGROUND_WORKERS)
+        )
         if self.access_token:
             self.session.headers.update({"Authorization": f"Bearer {self.access_token}"})
         # TODO: Implement proper OAuth handling/refresh logic if needed
+        if warm_up:
+            self.warm_up()
+
+    @property
+    def executor(self) -> DaemonThreadPoolExecutor:
+        """Thread pool running concurrent searches someone waits for, created on first use.
+
+        Its workers are daemon threads, as are the background pool's: a
+        one-shot plugin process exits as soon as it has answered.
+        """
+        if self._executor is None:
+            self._executor = DaemonThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="deezer-search")
+        return self._executor
+
+    @property
+    def background(self) -> DaemonThreadPoolExecutor:
+        """Thread pool running prefetches and background refreshes, created on first use.
+
+        Kept apart from the executor, so a live search never waits in line
+        behind work that only warms the cache. Work still running when a
+        one-shot plugin process exits is dropped.
+        """
+        if self._background is None:
+            self._background = DaemonThreadPoolExecutor(
+                max_workers=BACKGROUND_WORKERS, thread_name_prefix="deezer-background"
+            )
+        return self._background
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Shuts both thread pools down, with wait once their queued work is done."""
+        for pool in (self._executor, self._background):
+            if pool is not None:
+                pool.shutdown(wait=wait)
+
+    def warm_up(self) -> Future:
+        """Opens a connection to the API in the background.
+
+        Sends one HEAD request to a cheap endpoint, so that DNS lookup, TCP and
+        TLS handshakes are done (and the connection kept alive in the session's
+        pool) by the time the first search is sent, e.g. while the debouncer
+        waits for the next keystroke. The request runs on its own thread, never
+        holding up a search worker, and only uses rate-limit budget that is
+        available right away.
+
+        Returns:
+            A future resolving to True if the connection was opened.
+        """
+        future: Future = Future()
+
+        def run():
+            future.set_result(self._warm_connection())
+
+        threading.Thread(target=run, name="deezer-warm-up", daemon=True).start()
+        return future
+
+    def _warm_connection(self) -> bool:
+        """Sends the warm-up request, returns True if it reached the API."""
+        try:
+            self.rate_limiter.acquire(timeout=0)
+        except RateLimitTimeout:
+            return False  # Keep the budget for real searches
+        try:
+            with self.metrics.stage("warm_up"):
+                self.session.head(f"{self.api_base}{WARM_UP_ENDPOINT}", timeout=self.timeout)
+            return True
+        except requests.exceptions.RequestException as e:
+            print(f"Error warming up connection to {self.api_base}: {e}")
+            return False
 
     def _make_request(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """Makes a GET request to the Deezer API.
+        """Makes a GET request to the Deezer API, sharing identical requests already in flight.
+
+        If another thread is already requesting the same endpoint with the same
+        parameters (e.g. 'play x' and plain 'x' both searching tracks for 'x'),
+        this call waits for that request and returns its parsed result instead
+        of sending its own.
 
         Args:
             endpoint: The API endpoint path (e.g., '/search/album').
@@ -37,32 +287,181 @@ class DeezerClient:
             requests.exceptions.RequestException: If the request fails.
             ValueError: If the API returns an error.
         """
-        url = f"{DEEZER_API_BASE}{endpoint}"
+        key = request_key(endpoint, params)
+        with self._inflight_lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return call.result()  # Re-raises the leader's exception
+
         try:
-            response = self.session.get(url, params=params)
-            response.raise_for_status()  # Raise HTTPError for bad responses (4xx or 5xx)
-            data = response.json()
-            if 'error' in data:
-                # Deezer API specific error handling
-                raise ValueError(f"Deezer API Error: {data['error'].get('message', 'Unknown error')} (Type: {data['error'].get('type')})")
-            return data
-        except requests.exceptions.RequestException as e:
-            # Log error or handle specific exceptions
-            print(f"Error making request to {url}: {e}")
+            data = self._send_request(endpoint, params)
+        except BaseException as e:
+            call.set_exception(e)
             raise
+        else:
+            call.set_result(data)
+            return data
+        finally:
+            with self._inflight_lock:
+                del self._inflight[key]
 
-    def search(self, query: str, search_type: str = "track") -> List[Dict[str, Any]]:
-        """Performs a search on Deezer for a specific type.
+    def _send_request(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Sends a GET request to the Deezer API (see request_steps).
+
+        Args:
+            endpoint: The API endpoint path (e.g., '/search/album').
+            params: Optional dictionary of query parameters.
+
+        Returns:
+            The JSON response from the API as a dictionary.
+
+        Raises:
+            requests.exceptions.RequestException: If the request fails.
+            CircuitOpenError: If the circuit breaker is open.
+            RateLimitedError: If no rate-limit budget became available in time.
+            ValueError: If the API returns an error.
+        """
+        return self._run(self.request_steps(endpoint, params))
+
+    def _run(self, steps: Steps) -> Any:
+        """Runs request steps on the calling thread and returns their result."""
+        value, error = None, None
+        while True:
+            try:
+                step = steps.throw(error) if error is not None else steps.send(value)
+            except StopIteration as done:
+                return done.value
+            value, error = None, None
+            try:
+                value = self._perform(step)
+            except Exception as e:
+                error = e
+
+    def _perform(self, step: Step) -> Any:
+        """Does the I/O of one request step, blocking until it is done."""
+        if isinstance(step, Blocking):
+            return step.call()
+        if isinstance(step, Sleep):
+            time.sleep(step.seconds)
+            return None
+        if isinstance(step, HttpGet):
+            with self.metrics.stage("http"):
+                response = self.session.get(
+                    step.url, params=step.params, timeout=self.timeout,
+                    **({"headers": step.headers} if step.headers else {})
+                )
+            response.raise_for_status()  # Raise HTTPError for bad responses (4xx or 5xx)
+            return response
+        if isinstance(step, ApiRequest):
+            return self._make_request(step.endpoint, params=step.params)
+        self.background.submit(self._run, step.steps)
+        return None
+
+    def request_steps(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Steps:
+        """The steps of a GET request to the Deezer API.
+
+        Requests wait for budget from the shared rate limiter before they are
+        sent. Transient failures (timeouts, connection errors, 5xx) and Deezer
+        quota errors are retried with jittered exponential backoff. Repeated
+        failures open the circuit breaker, after which requests fail fast until
+        the API has had time to recover.
+
+        If the cache holds a response with an ETag or Last-Modified validator,
+        the request is made conditional. A 304 Not Modified answer returns the
+        cached response, without downloading the body again.
+
+        Args:
+            endpoint: The API endpoint path (e.g., '/search/album').
+            params: Optional dictionary of query parameters.
+
+        Returns:
+            Steps returning the JSON response from the API as a dictionary.
+        """
+        url = f"{self.api_base}{endpoint}"
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"Deezer API circuit breaker is open, skipping {url}")
+        validators = None
+        if self.cache is not None:
+            validators = yield Blocking(partial(self.cache.get_validators, endpoint, params))
+        attempt = 0
+        while True:
+            try:
+                waited = yield Blocking(partial(self.rate_limiter.acquire, timeout=self.max_rate_limit_wait))
+            except RateLimitTimeout as e:
+                raise RateLimitedError(f"Rate limit budget exhausted, skipping {url}") from e
+            self.metrics.record("rate_limit_wait", waited)
+            try:
+                started = time.monotonic()
+                response = yield HttpGet(url, params, _conditional_headers(validators))
+                if response.status_code == 304 and validators is not None:
+                    # The body is the cached one: reading it is not a cache hit
+                    entry = yield Blocking(partial(
+                        self.cache.get_entry, endpoint, params, max_age=float("inf"), count=False
+                    ))
+                    if entry is None:
+                        validators = None  # Evicted meanwhile, ask for the full response
+                        continue
+                    data = entry.data
+                    yield Blocking(partial(self.cache.record_revalidation, validators.size, time.monotonic() - started))
+                    break
+                try:
+                    with self.metrics.stage("decode"):
+                        data = self.decode(response.content)
+                except ValueError as e:
+                    raise requests.exceptions.InvalidJSONError(
+                        f"Invalid JSON in response: {e}", response=response
+                    ) from e
+            except requests.exceptions.RequestException as e:
+                if attempt < self.max_retries and _is_retryable(e):
+                    # Full jitter keeps concurrent searches from retrying in lockstep
+                    yield Sleep(random.uniform(0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * 2 ** attempt)))
+                    attempt += 1
+                    continue
+                if _is_retryable(e):
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()  # The API answered, it just didn't like the request
+                # Log error or handle specific exceptions
+                print(f"Error making request to {url}: {e}")
+                raise
+            if 'error' in data and data['error'].get('code') == QUOTA_EXCEEDED_CODE and attempt < self.max_retries:
+                # Another client used up the quota: empty our bucket so we wait for it to refill
+                yield Blocking(self.rate_limiter.drain)
+                attempt += 1
+                continue
+            break
+        self.breaker.record_success()
+        if 'error' in data:
+            # Deezer API specific error handling
+            raise ValueError(f"Deezer API Error: {data['error'].get('message', 'Unknown error')} (Type: {data['error'].get('type')})")
+        if self.cache is not None and response.status_code != 304:
+            etag, last_modified = response.headers.get("ETag"), response.headers.get("Last-Modified")
+            if etag or last_modified:
+                validators = Validators(etag, last_modified, len(response.content))
+                yield Blocking(partial(self.cache.set_validators, endpoint, params, validators))
+        return data
+
+    def _search_request(self, query: str, search_type: str, limit: Optional[int] = None,
+                        index: Optional[int] = None) -> Tuple[str, Dict[str, Any]]:
+        """Builds the endpoint and query parameters for a search.
 
         Args:
             query: The search term.
-            search_type: Type of search (track, album, artist, playlist).
+            search_type: Type of search (track, album, artist, playlist), anything
+                else uses the generic /search endpoint.
+            limit: Optional number of items per page.
+            index: Optional offset of the first item.
 
         Returns:
-            A list of search result items (dictionaries).
+            The endpoint path and the query parameters.
         """
         # Use specific endpoints for clarity and guaranteed type
-        if search_type not in ["track", "album", "artist", "playlist"]:
+        if search_type not in SEARCH_TYPES:
             # Default or fallback to general search if type is invalid/unspecified
             endpoint = "/search"
             params = {"q": query}
@@ -71,60 +470,357 @@ class DeezerClient:
             params = {"q": query}
             # Optional: Add ordering parameter if needed, e.g.:
             # params['order'] = 'RANKING' # Default
+        # Only send paging parameters when set, so default searches share cache entries
+        if limit is not None:
+            params["limit"] = limit
+        if index:
+            params["index"] = index
+        return endpoint, params
+
+    def _fetch_page(self, query: str, search_type: str, limit: Optional[int] = None,
+                    index: Optional[int] = None) -> Tuple[Dict[str, Any], bool]:
+        """Fetches one page of search results, through the cache (see page_steps)."""
+        return self._run(self.page_steps(query, search_type, limit=limit, index=index))
+
+    def page_steps(self, query: str, search_type: str, limit: Optional[int] = None,
+                   index: Optional[int] = None) -> Steps:
+        """The steps fetching one page of search results, through the cache.
+
+        Expired cache entries within max_staleness are returned right away and
+        refreshed in the background (stale-while-revalidate), so only searches
+        never seen before wait for the network.
+
+        Returns:
+            Steps returning the full response ('data', 'total' and, if there are
+            more results, 'next'), or an empty dictionary if the request failed,
+            and whether the response came from an expired cache entry.
+        """
+        endpoint, params = self._search_request(query, search_type, limit=limit, index=index)
+        if self.cache is not None:
+            max_age = self.cache.ttl if self.max_staleness is None else max(self.cache.ttl, self.max_staleness)
+            entry = yield Blocking(partial(self.cache.get_entry, endpoint, params, max_age=max_age))
+            if entry is not None:
+                if entry.age <= self.cache.ttl:
+                    return entry.data, False
+                yield from self._revalidate_steps(query, search_type, endpoint, params)
+                return entry.data, True
 
         try:
-            results = self._make_request(endpoint, params=params)
-            # API returns results under the 'data' key
-            return results.get("data", [])
+            return (yield from self._request_page_steps(query, search_type, endpoint, params)), False
         except (requests.exceptions.RequestException, ValueError) as e:
             # Log error or handle specific exceptions
             print(f"Error searching Deezer ({search_type}) for '{query}': {e}")
+            if self.cache is not None:
+                # Serve an expired response rather than nothing while the API is failing
+                stale = yield Blocking(partial(self.cache.get, endpoint, params, max_age=float("inf")))
+                if stale is not None:
+                    return stale, True
+            return {}, False
+
+    def _request_page_steps(self, query: str, search_type: str, endpoint: str, params: Dict[str, Any]) -> Steps:
+        """Requests a page from the API, then caches and indexes it.
+
+        Raises:
+            requests.exceptions.RequestException: If the request fails.
+            ValueError: If the API returns an error.
+        """
+        results = yield ApiRequest(endpoint, params)
+        if self.cache is not None:
+            yield Blocking(partial(self.cache.set, endpoint, params, results))
+        yield Blocking(partial(self._index_results, results.get("data", []), search_type))
+        return results
+
+    def _revalidate_steps(self, query: str, search_type: str, endpoint: str, params: Dict[str, Any]) -> Steps:
+        """Refreshes an expired cache entry in the background, once at a time per entry."""
+        key = SearchCache.make_key(endpoint, params)
+        with self._refreshing_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh() -> Steps:
+            try:
+                yield from self._request_page_steps(query, search_type, endpoint, params)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                print(f"Error refreshing Deezer ({search_type}) results for '{query}': {e}")
+            finally:
+                with self._refreshing_lock:
+                    self._refreshing.discard(key)
+
+        yield Background(refresh())
+
+    def search(self, query: str, search_type: str = "track", limit: Optional[int] = None) -> SearchResults:
+        """Performs a search on Deezer for a specific type.
+
+        Args:
+            query: The search term.
+            search_type: Type of search (track, album, artist, playlist).
+            limit: Optional number of items to request, smaller pages mean
+                smaller payloads. Defaults to Deezer's page size.
+
+        Returns:
+            A list of search result records (see models), carrying only the
+            fields the plugin uses. Its `stale` flag is set when the results
+            came from an expired cache entry.
+        """
+        # API returns results under the 'data' key
+        page, stale = self._fetch_page(query, search_type, limit=limit)
+        return SearchResults(parse_items(page.get("data", []), search_type), stale=stale)
+
+    def iter_search(self, query: str, search_type: str = "track", limit: int = DEFAULT_PAGE_SIZE,
+                    max_items: Optional[int] = None) -> Iterator[Record]:
+        """Lazily yields search results, walking the result pages.
+
+        While the items of one page are consumed, the next page is already being
+        fetched in the background. Stopping iteration early (e.g. from
+        ranking.top_k) stops fetching further pages.
+
+        Args:
+            query: The search term.
+            search_type: Type of search (track, album, artist, playlist).
+            limit: Number of items per page.
+            max_items: Optional total number of items to yield.
+
+        Yields:
+            Search result records, in API order.
+        """
+        index = 0
+        yielded = 0
+        page, _ = self._fetch_page(query, search_type, limit=limit, index=index)
+        next_page = None
+        try:
+            while True:
+                items = parse_items(page.get("data", []), search_type)
+                if not items:
+                    return
+                index += len(items)
+                more_wanted = max_items is None or yielded + len(items) < max_items
+                if "next" in page and more_wanted:
+                    # Prefetch while the caller works through this page
+                    next_page = self.executor.submit(self._fetch_page, query, search_type, limit, index)
+                for item in items:
+                    if max_items is not None and yielded >= max_items:
+                        return
+                    yield item
+                    yielded += 1
+                if next_page is None:
+                    return
+                (page, _), next_page = next_page.result(), None
+        finally:
+            if next_page is not None:
+                next_page.cancel()  # Only prevents the fetch if it hasn't started yet
+
+    def search_many(self, query: str, search_types: Iterable[str],
+                    cancelled: Optional[Callable[[], bool]] = None,
+                    limit: Optional[int] = None) -> Dict[str, SearchResults]:
+        """Runs several typed searches concurrently.
+
+        All requests are sent at once through a shared thread pool, so the total
+        latency is roughly that of the slowest single search.
+
+        Args:
+            query: The search term.
+            search_types: Types to search (track, album, artist, playlist).
+            cancelled: Optional callback; searches that have not started yet are
+                skipped (and return no items) once it returns True.
+            limit: Optional number of items to request per type.
+
+        Returns:
+            A dictionary mapping each requested type to its list of result items.
+        """
+        def run(search_type: str) -> SearchResults:
+            if cancelled is not None and cancelled():
+                return SearchResults()
+            return self.search(query, search_type=search_type, limit=limit)
+
+        search_types = list(dict.fromkeys(search_types))  # Drop duplicates, keep order
+        if len(search_types) <= 1:
+            # Nothing to overlap, skip the pool round-trip
+            return {search_type: run(search_type) for search_type in search_types}
+
+        futures = {search_type: self.executor.submit(run, search_type) for search_type in search_types}
+        # search() already turns request errors into empty lists
+        return {search_type: future.result() for search_type, future in futures.items()}
+
+    def search_combined(self, query: str, search_types: Iterable[str],
+                        cancelled: Optional[Callable[[], bool]] = None,
+                        limit: Optional[int] = None) -> Dict[str, SearchResults]:
+        """Answers several types with as few requests as possible.
+
+        Tracks, artists and albums all come from a single generic /search
+        request: the artists and albums are the distinct ones embedded in the
+        returned tracks. Playlists still need their own request, sent
+        concurrently. Saves up to two requests per search over search_many,
+        at the cost of artist and album results that only include those with
+        a matching track.
+
+        Args:
+            query: The search term.
+            search_types: Types to search (track, album, artist, playlist).
+            cancelled: Optional callback; requests that have not started yet are
+                skipped (and return no items) once it returns True.
+            limit: Optional number of items to request per call.
+
+        Returns:
+            A dictionary mapping each requested type to its list of result records.
+        """
+        search_types = list(dict.fromkeys(search_types))  # Drop duplicates, keep order
+        derived_types = [search_type for search_type in search_types if search_type in EMBEDDED_TYPES]
+        if len(derived_types) < 2:
+            # A single type is answered best by its own endpoint
+            return self.search_many(query, search_types, cancelled=cancelled, limit=limit)
+
+        def run(search_type: str) -> SearchResults:
+            if cancelled is not None and cancelled():
+                return SearchResults()
+            return self.search(query, search_type=search_type, limit=limit)
+
+        futures = {
+            search_type: self.executor.submit(run, search_type)
+            for search_type in search_types if search_type not in derived_types
+        }
+        page, stale = ({}, False) if cancelled is not None and cancelled() else self._fetch_page(
+            query, GENERIC_SEARCH, limit=limit
+        )
+        tracks = page.get("data", [])
+        results = {
+            search_type: SearchResults(records_from_generic(tracks, search_type), stale=stale)
+            for search_type in derived_types
+        }
+        results.update({search_type: future.result() for search_type, future in futures.items()})
+        return {search_type: results[search_type] for search_type in search_types}
+
+    def _index_results(self, items: List[Dict[str, Any]], search_type: str) -> None:
+        """Adds fetched API items to the local entity index, if one is configured."""
+        if self.entity_index is None:
+            return
+        if search_type in SEARCH_TYPES:
+            records = {search_type: parse_items(items, search_type)}
+        else:
+            # The generic /search endpoint returns tracks, with their artist and album embedded
+            records = {item_type: records_from_generic(items, item_type) for item_type in EMBEDDED_TYPES}
+        for item_type, type_records in records.items():
+            try:
+                self.entity_index.add(type_records, item_type)
+            except sqlite3.Error as e:
+                # The index is an optimization, never fail a search because of it
+                print(f"Error indexing Deezer {item_type} results: {e}")
+
+    def search_local(self, query: str, search_type: str = "track", limit: int = 50) -> List[Record]:
+        """Searches the local entity index only, never touching the network.
+
+        Args:
+            query: The search term.
+            search_type: Type of search (track, album, artist, playlist).
+            limit: Maximum number of candidates returned.
+
+        Returns:
+            Candidate records previously returned by the API, unranked.
+        """
+        if self.entity_index is None:
+            return []
+        try:
+            return self.entity_index.search(query, search_type, limit=limit)
+        except sqlite3.Error as e:
+            print(f"Error searching local index ({search_type}) for '{query}': {e}")
             return []
 
-    def search_albums(self, query: str) -> List[Dict[str, Any]]:
+    def search_cached_prefix(self, query: str, search_type: str = "track", min_length: int = 1,
+                             limit: Optional[int] = None, combined: bool = False) -> Optional[CacheEntry]:
+        """Looks up the cached search whose query is the longest prefix of this one.
+
+        Never touches the network. Used to answer a keystroke from the results
+        of the previous one.
+
+        Args:
+            query: The search term.
+            search_type: Type of search (track, album, artist, playlist).
+            min_length: Minimum length of the cached query.
+            limit: The page size the search was made with.
+            combined: Searches are made with search_combined: tracks, artists
+                and albums are looked up in cached generic searches first.
+
+        Returns:
+            The cached entry, with its data parsed into a list of records, or None.
+        """
+        if self.cache is None:
+            return None
+        if combined and search_type in EMBEDDED_TYPES:
+            endpoint, params = self._search_request(query, GENERIC_SEARCH, limit=limit)
+            entry = self.cache.find_prefix(endpoint, params, min_length=min_length)
+            if entry is not None:
+                return entry._replace(data=records_from_generic(entry.data.get("data", []), search_type))
+        endpoint, params = self._search_request(query, search_type, limit=limit)
+        entry = self.cache.find_prefix(endpoint, params, min_length=min_length)
+        if entry is None:
+            return None
+        return entry._replace(data=parse_items(entry.data.get("data", []), search_type))
+
+    def prefetch(self, query: str, search_types: Iterable[str], limit: Optional[int] = None,
+                 combined: bool = False) -> None:
+        """Refreshes searches in the background so their responses land in the cache.
+
+        Args:
+            query: The search term.
+            search_types: Types to search (track, album, artist, playlist).
+            limit: Optional number of items to request per type.
+            combined: Request types the way search_combined does: tracks,
+                artists and albums with one generic search.
+        """
+        search_types = list(dict.fromkeys(search_types))
+        derived_types = [search_type for search_type in search_types if search_type in EMBEDDED_TYPES]
+        if combined and len(derived_types) >= 2:
+            self.background.submit(self._fetch_page, query, GENERIC_SEARCH, limit=limit)
+            search_types = [search_type for search_type in search_types if search_type not in derived_types]
+        for search_type in search_types:
+            self.background.submit(self.search, query, search_type=search_type, limit=limit)
+
+    def search_albums(self, query: str) -> SearchResults:
         """Searches specifically for albums using the /search/album endpoint.
 
         Args:
             query: The album name to search for.
 
         Returns:
-            A list of album result items.
+            Album records, flagged stale when served from an expired cache entry (see search).
         """
         return self.search(query, search_type="album")
 
-    def search_artists(self, query: str) -> List[Dict[str, Any]]:
+    def search_artists(self, query: str) -> SearchResults:
         """Searches specifically for artists using the /search/artist endpoint.
 
         Args:
             query: The artist name to search for.
 
         Returns:
-            A list of artist result items.
+            Artist records, flagged stale when served from an expired cache entry (see search).
         """
         return self.search(query, search_type="artist")
 
-    def search_playlists(self, query: str) -> List[Dict[str, Any]]:
+    def search_playlists(self, query: str) -> SearchResults:
         """Searches specifically for playlists using the /search/playlist endpoint.
 
         Args:
             query: The playlist name to search for.
 
         Returns:
-            A list of playlist result items.
+            Playlist records, flagged stale when served from an expired cache entry (see search).
         """
         return self.search(query, search_type="playlist")
 
-    def get_item_url(self, item: Dict[str, Any]) -> Optional[str]:
-        """Extracts the web URL from a Deezer API item.
+    def get_item_url(self, item: Union[Record, Dict[str, Any]]) -> Optional[str]:
+        """Extracts the web URL from a Deezer item.
 
         Args:
-            item: A dictionary representing a track, album, artist, or playlist from the API.
+            item: A track, album, artist, or playlist record, or a raw dictionary from the API.
 
         Returns:
             The web URL string, or None if not found.
         """
-        # Common key for web links in Deezer API responses
-        return item.get("link")
+        if isinstance(item, dict):
+            # Common key for web links in Deezer API responses
+            return item.get("link")
+        return item.link
 
 # Example Usage (for testing)
 if __name__ == '__main__':
@@ -138,18 +834,18 @@ if __name__ == '__main__':
     if artists:
         print("\n--- Artists ---")
         for artist in artists[:3]: # Show first 3
-            print(f"  - {artist.get('name')} ({client.get_item_url(artist)})")
+            print(f"  - {artist.name} ({client.get_item_url(artist)})")
 
     print(f"\nSearching for Album: {album_query}")
     albums = client.search_albums(album_query)
     if albums:
         print("\n--- Albums ---")
         for album in albums[:3]:
-            print(f"  - {album.get('title')} by {album.get('artist', {}).get('name')} ({client.get_item_url(album)})")
+            print(f"  - {album.title} by {album.artist_name} ({client.get_item_url(album)})")
 
     print(f"\nSearching for Playlist: {playlist_query}")
     playlists = client.search_playlists(playlist_query)
     if playlists:
         print("\n--- Playlists ---")
         for pl in playlists[:3]:
-            print(f"  - {pl.get('title')} by {pl.get('user', {}).get('name')} ({client.get_item_url(pl)})") 
\ No newline at end of file
+            print(f"  - {pl.title} by {pl.creator_name} ({client.get_item_url(pl)})") 
\ No newline at end of file
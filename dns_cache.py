@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import socket
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from metrics import MetricsRecorder, NULL_METRICS
+
+# How long resolved addresses are reused
+DEFAULT_TTL_SECONDS = 10 * 60
+
+AddrInfo = Tuple[Any, Any, int, str, tuple]
+
+
+class DnsCache:
+    """Caches DNS lookups for a few hosts, optionally persisted to a file.
+
+    Every short-lived plugin process would otherwise resolve api.deezer.com
+    again before its first request. Once installed, socket.getaddrinfo answers
+    lookups for the cached hosts from memory (or the state file written by an
+    earlier process) for up to ttl seconds. Other hosts are resolved as usual.
+    If a lookup fails, an expired entry is served rather than nothing.
+    """
+
+    def __init__(self, hosts: Iterable[str], ttl: float = DEFAULT_TTL_SECONDS, state_path: Optional[str] = None,
+                 metrics: Optional[MetricsRecorder] = None):
+        """Initialize the cache.
+
+        Args:
+            hosts: Host names whose lookups are cached.
+            ttl: Seconds a resolved address is reused.
+            state_path: Optional file used to share lookups between processes.
+            metrics: Optional recorder timing the lookups that miss the cache.
+        """
+        self.hosts = set(hosts)
+        self.ttl = ttl
+        self.state_path = state_path
+        self.metrics = metrics if metrics is not None else NULL_METRICS
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[str, Tuple[float, List[AddrInfo]]] = {}
+        self._lock = threading.Lock()
+        self._resolve: Callable[..., List[AddrInfo]] = socket.getaddrinfo
+        self._installed = False
+        self._load()
+
+    def install(self) -> None:
+        """Routes socket.getaddrinfo through the cache."""
+        with self._lock:
+            if self._installed:
+                return
+            self._resolve = socket.getaddrinfo
+            socket.getaddrinfo = self.getaddrinfo
+            self._installed = True
+
+    def uninstall(self) -> None:
+        """Restores the original socket.getaddrinfo."""
+        with self._lock:
+            if self._installed:
+                socket.getaddrinfo = self._resolve
+                self._installed = False
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0) -> List[AddrInfo]:
+        """Drop-in replacement for socket.getaddrinfo."""
+        if host not in self.hosts:
+            return self._resolve(host, port, family, type, proto, flags)
+        key = f"{host}|{port}|{int(family)}|{int(type)}|{proto}|{flags}"
+        now = time.time()
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and now - cached[0] < self.ttl:
+                self.hits += 1
+                return list(cached[1])
+            self.misses += 1
+        try:
+            with self.metrics.stage("dns"):
+                result = self._resolve(host, port, family, type, proto, flags)
+        except socket.gaierror:
+            if cached is not None:
+                return list(cached[1])  # Resolver down, the old address most likely still works
+            raise
+        with self._lock:
+            self._entries[key] = (now, result)
+        self._save()
+        return result
+
+    # --- Shared state handling ---
+
+    def _load(self) -> None:
+        if not self.state_path:
+            return
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as state_file:
+                state = json.load(state_file)
+            for key, (resolved_at, infos) in state.items():
+                self._entries[key] = (float(resolved_at), [
+                    (socket.AddressFamily(family), socket.SocketKind(kind), proto, canonname, tuple(sockaddr))
+                    for family, kind, proto, canonname, sockaddr in infos
+                ])
+        except (OSError, ValueError, TypeError):
+            pass  # First use or corrupt file: resolve again
+
+    def _save(self) -> None:
+        if not self.state_path:
+            return
+        with self._lock:
+            state = {
+                key: [resolved_at, [
+                    [int(family), int(kind), proto, canonname, list(sockaddr)]
+                    for family, kind, proto, canonname, sockaddr in infos
+                ]]
+                for key, (resolved_at, infos) in self._entries.items()
+            }
+        tmp_path = f"{self.state_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            directory = os.path.dirname(self.state_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as state_file:
+                json.dump(state, state_file)
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            print(f"Error saving DNS cache {self.state_path}: {e}")
+
+
+_process_cache: Optional[DnsCache] = None
+_process_cache_lock = threading.Lock()
+
+
+def install(hosts: Iterable[str], ttl: float = DEFAULT_TTL_SECONDS, state_path: Optional[str] = None,
+            metrics: Optional[MetricsRecorder] = None) -> DnsCache:
+    """Installs a process-wide DnsCache, or returns the one already installed."""
+    global _process_cache
+    with _process_cache_lock:
+        if _process_cache is None:
+            _process_cache = DnsCache(hosts, ttl=ttl, state_path=state_path, metrics=metrics)
+            _process_cache.install()
+        return _process_cache
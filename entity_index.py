@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import List, Iterable, Set
+
+from models import Record, record_from_fields
+from ranking import get_compare_string
+
+DEFAULT_MAX_ENTITIES = 200000
+# Check the size cap once every this many add() calls
+_EVICT_EVERY = 100
+# Share of the search term's trigrams a candidate must contain
+MIN_TRIGRAM_OVERLAP = 0.3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entities (
+    id INTEGER PRIMARY KEY,
+    type TEXT NOT NULL,
+    deezer_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    seen_at REAL NOT NULL,
+    UNIQUE (type, deezer_id)
+);
+CREATE INDEX IF NOT EXISTS entities_seen_at ON entities (seen_at);
+CREATE TABLE IF NOT EXISTS trigrams (
+    type TEXT NOT NULL,
+    gram TEXT NOT NULL,
+    entity_id INTEGER NOT NULL,
+    PRIMARY KEY (type, gram, entity_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS trigrams_entity_id ON trigrams (entity_id);
+CREATE TRIGGER IF NOT EXISTS entities_trigrams_ad AFTER DELETE ON entities BEGIN
+    DELETE FROM trigrams WHERE entity_id = old.id;
+END;
+"""
+
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS entities_fts USING fts5(
+    name, content='entities', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS entities_ai AFTER INSERT ON entities BEGIN
+    INSERT INTO entities_fts (rowid, name) VALUES (new.id, new.name);
+END;
+CREATE TRIGGER IF NOT EXISTS entities_ad AFTER DELETE ON entities BEGIN
+    INSERT INTO entities_fts (entities_fts, rowid, name) VALUES ('delete', old.id, old.name);
+END;
+CREATE TRIGGER IF NOT EXISTS entities_au AFTER UPDATE OF name ON entities BEGIN
+    INSERT INTO entities_fts (entities_fts, rowid, name) VALUES ('delete', old.id, old.name);
+    INSERT INTO entities_fts (rowid, name) VALUES (new.id, new.name);
+END;
+"""
+
+
+def _tokens(text: str) -> List[str]:
+    return re.findall(r"\w+", text.lower())
+
+
+def trigrams(text: str) -> Set[str]:
+    """Returns the character trigrams of a normalized string.
+
+    Words are padded with spaces so that word starts and ends form their own
+    trigrams ("abc" -> " ab", "abc", "bc "). A typo only affects the few
+    trigrams around it, so similar strings still share most of them.
+    """
+    padded = f" {' '.join(_tokens(text))} "
+    return {padded[index:index + 3] for index in range(len(padded) - 2)} if padded.strip() else set()
+
+
+class EntityIndex:
+    """A persistent local index of every Deezer entity the plugin has seen.
+
+    Artists, albums, playlists and tracks from search responses are stored in
+    SQLite and indexed with FTS5 on the same string the ranking matches against
+    (see ranking.get_compare_string). Searching the index needs no network, so
+    repeated searches for the same artists and albums can be answered in a few
+    milliseconds, even offline. Without FTS5 support in the local SQLite build,
+    a slower LIKE scan is used instead.
+
+    Each name is also broken into trigrams kept in an inverted index. Typos
+    defeat the word match ("metalica"), but leave most trigrams intact, so
+    trigram overlap narrows even a large corpus down to a small candidate set
+    for fuzzy scoring.
+    """
+
+    def __init__(self, path: str, max_entities: int = DEFAULT_MAX_ENTITIES):
+        """Open (or create) the index database.
+
+        Args:
+            path: Path of the SQLite database file.
+            max_entities: Maximum number of entities kept, the least recently seen are evicted.
+        """
+        self.path = path
+        self.max_entities = max_entities
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._adds = 0
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        try:
+            self._conn.executescript(_FTS_SCHEMA)
+            self.has_fts = True
+        except sqlite3.OperationalError:  # SQLite built without FTS5
+            self.has_fts = False
+
+    def _insert_trigrams(self, entity_id: int, item_type: str, name: str) -> None:
+        """Indexes the trigrams of one entity name. Caller holds the lock."""
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO trigrams (type, gram, entity_id) VALUES (?, ?, ?)",
+            [(item_type, gram, entity_id) for gram in trigrams(name)],
+        )
+
+    def add(self, items: Iterable[Record], item_type: str) -> int:
+        """Adds or refreshes entities from a search response.
+
+        Args:
+            items: Records of one type, parsed from the API response.
+            item_type: The type of the items (track, album, artist, playlist).
+
+        Returns:
+            The number of entities written.
+        """
+        now = time.time()
+        rows = [
+            (item_type, str(item.id), get_compare_string(item, item_type),
+             json.dumps(list(item), separators=(",", ":")), now)
+            for item in items
+            if item.id is not None
+        ]
+        if not rows:
+            return 0
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO entities (type, deezer_id, name, payload, seen_at) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(type, deezer_id) DO UPDATE SET "
+                    "name = excluded.name, payload = excluded.payload, seen_at = excluded.seen_at",
+                    rows,
+                )
+                for row_type, deezer_id, name, _, _ in rows:
+                    entity_id = self._conn.execute(
+                        "SELECT id FROM entities WHERE type = ? AND deezer_id = ?", (row_type, deezer_id)
+                    ).fetchone()[0]
+                    self._conn.execute("DELETE FROM trigrams WHERE entity_id = ?", (entity_id,))
+                    self._insert_trigrams(entity_id, row_type, name)
+                self._adds += 1
+                if self._adds % _EVICT_EVERY == 0:
+                    self._evict()
+                self._conn.execute("COMMIT")
+            except sqlite3.Error:
+                self._conn.execute("ROLLBACK")
+                raise
+        return len(rows)
+
+    def _evict(self) -> None:
+        """Drops the least recently seen entities above max_entities. Caller holds the lock."""
+        count = self._conn.execute("SELECT COUNT(*) FROM entities").fetchone()[0]
+        overflow = count - self.max_entities
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM entities WHERE id IN (SELECT id FROM entities ORDER BY seen_at ASC LIMIT ?)",
+                (overflow,),
+            )
+
+    def search(self, search_term: str, item_type: str, limit: int = 50) -> List[Record]:
+        """Finds candidate entities for the search term.
+
+        Entities whose name contains all words of the search term come first
+        (the last word may be incomplete: "metall" finds "Metallica"). Remaining
+        slots are filled with typo-tolerant trigram matches. Callers rank the
+        candidates with fuzzy matching.
+
+        Args:
+            search_term: The search term.
+            item_type: The type of entity to search.
+            limit: Maximum number of candidates returned.
+
+        Returns:
+            The stored records.
+        """
+        tokens = _tokens(search_term)
+        if not tokens:
+            return []
+        with self._lock:
+            if self.has_fts:
+                # Quote each word to neutralize FTS5 syntax, prefix-match all of them
+                match = " ".join(f'"{token}"*' for token in tokens)
+                rows = self._conn.execute(
+                    "SELECT entities.id, entities.payload FROM entities_fts "
+                    "JOIN entities ON entities.id = entities_fts.rowid "
+                    "WHERE entities_fts MATCH ? AND entities.type = ? "
+                    "ORDER BY entities_fts.rank LIMIT ?",
+                    (match, item_type, limit),
+                ).fetchall()
+            else:
+                patterns = ["%" + token.replace("_", "\\_") + "%" for token in tokens]
+                conditions = " AND ".join("lower(name) LIKE ? ESCAPE '\\'" for _ in tokens)
+                rows = self._conn.execute(
+                    f"SELECT id, payload FROM entities WHERE type = ? AND {conditions} "
+                    "ORDER BY seen_at DESC LIMIT ?",
+                    (item_type, *patterns, limit),
+                ).fetchall()
+            if len(rows) < limit:
+                seen = {entity_id for entity_id, _ in rows}
+                rows += [
+                    row for row in self._trigram_candidates(search_term, item_type, limit + len(rows))
+                    if row[0] not in seen
+                ][:limit - len(rows)]
+        return [record_from_fields(json.loads(payload), item_type) for _, payload in rows]
+
+    def _trigram_candidates(self, search_term: str, item_type: str, limit: int) -> List[tuple]:
+        """Returns (id, payload) rows sharing the most trigrams with the term. Caller holds the lock."""
+        grams = sorted(trigrams(search_term))
+        if not grams:
+            return []
+        min_overlap = max(1, math.ceil(len(grams) * MIN_TRIGRAM_OVERLAP))
+        placeholders = ", ".join("?" for _ in grams)
+        return self._conn.execute(
+            "SELECT entities.id, entities.payload FROM "
+            f"(SELECT entity_id, COUNT(*) AS shared FROM trigrams WHERE type = ? AND gram IN ({placeholders}) "
+            "GROUP BY entity_id HAVING shared >= ? ORDER BY shared DESC LIMIT ?) AS matches "
+            "JOIN entities ON entities.id = matches.entity_id ORDER BY matches.shared DESC",
+            (item_type, *grams, min_overlap, limit),
+        ).fetchall()
+
+    def count(self) -> int:
+        """Returns the number of indexed entities."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entities").fetchone()[0]
+
+    def close(self) -> None:
+        """Closes the underlying database connection."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+import os
+import time
+from typing import Optional
+
+# Give up waiting for a lock file held longer than this (crashed process)
+STALE_LOCK_SECONDS = 2.0
+
+
+class LockFile:
+    """A portable inter-process lock based on exclusively creating a file.
+
+    Used as a context manager around reads and writes of state files shared
+    by the plugin processes. A lock file older than STALE_LOCK_SECONDS is
+    assumed to belong to a crashed process and taken over; if the lock file
+    cannot be created at all (read-only directory...) the block runs unlocked.
+    """
+
+    def __init__(self, path: Optional[str]):
+        """Initialize the lock.
+
+        Args:
+            path: The lock file path, None makes the lock a no-op.
+        """
+        self.path = path
+        self._held = False
+
+    def __enter__(self):
+        if self.path is None:
+            return self
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        deadline = time.monotonic() + STALE_LOCK_SECONDS
+        while True:
+            try:
+                os.close(os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                self._held = True
+                return self
+            except FileExistsError:
+                if time.monotonic() > deadline:
+                    # The holder most likely died, take the lock over
+                    try:
+                        os.remove(self.path)
+                    except OSError:
+                        pass
+                    deadline = time.monotonic() + STALE_LOCK_SECONDS
+                time.sleep(0.001)
+            except OSError:
+                return self  # Can't lock (read-only dir...), fall back to unlocked access
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._held:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+            self._held = False
+        return False
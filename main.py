@@ -1,38 +1,177 @@
 # -*- coding: utf-8 -*-
+import time
+# When the plugin's code started running, for the 'startup' and 'import' metrics
+_STARTED_AT = time.perf_counter()
 import sys
 import os
-import webbrowser
-from typing import List, Dict, Any # Added typing imports
+import json
+from typing import List, Dict, Any, Optional, Iterable, Tuple, TYPE_CHECKING # Added typing imports
 from flowlauncher import FlowLauncher, FlowLauncherAPI
-from thefuzz import fuzz
 
 # Ensure the plugin directory is in the path for local imports
 plugin_dir = os.path.dirname(__file__)
 if plugin_dir not in sys.path:
     sys.path.append(plugin_dir)
 
-from deezer_client import DeezerClient # Import the client
-from media_keys import send_play_pause, send_stop  # Import media key functions
+import plugin_daemon
+from debounce import QueryDebouncer
+from metrics import MetricsRecorder
+_IMPORTED_AT = time.perf_counter()
+
+# Heavy modules (requests, thefuzz, pynput, webbrowser) are imported on the code
+# paths that need them, so 'de stop' or the help result start up fast.
+if TYPE_CHECKING:
+    from deezer_client import DeezerClient
+    from models import Record
+    from query_log import Prediction, QueryLog
+
+# Persistent plugin data (caches etc.) lives next to the plugin
+CACHE_DIR = os.path.join(plugin_dir, "cache")
+# Set this environment variable to handle every request in-process
+DISABLE_DAEMON_ENV = "DEEZER_FLOW_NO_DAEMON"
+# Set this environment variable to record per-stage latencies (see 'de stats')
+METRICS_ENV = "DEEZER_FLOW_METRICS"
+# Set this environment variable to a file path to record API responses there
+# (see cassette.py and benchmarks/replay_queries.py)
+CASSETTE_ENV = "DEEZER_FLOW_CASSETTE"
+
+def read_rpc_request() -> Dict[str, Any]:
+    """Returns the JSON-RPC request Flow Launcher passed on the command line."""
+    if len(sys.argv) > 1:
+        return json.loads(sys.argv[1])
+    return {"method": "query", "parameters": [""]}
 
-# TODO: Potentially import fuzzy search library
 
 class DeezerControl(FlowLauncher):
     """Flow Launcher plugin to interact with Deezer."""
 
     # Define constant for max results per type
     MAX_RESULTS_PER_TYPE = 3
+    # Items requested per type from the API. None asks for Deezer's default
+    # page (25), which gives fuzzy ranking and prefix reuse more candidates;
+    # MAX_RESULTS_PER_TYPE minimizes payload size and JSON parsing instead.
+    API_RESULT_LIMIT: Optional[int] = None
+    # Order in which result types are listed in Flow Launcher
+    RESULT_TYPE_ORDER = ("artist", "album", "playlist", "track")
+    # Types searched by each search command, and by a query without a command
+    COMMAND_SEARCH_TYPES = {
+        "play": ("track", "album", "artist"),  # Prioritize tracks
+        "artist": ("artist",),
+        "album": ("album",),
+        "playlist": ("playlist",),
+    }
+    GENERAL_SEARCH_TYPES = ("track", "artist", "album", "playlist")
+    # Wait this long for a newer keystroke before searching (0 disables debouncing)
+    DEBOUNCE_SECONDS = 0.15
+    # Reuse results cached for a shorter prefix of the query ("metalli" -> "metallic")
+    PREFIX_MIN_LENGTH = 3
+    # Minimum fuzzy score for a cached item to count as a match for the longer query
+    PREFIX_MIN_SCORE = 60
+    # Cached prefix results older than this are still shown, but refreshed in the background
+    PREFIX_REFRESH_AGE = 10 * 60
+    # A type is answered from the local entity index, without the API, when it
+    # has MAX_RESULTS_PER_TYPE entities scoring at least this much
+    LOCAL_INDEX_MIN_SCORE = 85
+    # Candidates fetched from the local entity index per type
+    LOCAL_INDEX_CANDIDATES = 50
+    # Answer tracks, artists and albums from one generic /search request (plus
+    # one for playlists) instead of one request per type: fewer requests per
+    # keystroke and less quota, but artists and albums only show up through
+    # their matching tracks. See DeezerClient.search_combined.
+    SINGLE_CALL_SEARCH = False
+    # Open an API connection in the background when the daemon starts, so the
+    # first search it serves skips DNS, TCP and TLS setup. Short-lived plugin
+    # processes don't: their request would rarely outlive the handshake.
+    WARM_UP_CONNECTIONS = True
+    # Results chosen before for a query starting with what has been typed are
+    # listed first, from this many typed characters on (see QueryLog)
+    PREDICTION_MIN_LENGTH = 2
+    # Most likely queries refreshed in the search cache when the daemon starts or idles
+    PREFETCH_QUERY_COUNT = 5
+    # The only methods a JSON-RPC request may call (see handle_request)
+    RPC_METHODS = ("query", "context_menu", "open_url", "play_pause_desktop", "stop_desktop")
+
+    def __init__(self, dispatch: bool = True, cache_dir: Optional[str] = None):
+        """Initialize the plugin and Deezer client.
+
+        Args:
+            dispatch: Handle the JSON-RPC request from the command line right away.
+                The daemon passes False and calls handle_request for each request.
+            cache_dir: Directory for the plugin's caches, logs and state files,
+                defaults to CACHE_DIR.
+        """
+        self.cache_dir = cache_dir if cache_dir is not None else CACHE_DIR
+        # DeezerClient is created on first use (see the deezer property),
+        # commands that never search don't pay for importing requests
+        self._deezer: Optional["DeezerClient"] = None
+        self._query_log: Optional["QueryLog"] = None
+        self.debouncer = QueryDebouncer(self.DEBOUNCE_SECONDS, os.path.join(self.cache_dir, "latest_query"))
+        self.metrics = MetricsRecorder(os.path.join(self.cache_dir, "metrics.json"), enabled=bool(os.environ.get(METRICS_ENV)))
+        self.debugMessage = ""
+        # From main.py starting to run until the first request is handled:
+        # module imports, then setting up the plugin. The interpreter's own
+        # start-up, before main.py runs, can't be timed from Python.
+        self.metrics.record("import", _IMPORTED_AT - _STARTED_AT)
+        self.metrics.record("startup", time.perf_counter() - _STARTED_AT)
+        if dispatch:
+            # Not FlowLauncher.__init__: it looks the method up by reading every
+            # attribute, which would create the lazy client and query log
+            response = self.handle_request(read_rpc_request())
+            if response is not None:
+                print(json.dumps(response))
+
+    @property
+    def deezer(self) -> "DeezerClient":
+        """The Deezer API client, created on first access."""
+        if self._deezer is None:
+            with self.metrics.stage("client_init"):
+                self._deezer = self._create_client()
+        return self._deezer
+
+    @deezer.setter
+    def deezer(self, client: "DeezerClient"):
+        self._deezer = client
 
-    def __init__(self):
-        """Initialize the plugin and Deezer client."""
-        # Initialize DeezerClient *before* calling super init
-        # to ensure it exists if super init calls query
-        self.deezer = DeezerClient()
-        super().__init__()
-        # Initialize DeezerClient (no auth token needed for basic search)
-        # self.deezer = DeezerClient()
-
-    def _format_result(self, item: Dict[str, Any], item_type: str) -> Dict[str, Any]:
-        """Helper function to format a Deezer item for Flow Launcher."""
+    @property
+    def query_log(self) -> "QueryLog":
+        """The log of queries and chosen results, opened on first access."""
+        if self._query_log is None:
+            from query_log import QueryLog
+            self._query_log = QueryLog(os.path.join(self.cache_dir, "query_log.sqlite3"))
+        return self._query_log
+
+    def _create_client(self) -> "DeezerClient":
+        """Imports and sets up the Deezer API client with its caches."""
+        from urllib.parse import urlparse
+        from deezer_client import DeezerClient, DEEZER_API_BASE
+        import dns_cache
+        from rate_limiter import TokenBucket
+        from search_cache import SearchCache
+        from entity_index import EntityIndex
+        # Reuse the API's address resolved by earlier plugin processes
+        dns_cache.install([urlparse(DEEZER_API_BASE).hostname], state_path=os.path.join(self.cache_dir, "dns.json"),
+                          metrics=self.metrics)
+        # No auth token needed for basic search. The rate limit budget
+        # is shared with the other plugin processes through the cache directory.
+        client = DeezerClient(
+            cache=SearchCache(os.path.join(self.cache_dir, "search_cache.sqlite3")),
+            rate_limiter=TokenBucket(state_path=os.path.join(self.cache_dir, "rate_limit.json")),
+            entity_index=EntityIndex(os.path.join(self.cache_dir, "entities.sqlite3")),
+            metrics=self.metrics,
+        )
+        cassette_path = os.environ.get(CASSETTE_ENV)
+        if cassette_path:
+            import cassette
+            cassette.mount(client.session, cassette.CassetteStore(cassette_path), cassette.RECORD, client.api_base)
+        return client
+
+    def _format_result(self, item: "Record", item_type: str, query: Optional[str] = None,
+                       stale: bool = False) -> Dict[str, Any]:
+        """Helper function to format a Deezer item for Flow Launcher.
+
+        With the query, choosing the result also logs it (see open_url).
+        Stale items (served from an expired cache entry) are marked as such.
+        """
         result = {
             "Title": "Unknown Item",
             "SubTitle": f"Type: {item_type}",
@@ -42,55 +181,219 @@ class DeezerControl(FlowLauncher):
         url = self.deezer.get_item_url(item)
 
         if item_type == "artist":
-            result["Title"] = item.get("name", "Unknown Artist")
+            result["Title"] = item.name or "Unknown Artist"
             result["SubTitle"] = "Artist"
         elif item_type == "album":
-            artist_name = item.get('artist', {}).get('name', 'Unknown Artist')
-            result["Title"] = f"{item.get('title', 'Unknown Album')} by {artist_name}"
+            artist_name = item.artist_name or "Unknown Artist"
+            result["Title"] = f"{item.title or 'Unknown Album'} by {artist_name}"
             result["SubTitle"] = "Album"
         elif item_type == "playlist":
-            creator_name = item.get('user', {}).get('name', 'Unknown Creator')
-            result["Title"] = f"{item.get('title', 'Unknown Playlist')} by {creator_name}"
+            creator_name = item.creator_name or "Unknown Creator"
+            result["Title"] = f"{item.title or 'Unknown Playlist'} by {creator_name}"
             result["SubTitle"] = "Playlist"
         elif item_type == "track":
-            artist_name = item.get('artist', {}).get('name', 'Unknown Artist')
-            album_title = item.get('album', {}).get('title', 'Unknown Album')
-            result["Title"] = f"{item.get('title', 'Unknown Track')} by {artist_name}"
+            artist_name = item.artist_name or "Unknown Artist"
+            album_title = item.album_title or "Unknown Album"
+            result["Title"] = f"{item.title or 'Unknown Track'} by {artist_name}"
             result["SubTitle"] = f"Track from {album_title}"
 
         if url:
             result["JsonRPCAction"] = {
                 "method": "open_url",
-                "parameters": [url]
+                "parameters": [url] + ([query, item_type, list(item)] if query else [])
             }
         else:
             # Disable action if no URL found
             result["SubTitle"] += " (No URL found)"
+        if stale:
+            result["SubTitle"] += " (possibly stale)"
 
         return result
 
-    def _fuzzy_sort(self, items: List[Dict[str, Any]], search_term: str, item_type: str) -> List[Dict[str, Any]]:
-        """Sorts items by fuzzy similarity to the search term."""
-        def get_compare_string(item: Dict[str, Any]) -> str:
-            if item_type == "artist":
-                return item.get("name", "")
-            elif item_type == "album":
-                return item.get("title", "") + " " + item.get("artist", {}).get("name", "")
-            elif item_type == "playlist":
-                return item.get("title", "") + " " + item.get("user", {}).get("name", "")
-            elif item_type == "track":
-                return item.get("title", "") + " " + item.get("artist", {}).get("name", "")
-            return ""
-        # Score and sort
-        scored = [
-            (item, fuzz.token_set_ratio(search_term.lower(), get_compare_string(item).lower()))
-            for item in items
-        ]
-        scored.sort(key=lambda x: x[1], reverse=True)
-        return [item for item, score in scored]
+    def _fuzzy_sort(self, items: Iterable["Record"], search_term: str, item_type: str,
+                    k: Optional[int] = None, min_score: int = 0, stop_score: int = 100) -> List["Record"]:
+        """Returns the k items most similar to the search term, best first.
+
+        Items are streamed through a bounded heap (see ranking.top_k), so this
+        stays cheap for thousands of candidates and stops consuming `items`
+        once k items scoring at least stop_score have been found.
+        """
+        from ranking import top_k
+
+        return top_k(search_term, items, item_type, k=k, min_score=min_score, stop_score=stop_score)
+
+    def _search_local_index(self, search_term: str, search_types: List[str]
+                            ) -> Tuple[Dict[str, List["Record"]], Dict[str, List["Record"]]]:
+        """Answers searches from the local index of previously seen entities.
+
+        Types answered from the index are still searched in the background
+        (a cache hit when the search is fresh), so the index picks up what the
+        API returns now instead of repeating what it returned once.
+
+        Args:
+            search_term: The search term.
+            search_types: Types to search.
+
+        Returns:
+            Two dictionaries mapping types to ranked items: the types the index
+            answers confidently (no API call needed), and weaker matches for the
+            other types, used when the API is unreachable.
+        """
+        answered = {}
+        fallback = {}
+        for item_type in search_types:
+            candidates = self.deezer.search_local(search_term, item_type, limit=self.LOCAL_INDEX_CANDIDATES)
+            if not candidates:
+                continue
+            confident = self._fuzzy_sort(
+                candidates, search_term, item_type, k=self.MAX_RESULTS_PER_TYPE, min_score=self.LOCAL_INDEX_MIN_SCORE
+            )
+            if len(confident) == self.MAX_RESULTS_PER_TYPE:
+                answered[item_type] = confident
+                continue
+            weak = self._fuzzy_sort(
+                candidates, search_term, item_type, k=self.MAX_RESULTS_PER_TYPE, min_score=self.PREFIX_MIN_SCORE
+            )
+            if weak:
+                fallback[item_type] = weak
+        if answered:
+            self.deezer.prefetch(search_term, list(answered), limit=self.API_RESULT_LIMIT,
+                                 combined=self.SINGLE_CALL_SEARCH)
+        return answered, fallback
+
+    def _search_from_prefix(self, search_term: str, search_types: List[str]) -> Dict[str, List["Record"]]:
+        """Answers searches locally from results cached for a prefix of the search term.
+
+        The cached items are re-ranked against the longer term and returned
+        straight away. If too few of them still match, or they are getting old,
+        the full search is refreshed in the background for the next keystroke.
+
+        Args:
+            search_term: The search term.
+            search_types: Types to answer.
+
+        Returns:
+            A dictionary mapping each type that could be answered locally to its ranked items.
+        """
+        from search_cache import normalize_query
+
+        local_results = {}
+        refresh_types = []
+        for item_type in search_types:
+            entry = self.deezer.search_cached_prefix(
+                search_term, item_type, min_length=self.PREFIX_MIN_LENGTH, limit=self.API_RESULT_LIMIT,
+                combined=self.SINGLE_CALL_SEARCH,
+            )
+            if entry is None:
+                continue
+            items = entry.data
+            if entry.query == normalize_query(search_term):
+                local_results[item_type] = items  # Exact cache hit
+                continue
+            ranked = self._fuzzy_sort(
+                items, search_term, item_type, k=self.MAX_RESULTS_PER_TYPE, min_score=self.PREFIX_MIN_SCORE
+            )
+            if not ranked:
+                continue  # Nothing useful locally, search the API right away
+            local_results[item_type] = ranked
+            if len(ranked) < self.MAX_RESULTS_PER_TYPE or entry.age > self.PREFIX_REFRESH_AGE:
+                refresh_types.append(item_type)
+        if refresh_types:
+            self.deezer.prefetch(search_term, refresh_types, limit=self.API_RESULT_LIMIT, combined=self.SINGLE_CALL_SEARCH)
+        return local_results
+
+    def _search_types(self, query: str) -> Tuple[str, Tuple[str, ...]]:
+        """Returns the search term and the types a search query looks for."""
+        command, _, search_term = query.partition(" ")
+        if command in self.COMMAND_SEARCH_TYPES and search_term:
+            return search_term, self.COMMAND_SEARCH_TYPES[command]
+        return query, self.GENERAL_SEARCH_TYPES
+
+    def _predict(self, query: str, search_types: List[str]) -> List["Prediction"]:
+        """Returns the results chosen before for queries starting with this one, best first."""
+        import sqlite3
+
+        if len(query) < self.PREDICTION_MIN_LENGTH:
+            return []
+        try:
+            predictions = self.query_log.predict(query, limit=self.MAX_RESULTS_PER_TYPE)
+        except sqlite3.Error as e:
+            print(f"Error reading query log: {e}")
+            return []
+        return [prediction for prediction in predictions if prediction.item_type in search_types]
+
+    def _prefetch_likely_queries(self) -> None:
+        """Refreshes the search cache (and entity index) for the most likely queries.
+
+        Run when the daemon starts and when it idles, so the usual searches of
+        a session are answered locally from the first keystrokes on.
+        """
+        import sqlite3
+
+        try:
+            likely_queries = self.query_log.likely_queries(self.PREFETCH_QUERY_COUNT)
+        except sqlite3.Error as e:
+            print(f"Error reading query log: {e}")
+            return
+        for query, _ in likely_queries:
+            search_term, search_types = self._search_types(query)
+            self.deezer.prefetch(search_term, search_types, limit=self.API_RESULT_LIMIT, combined=self.SINGLE_CALL_SEARCH)
+
+    def _search_cache_stats(self) -> Optional[Dict[str, int]]:
+        """Returns the search cache counters, opening the cache if no client did yet."""
+        if self._deezer is not None and self._deezer.cache is not None:
+            return self._deezer.cache.stats()
+        path = os.path.join(self.cache_dir, "search_cache.sqlite3")
+        if not os.path.exists(path):
+            return None
+        from search_cache import SearchCache
+        cache = SearchCache(path)
+        try:
+            return cache.stats()
+        finally:
+            cache.close()
+
+    def _stats_results(self) -> List[Dict[str, Any]]:
+        """Lists the latency percentiles of each recorded stage, for 'de stats'."""
+        results = []
+        if not self.metrics.enabled:
+            results.append({
+                "Title": "Deezer Control: latency metrics are off",
+                "SubTitle": f"Set the {METRICS_ENV} environment variable to 1 and restart Flow Launcher to record them",
+                "IcoPath": "Icons\\app.png"
+            })
+        for stage, samples, percentiles in self.metrics.summary():
+            p50, p95, p99 = (percentiles[percent] * 1000 for percent in (50, 95, 99))
+            results.append({
+                "Title": f"{stage}: p50 {p50:.1f} ms, p95 {p95:.1f} ms, p99 {p99:.1f} ms",
+                "SubTitle": f"{samples} samples",
+                "IcoPath": "Icons\\app.png"
+            })
+        stats = self._search_cache_stats()
+        if stats is not None:
+            results.append({
+                "Title": f"Search cache: {stats['hits']} hits, {stats['stale_hits']} stale hits, {stats['misses']} misses",
+                "SubTitle": f"{stats['entries']} entries, {stats['not_modified']} revalidated, "
+                            f"{stats['bytes_saved'] / 1024:.0f} KiB saved by revalidation",
+                "IcoPath": "Icons\\app.png"
+            })
+        if not results:
+            results.append({
+                "Title": "Deezer Control: no latencies recorded yet",
+                "SubTitle": "Search for something first",
+                "IcoPath": "Icons\\app.png"
+            })
+        return results
 
     def query(self, query: str) -> list:
         """Handle user queries from Flow Launcher."""
+        with self.metrics.stage("query"):
+            results = self._run_query(query)
+        self.metrics.flush()
+        return results
+
+    def _run_query(self, query: str) -> list:
+        """Builds the results for a query; see query."""
         results = []
         query = query.strip() # Clean query
 
@@ -124,13 +427,9 @@ class DeezerControl(FlowLauncher):
                  return results
              else:
                  # 'play <term>' searches tracks primarily
-                 search_types_to_run = ["track", "album", "artist"] # Prioritize tracks
-        elif command == "artist":
-            if search_term: search_types_to_run = ["artist"]
-        elif command == "album":
-            if search_term: search_types_to_run = ["album"]
-        elif command == "playlist":
-            if search_term: search_types_to_run = ["playlist"]
+                 search_types_to_run = list(self.COMMAND_SEARCH_TYPES[command])
+        elif command in ("artist", "album", "playlist"):
+            if search_term: search_types_to_run = list(self.COMMAND_SEARCH_TYPES[command])
         elif command == "stop":
              results.append({
                     "Title": "Stop Deezer Desktop App",
@@ -153,10 +452,12 @@ class DeezerControl(FlowLauncher):
                     }
                 })
              return results
+        elif command == "stats" and not search_term:
+            return self._stats_results()
         else:
             # No specific command, assume general search (treat whole query as search term)
             search_term = query
-            search_types_to_run = ["track", "artist", "album", "playlist"]
+            search_types_to_run = list(self.GENERAL_SEARCH_TYPES)
 
         if not search_term:
             results.append({
@@ -165,30 +466,58 @@ class DeezerControl(FlowLauncher):
                 })
             return results
 
-        # Perform searches
-        # TODO: Consider running searches concurrently if performance is an issue
-        found_items = []
-        if "artist" in search_types_to_run:
-            artists = self.deezer.search_artists(search_term)
-            artists = self._fuzzy_sort(artists, search_term, "artist")
-            found_items.extend([(item, "artist") for item in artists[:self.MAX_RESULTS_PER_TYPE]])
-        if "album" in search_types_to_run:
-            albums = self.deezer.search_albums(search_term)
-            albums = self._fuzzy_sort(albums, search_term, "album")
-            found_items.extend([(item, "album") for item in albums[:self.MAX_RESULTS_PER_TYPE]])
-        if "playlist" in search_types_to_run:
-            playlists = self.deezer.search_playlists(search_term)
-            playlists = self._fuzzy_sort(playlists, search_term, "playlist")
-            found_items.extend([(item, "playlist") for item in playlists[:self.MAX_RESULTS_PER_TYPE]])
-        if "track" in search_types_to_run:
-            tracks = self.deezer.search(search_term, search_type="track")
-            tracks = self._fuzzy_sort(tracks, search_term, "track")
-            found_items.extend([(item, "track") for item in tracks[:self.MAX_RESULTS_PER_TYPE]])
+        # Answer from the local entity index and earlier keystrokes where
+        # possible, without any network wait
+        ticket = self.debouncer.begin(query)
+        with self.metrics.stage("predict"):
+            predictions = self._predict(query, search_types_to_run)
+        with self.metrics.stage("local_index"):
+            search_results, local_fallback = self._search_local_index(search_term, search_types_to_run)
+        with self.metrics.stage("prefix_cache"):
+            search_results.update(self._search_from_prefix(
+                search_term, [item_type for item_type in search_types_to_run if item_type not in search_results]
+            ))
+        remaining_types = [item_type for item_type in search_types_to_run if item_type not in search_results]
+        if remaining_types:
+            # Skip queries the user has already typed past; Flow Launcher
+            # ignores results for outdated queries anyway
+            with self.metrics.stage("debounce"):
+                current = self.debouncer.wait(ticket)
+            if not current:
+                return results
+            # Search the remaining types (all requested concurrently)
+            search = self.deezer.search_combined if self.SINGLE_CALL_SEARCH else self.deezer.search_many
+            with self.metrics.stage("api"):
+                search_results.update(search(
+                    search_term, remaining_types, cancelled=lambda: self.debouncer.is_stale(ticket),
+                    limit=self.API_RESULT_LIMIT,
+                ))
+            if self.debouncer.discard(ticket):
+                return results
+            # Offline or API failing: fall back to weaker local matches
+            for item_type, items in local_fallback.items():
+                if not search_results.get(item_type):
+                    search_results[item_type] = items
+
+        # Rank the candidates of all types in one batch
+        from ranking import rank_batch
+
+        with self.metrics.stage("rank"):
+            ranked = rank_batch(search_term, search_results, self.MAX_RESULTS_PER_TYPE)
+        found_items = [(prediction.record, prediction.item_type, False) for prediction in predictions]
+        predicted = {(item_type, item.id) for item, item_type, _ in found_items}
+        for item_type in self.RESULT_TYPE_ORDER:
+            if item_type in ranked:
+                found_items.extend([
+                    (item, item_type, ranked[item_type].stale)
+                    for item in ranked[item_type] if (item_type, item.id) not in predicted
+                ])
 
         # Format results
         if found_items:
-            for item, item_type in found_items:
-                 results.append(self._format_result(item, item_type))
+            with self.metrics.stage("format"):
+                for item, item_type, stale in found_items:
+                     results.append(self._format_result(item, item_type, query, stale))
         else:
             results.append({
                 "Title": f"No Deezer results found for '{search_term}'",
@@ -198,20 +527,88 @@ class DeezerControl(FlowLauncher):
 
         return results
 
-    def open_url(self, url: str):
-        """Opens the specified URL in the default web browser."""
+    def handle_request(self, rpc_request: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Dispatches a JSON-RPC request forwarded by the plugin daemon.
+
+        Does what FlowLauncher.__init__ does, but returns the response instead
+        of printing it, and only looks up the allowed RPC methods.
+
+        Args:
+            rpc_request: The request as sent by Flow Launcher.
+
+        Returns:
+            The response payload for 'query'/'context_menu', None for actions.
+        """
+        method_name = rpc_request.get("method", "query")
+        parameters = rpc_request.get("parameters", [])
+        if method_name not in self.RPC_METHODS:
+            raise ValueError(f"Method not allowed: {method_name}")
+        self.debugMessage = ""
+        results = getattr(self, method_name)(*parameters)
+        if method_name in ("query", "context_menu"):
+            return {"result": results, "debugMessage": self.debugMessage}
+        return None
+
+    def open_url(self, url: str, query: Optional[str] = None, item_type: Optional[str] = None,
+                 fields: Optional[List[Any]] = None):
+        """Opens the specified URL in the default web browser.
+
+        Results of a search also pass their query, type and record fields,
+        which are logged so the result can be predicted next time.
+        """
+        import webbrowser
         webbrowser.open(url)
+        if query and item_type and fields:
+            import sqlite3
+            from models import record_from_fields
+            try:
+                self.query_log.record_choice(query, item_type, record_from_fields(fields, item_type))
+            except (sqlite3.Error, TypeError) as e:
+                print(f"Error logging chosen result: {e}")
         # Optional: Show brief confirmation (can be annoying)
         # FlowLauncherAPI.show_msg("Opening Deezer", f"Navigating to {url}")
 
     # Add RPC methods for FlowLauncher to call
     def play_pause_desktop(self):
         """Send Play/Pause media key to the OS (Deezer Desktop App)."""
+        from media_keys import send_play_pause
         send_play_pause()
 
     def stop_desktop(self):
         """Send Stop media key to the OS (Deezer Desktop App)."""
+        from media_keys import send_stop
         send_stop()
 
+def run_daemon():
+    """Serves forwarded requests from a single long-lived plugin instance."""
+    if plugin_daemon.is_running(CACHE_DIR):
+        return  # Another daemon won the race
+    plugin = DeezerControl(dispatch=False)
+    plugin.deezer  # Pay the client's imports and setup up front
+    if plugin.WARM_UP_CONNECTIONS:
+        plugin.deezer.warm_up()
+    plugin._prefetch_likely_queries()
+    plugin_daemon.DaemonServer(plugin.handle_request, CACHE_DIR, on_idle=plugin._prefetch_likely_queries).run()
+
+
+def main():
+    """Plugin entry point: forward to the daemon, or handle the request in-process."""
+    if sys.argv[1:] == ["--daemon"]:
+        run_daemon()
+        return
+    if os.environ.get(DISABLE_DAEMON_ENV):
+        DeezerControl()
+        return
+
+    try:
+        response = plugin_daemon.forward(read_rpc_request(), CACHE_DIR)
+    except plugin_daemon.DaemonUnavailable:
+        # Answer this request ourselves while the daemon warms up for the next one
+        plugin_daemon.start_daemon(os.path.abspath(__file__), CACHE_DIR)
+        DeezerControl()
+        return
+    if response is not None:
+        print(json.dumps(response))
+
 if __name__ == "__main__":
-    DeezerControl() 
\ No newline at end of file
+    main() 
\ No newline at end of file
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from file_lock import LockFile
+
+# Values are bucketed with SUB_BUCKET_BITS bits of precision (about 6% relative error)
+SUB_BUCKET_BITS = 4
+_SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+# Samples older than two windows are dropped
+DEFAULT_WINDOW_SECONDS = 24 * 60 * 60
+PERCENTILES = (50, 95, 99)
+
+
+def _bucket_index(value: int) -> int:
+    """Maps a non-negative integer to its log-linear bucket."""
+    if value < 2 * _SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    return shift * _SUB_BUCKETS + (value >> shift)
+
+
+def _bucket_range(index: int) -> Tuple[int, int]:
+    """Returns the lowest and highest value of a bucket."""
+    if index < 2 * _SUB_BUCKETS:
+        return index, index
+    shift = index // _SUB_BUCKETS - 1
+    mantissa = index - shift * _SUB_BUCKETS
+    return mantissa << shift, ((mantissa + 1) << shift) - 1
+
+
+class Histogram:
+    """An HDR-style latency histogram with log-linear buckets.
+
+    Recording a sample is a dictionary increment and memory stays small no
+    matter how many samples are recorded, at the price of about 6% error on
+    the reported percentiles. Values are kept in microseconds.
+    """
+
+    def __init__(self, counts: Optional[Dict[int, int]] = None):
+        self.counts: Dict[int, int] = dict(counts or {})
+
+    @property
+    def total(self) -> int:
+        """The number of recorded samples."""
+        return sum(self.counts.values())
+
+    def record(self, seconds: float) -> None:
+        """Records one sample, in seconds."""
+        index = _bucket_index(max(0, round(seconds * 1e6)))
+        self.counts[index] = self.counts.get(index, 0) + 1
+
+    def merge(self, other: "Histogram") -> "Histogram":
+        """Returns a new histogram holding the samples of both."""
+        merged = Histogram(self.counts)
+        for index, count in other.counts.items():
+            merged.counts[index] = merged.counts.get(index, 0) + count
+        return merged
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """Returns the value (in seconds) below which `percent` of the samples fall, None if empty."""
+        total = self.total
+        if not total:
+            return None
+        rank = max(1, round(total * percent / 100))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                low, high = _bucket_range(index)
+                return (low + high) / 2 / 1e6
+        return None
+
+    def to_json(self) -> Dict[str, int]:
+        """Returns the bucket counts in a JSON-serializable form."""
+        return {str(index): count for index, count in self.counts.items()}
+
+    @classmethod
+    def from_json(cls, data: Dict[str, int]) -> "Histogram":
+        """Rebuilds a histogram saved with to_json."""
+        return cls({int(index): int(count) for index, count in data.items()})
+
+
+class MetricsRecorder:
+    """Times the stages of a search and keeps rolling per-stage histograms.
+
+    Samples are collected in memory and merged into a JSON metrics file by
+    flush(), so that every plugin process (and the daemon) adds to the same
+    statistics. The file keeps the current and the previous window of
+    samples, so percentiles cover between one and two windows of history.
+
+    A disabled recorder (the default, see DeezerControl) times nothing and
+    never touches the file.
+    """
+
+    def __init__(self, path: Optional[str] = None, enabled: bool = True,
+                 window: float = DEFAULT_WINDOW_SECONDS):
+        """Initialize the recorder.
+
+        Args:
+            path: Metrics file the samples are flushed to, None keeps them in memory.
+            enabled: Record samples; a disabled recorder costs next to nothing.
+            window: Length of a histogram window in seconds.
+        """
+        self.path = path
+        self.enabled = enabled
+        self.window = window
+        self._pending: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float) -> None:
+        """Records the duration of one stage."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._pending.setdefault(stage, Histogram()).record(seconds)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Times the enclosed block as one sample of the named stage."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def flush(self) -> None:
+        """Merges the samples recorded since the last flush into the metrics file.
+
+        The file is locked while it is read, merged and rewritten, so that
+        concurrent flushes from several processes don't lose each other's samples.
+        """
+        if not self.enabled or not self.path:
+            return
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        with LockFile(f"{self.path}.lock"):
+            self._merge(pending)
+
+    def _merge(self, pending: Dict[str, Histogram]) -> None:
+        """Adds histograms to the metrics file. Caller holds the file lock."""
+        state = self._load()
+        now = time.time()
+        if now - state["window_start"] >= self.window:
+            state = {"window_start": now, "previous": state["current"], "current": {}}
+        for name, histogram in pending.items():
+            current = Histogram.from_json(state["current"].get(name, {}))
+            state["current"][name] = current.merge(histogram).to_json()
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as metrics_file:
+                json.dump(state, metrics_file)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Error saving metrics {self.path}: {e}")
+
+    def histograms(self) -> Dict[str, Histogram]:
+        """Returns the histograms of all stages: the metrics file plus unflushed samples."""
+        state = self._load() if self.path else {"current": {}, "previous": {}}
+        merged: Dict[str, Histogram] = {}
+        for window in (state["previous"], state["current"]):
+            for name, counts in window.items():
+                merged[name] = merged.get(name, Histogram()).merge(Histogram.from_json(counts))
+        with self._lock:
+            for name, histogram in self._pending.items():
+                merged[name] = merged.get(name, Histogram()).merge(histogram)
+        return merged
+
+    def summary(self) -> List[Tuple[str, int, Dict[int, Optional[float]]]]:
+        """Returns (stage, samples, {percentile: seconds}) for every stage, by stage name."""
+        return [
+            (name, histogram.total, {percent: histogram.percentile(percent) for percent in PERCENTILES})
+            for name, histogram in sorted(self.histograms().items())
+        ]
+
+    def _load(self) -> Dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as metrics_file:
+                state = json.load(metrics_file)
+            if time.time() - state["window_start"] >= 2 * self.window:
+                raise ValueError("Metrics are older than two windows")
+            return {"window_start": float(state["window_start"]),
+                    "current": dict(state["current"]), "previous": dict(state["previous"])}
+        except (OSError, ValueError, KeyError, TypeError):
+            return {"window_start": time.time(), "current": {}, "previous": {}}
+
+
+# Shared disabled recorder, the default wherever metrics are optional
+NULL_METRICS = MetricsRecorder(enabled=False)
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""Compact records for Deezer search results.
+
+The API returns dozens of keys per item (picture URLs, preview links, explicit
+flags, nested artist/album objects...). The plugin only needs a handful, so
+responses are parsed into these NamedTuples (which carry no per-instance
+__dict__), keeping memory low once results are cached or indexed.
+"""
+from typing import List, Dict, Any, NamedTuple, Optional, Union, Iterable
+
+# Web links are built from ids for objects embedded without one
+DEEZER_WEB_BASE = "https://www.deezer.com"
+
+
+class Artist(NamedTuple):
+    id: int
+    name: str
+    link: Optional[str]
+
+
+class Album(NamedTuple):
+    id: int
+    title: str
+    artist_name: str
+    link: Optional[str]
+
+
+class Playlist(NamedTuple):
+    id: int
+    title: str
+    creator_name: str
+    link: Optional[str]
+
+
+class Track(NamedTuple):
+    id: int
+    title: str
+    artist_name: str
+    album_title: str
+    link: Optional[str]
+
+
+Record = Union[Artist, Album, Playlist, Track]
+
+RECORD_TYPES = {"artist": Artist, "album": Album, "playlist": Playlist, "track": Track}
+
+
+def _nested_name(item: Dict[str, Any], key: str, field: str) -> str:
+    nested = item.get(key)
+    return (nested.get(field) or "") if isinstance(nested, dict) else ""
+
+
+def parse_item(item: Dict[str, Any], item_type: str) -> Record:
+    """Parses one raw API item into its compact record.
+
+    Args:
+        item: A track, album, artist or playlist as returned by the API.
+        item_type: The type of the item. Unknown types (the generic /search
+            endpoint) are parsed as tracks.
+
+    Returns:
+        The record holding only the fields the plugin uses.
+    """
+    item_id = item.get("id")
+    link = item.get("link")
+    if item_type == "artist":
+        return Artist(item_id, item.get("name") or "", link)
+    if item_type == "album":
+        return Album(item_id, item.get("title") or "", _nested_name(item, "artist", "name"), link)
+    if item_type == "playlist":
+        return Playlist(item_id, item.get("title") or "", _nested_name(item, "user", "name"), link)
+    return Track(
+        item_id, item.get("title") or "", _nested_name(item, "artist", "name"),
+        _nested_name(item, "album", "title"), link,
+    )
+
+
+def parse_items(items: Iterable[Dict[str, Any]], item_type: str) -> List[Record]:
+    """Parses a list of raw API items (a response's 'data') into records."""
+    return [parse_item(item, item_type) for item in items]
+
+
+def embedded_artists(tracks: Iterable[Dict[str, Any]]) -> List[Artist]:
+    """Collects the distinct artists embedded in raw track items, in order of first appearance."""
+    artists: Dict[Any, Artist] = {}
+    for track in tracks:
+        artist = track.get("artist")
+        if isinstance(artist, dict) and artist.get("id") is not None and artist["id"] not in artists:
+            artists[artist["id"]] = Artist(
+                artist["id"], artist.get("name") or "",
+                artist.get("link") or f"{DEEZER_WEB_BASE}/artist/{artist['id']}",
+            )
+    return list(artists.values())
+
+
+def embedded_albums(tracks: Iterable[Dict[str, Any]]) -> List[Album]:
+    """Collects the distinct albums embedded in raw track items, in order of first appearance.
+
+    Embedded albums carry no artist, the artist of the track is used.
+    """
+    albums: Dict[Any, Album] = {}
+    for track in tracks:
+        album = track.get("album")
+        if isinstance(album, dict) and album.get("id") is not None and album["id"] not in albums:
+            albums[album["id"]] = Album(
+                album["id"], album.get("title") or "", _nested_name(track, "artist", "name"),
+                album.get("link") or f"{DEEZER_WEB_BASE}/album/{album['id']}",
+            )
+    return list(albums.values())
+
+
+def record_from_fields(fields: List[Any], item_type: str) -> Record:
+    """Rebuilds a record from its field values, e.g. as stored with json.dumps(list(record))."""
+    return RECORD_TYPES.get(item_type, Track)(*fields)
+
+
+class SearchResults(list):
+    """The records of one search, flagged when they may be out of date.
+
+    A plain list of records, with `stale` set when they were served from an
+    expired cache entry (while a refresh runs in the background, or because
+    the API could not be reached).
+    """
+
+    def __init__(self, records: Iterable[Record] = (), stale: bool = False):
+        super().__init__(records)
+        self.stale = stale
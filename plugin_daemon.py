@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""Resident plugin daemon and the thin client used by main.py to reach it.
+
+Flow Launcher starts a fresh Python process for every keystroke. The daemon
+keeps one DeezerControl instance (with its HTTP connection pool and caches)
+alive and answers JSON-RPC requests forwarded over a local TCP socket, so the
+per-keystroke process only has to parse its arguments and relay the answer.
+
+This module only uses the standard library, and modules needed only by the
+daemon itself are imported lazily, so the forwarding path stays cheap.
+"""
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+DAEMON_HOST = "127.0.0.1"
+STATE_FILE_NAME = "daemon.json"
+CONNECT_TIMEOUT_SECONDS = 0.25
+# Generous: the daemon may be waiting on the Deezer API
+RESPONSE_TIMEOUT_SECONDS = 30.0
+DEFAULT_IDLE_TIMEOUT_SECONDS = 30 * 60
+# Don't spawn another daemon while a previous one may still be starting
+SPAWN_BACKOFF_SECONDS = 10.0
+# The idle task runs once this long after the last request
+IDLE_TASK_DELAY_SECONDS = 60.0
+
+RequestHandler = Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]
+
+
+class DaemonUnavailable(Exception):
+    """Raised when no running daemon could be reached."""
+
+
+def _state_path(state_dir: str) -> str:
+    return os.path.join(state_dir, STATE_FILE_NAME)
+
+
+def _read_state(state_dir: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(_state_path(state_dir), "r", encoding="utf-8") as state_file:
+            return json.load(state_file)
+    except (OSError, ValueError):
+        return None
+
+
+def forward(rpc_request: Dict[str, Any], state_dir: str) -> Optional[Dict[str, Any]]:
+    """Forwards a JSON-RPC request to the running daemon.
+
+    Args:
+        rpc_request: The request Flow Launcher passed on the command line.
+        state_dir: Directory holding the daemon state file.
+
+    Returns:
+        The response payload to print for Flow Launcher, or None for actions
+        that produce no output.
+
+    Raises:
+        DaemonUnavailable: If no daemon is running or it could not answer.
+    """
+    state = _read_state(state_dir)
+    if not state:
+        raise DaemonUnavailable("No daemon state file")
+    message = json.dumps({"token": state.get("token"), "request": rpc_request}).encode("utf-8") + b"\n"
+    try:
+        with socket.create_connection((DAEMON_HOST, state["port"]), timeout=CONNECT_TIMEOUT_SECONDS) as sock:
+            sock.settimeout(RESPONSE_TIMEOUT_SECONDS)
+            sock.sendall(message)
+            with sock.makefile("rb") as reader:
+                line = reader.readline()
+    except (OSError, KeyError, TypeError) as e:
+        raise DaemonUnavailable(f"Could not reach daemon: {e}") from e
+    try:
+        reply = json.loads(line)
+    except ValueError as e:
+        raise DaemonUnavailable("Daemon sent an invalid reply") from e
+    if "error" in reply:
+        raise DaemonUnavailable(f"Daemon error: {reply['error']}")
+    return reply.get("response")
+
+
+def start_daemon(script_path: str, state_dir: str) -> bool:
+    """Starts a detached daemon process unless one was started recently.
+
+    Args:
+        script_path: The plugin entry point, run with '--daemon'.
+        state_dir: Directory holding the daemon state and spawn marker.
+
+    Returns:
+        True if a new daemon process was spawned.
+    """
+    import subprocess
+
+    os.makedirs(state_dir, exist_ok=True)
+    marker = os.path.join(state_dir, "daemon.starting")
+    try:
+        if time.time() - os.path.getmtime(marker) < SPAWN_BACKOFF_SECONDS:
+            return False
+    except OSError:
+        pass  # No marker yet
+    with open(marker, "w", encoding="utf-8"):
+        pass
+
+    kwargs: Dict[str, Any] = {
+        "stdin": subprocess.DEVNULL,
+        "stdout": subprocess.DEVNULL,
+        "stderr": subprocess.DEVNULL,
+        "close_fds": True,
+        "cwd": os.path.dirname(os.path.abspath(script_path)),
+    }
+    if sys.platform == "win32":
+        kwargs["creationflags"] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NO_WINDOW
+    else:
+        kwargs["start_new_session"] = True
+    try:
+        subprocess.Popen([sys.executable, script_path, "--daemon"], **kwargs)
+    except OSError as e:
+        print(f"Error starting plugin daemon: {e}", file=sys.stderr)
+        return False
+    return True
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Handles one forwarded JSON-RPC request per connection."""
+
+    def handle(self):
+        import hmac
+
+        server: "DaemonServer" = self.server  # type: ignore[assignment]
+        server.touch()
+        try:
+            message = json.loads(self.rfile.readline())
+            if not hmac.compare_digest(str(message.get("token", "")), server.token):
+                reply = {"error": "invalid token"}
+            else:
+                reply = {"response": server.handler(message.get("request") or {})}
+        except Exception as e:  # Never let one bad request take the daemon down
+            reply = {"error": str(e)}
+        self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    """Local TCP server answering forwarded Flow Launcher requests.
+
+    The port and a random access token are written to a state file in
+    state_dir, which only the local user can read. The server shuts itself
+    down after idle_timeout seconds without requests. An optional idle task
+    runs once per idle period, about IDLE_TASK_DELAY_SECONDS after the last
+    request.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = False
+
+    def __init__(self, handler: RequestHandler, state_dir: str,
+                 idle_timeout: float = DEFAULT_IDLE_TIMEOUT_SECONDS, port: int = 0,
+                 on_idle: Optional[Callable[[], None]] = None):
+        """Bind the server and publish its state file.
+
+        Args:
+            handler: Called with each JSON-RPC request, returns the response payload.
+            state_dir: Directory where the state file is written.
+            idle_timeout: Seconds without requests before the daemon exits.
+            port: Port to bind, 0 picks a free one.
+            on_idle: Optional background work to run while no requests come in.
+        """
+        import secrets
+
+        super().__init__((DAEMON_HOST, port), _RequestHandler)
+        self.handler = handler
+        self.state_dir = state_dir
+        self.idle_timeout = idle_timeout
+        self.token = secrets.token_hex(16)
+        self.last_activity = time.monotonic()
+        self.on_idle = on_idle
+        self._idle_task_ran_for = self.last_activity  # Not right after start
+        self._write_state()
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def touch(self) -> None:
+        """Records activity, postponing the idle shutdown."""
+        self.last_activity = time.monotonic()
+
+    def _write_state(self) -> None:
+        os.makedirs(self.state_dir, exist_ok=True)
+        path = _state_path(self.state_dir)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as state_file:
+            json.dump({"port": self.port, "token": self.token, "pid": os.getpid()}, state_file)
+        os.replace(tmp_path, path)
+
+    def _remove_state(self) -> None:
+        state = _read_state(self.state_dir)
+        if state and state.get("token") == self.token:
+            try:
+                os.remove(_state_path(self.state_dir))
+            except OSError:
+                pass
+
+    def _watch_idle(self) -> None:
+        while True:
+            idle = time.monotonic() - self.last_activity
+            if idle >= self.idle_timeout:
+                self.shutdown()
+                return
+            if idle >= IDLE_TASK_DELAY_SECONDS and self._idle_task_ran_for != self.last_activity:
+                self._idle_task_ran_for = self.last_activity
+                self._run_idle_task()
+            time.sleep(min(self.idle_timeout - idle, IDLE_TASK_DELAY_SECONDS))
+
+    def _run_idle_task(self) -> None:
+        if self.on_idle is None:
+            return
+        try:
+            self.on_idle()
+        except Exception as e:  # Never let the idle task take the daemon down
+            print(f"Error in plugin daemon idle task: {e}", file=sys.stderr)
+
+    def run(self) -> None:
+        """Serves requests until shut down or idle, then removes the state file."""
+        watchdog = threading.Thread(target=self._watch_idle, name="daemon-idle-watch", daemon=True)
+        watchdog.start()
+        try:
+            self.serve_forever(poll_interval=0.5)
+        finally:
+            self._remove_state()
+            self.server_close()
+
+
+def is_running(state_dir: str) -> bool:
+    """Returns True if a daemon is accepting connections."""
+    state = _read_state(state_dir)
+    if not state:
+        return False
+    try:
+        with socket.create_connection((DAEMON_HOST, state["port"]), timeout=CONNECT_TIMEOUT_SECONDS):
+            return True
+    except (OSError, KeyError, TypeError):
+        return False
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Tuple
+
+from models import Record, record_from_fields
+from search_cache import normalize_query
+
+# A choice counts half as much after this long (frequency decays with recency)
+DEFAULT_HALF_LIFE_SECONDS = 7 * 24 * 60 * 60
+DEFAULT_MAX_ENTRIES = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS choices (
+    query TEXT NOT NULL,
+    type TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    fields TEXT NOT NULL,
+    weight REAL NOT NULL,
+    count INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (query, type, item_id)
+);
+"""
+
+
+class Prediction(NamedTuple):
+    """A result chosen before for a query, with its decayed weight."""
+    query: str
+    item_type: str
+    record: Record
+    score: float
+
+
+class QueryLog:
+    """A local log of queries and the results chosen for them.
+
+    Every choice adds 1 to the weight of its (query, result) pair, and weights
+    halve every half_life seconds, so the score of a query reflects both how
+    often and how recently it was used. The log stays compact: only the
+    max_entries best scoring pairs are kept.
+
+    The plugin uses it to show the usual result as soon as the first letters
+    of a common query are typed, and to prefetch the most likely queries into
+    the search cache (see DeezerControl).
+    """
+
+    def __init__(self, path: str, half_life: float = DEFAULT_HALF_LIFE_SECONDS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        """Open (or create) the log database.
+
+        Args:
+            path: Path of the SQLite database file.
+            half_life: Seconds after which a choice counts half as much.
+            max_entries: Maximum number of (query, result) pairs kept.
+        """
+        self.path = path
+        self.half_life = half_life
+        self.max_entries = max_entries
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def _decayed(self, weight: float, updated_at: float, now: float) -> float:
+        return weight * 0.5 ** (max(0.0, now - updated_at) / self.half_life)
+
+    def record_choice(self, query: str, item_type: str, record: Record) -> None:
+        """Logs that a result was chosen for a query.
+
+        Args:
+            query: The query as typed, including its command (e.g. 'artist metallica').
+            item_type: The type of the chosen result.
+            record: The chosen result.
+        """
+        key = (normalize_query(query), item_type, str(record.id))
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT weight, count, updated_at FROM choices WHERE query = ? AND type = ? AND item_id = ?", key
+                ).fetchone()
+                weight, count = (self._decayed(row[0], row[2], now), row[1]) if row else (0.0, 0)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO choices (query, type, item_id, fields, weight, count, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    key + (json.dumps(list(record)), weight + 1, count + 1, now),
+                )
+                self._prune(now)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _prune(self, now: float) -> None:
+        """Drops the lowest scoring pairs beyond max_entries. Caller holds the lock."""
+        rows = self._conn.execute("SELECT rowid, weight, updated_at FROM choices").fetchall()
+        if len(rows) <= self.max_entries:
+            return
+        rows.sort(key=lambda row: self._decayed(row[1], row[2], now))
+        self._conn.executemany(
+            "DELETE FROM choices WHERE rowid = ?", [(row[0],) for row in rows[:len(rows) - self.max_entries]]
+        )
+
+    def predict(self, prefix: str, limit: int = 3) -> List[Prediction]:
+        """Returns the results chosen before for queries starting with prefix, best first.
+
+        Args:
+            prefix: What has been typed so far.
+            limit: Maximum number of predictions.
+
+        Returns:
+            Predictions ordered by decayed weight, one per result.
+        """
+        prefix = normalize_query(prefix)
+        if not prefix:
+            return []
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT query, type, item_id, fields, weight, updated_at FROM choices "
+                "WHERE query >= ? AND query < ?",
+                (prefix, prefix + "\uffff"),
+            ).fetchall()
+        best: Dict[Tuple[str, str], Prediction] = {}
+        for query, item_type, item_id, fields, weight, updated_at in rows:
+            score = self._decayed(weight, updated_at, now)
+            if (item_type, item_id) not in best or score > best[item_type, item_id].score:
+                record = record_from_fields(json.loads(fields), item_type)
+                best[item_type, item_id] = Prediction(query, item_type, record, score)
+        return sorted(best.values(), key=lambda prediction: prediction.score, reverse=True)[:limit]
+
+    def likely_queries(self, limit: int = 5) -> List[Tuple[str, float]]:
+        """Returns the queries with the highest decayed weight, as (query, score) pairs."""
+        now = time.time()
+        scores: Dict[str, float] = defaultdict(float)
+        with self._lock:
+            rows = self._conn.execute("SELECT query, weight, updated_at FROM choices").fetchall()
+        for query, weight, updated_at in rows:
+            scores[query] += self._decayed(weight, updated_at, now)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+    def clear(self) -> None:
+        """Forgets all logged choices."""
+        with self._lock:
+            self._conn.execute("DELETE FROM choices")
+
+    def close(self) -> None:
+        """Closes the underlying database connection."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+import heapq
+from typing import List, Dict, Sequence, Iterable, Optional, Tuple
+
+from rapidfuzz import fuzz
+from rapidfuzz.utils import default_process
+
+from models import Record, SearchResults
+
+try:
+    import numpy as np
+    from rapidfuzz import process
+except ImportError:  # NumPy is optional, fall back to scoring item by item
+    np = None
+
+
+def get_compare_string(item: Record, item_type: str) -> str:
+    """Builds the string a search term is fuzzy-matched against for an item.
+
+    Args:
+        item: A track, album, artist or playlist record (see models).
+        item_type: The type of the item.
+
+    Returns:
+        The name/title, followed by the artist or creator name where relevant.
+    """
+    if item_type == "artist":
+        return item.name
+    elif item_type == "album":
+        return item.title + " " + item.artist_name
+    elif item_type == "playlist":
+        return item.title + " " + item.creator_name
+    elif item_type == "track":
+        return item.title + " " + item.artist_name
+    return ""
+
+
+def score_items(search_term: str, compare_strings: Sequence[str]) -> List[int]:
+    """Scores compare strings against the search term with token_set_ratio (0-100).
+
+    The search term is preprocessed (lowercased, punctuation stripped) once,
+    and all strings are scored in one vectorized call when NumPy is available.
+
+    Args:
+        search_term: The search term.
+        compare_strings: Strings built by get_compare_string.
+
+    Returns:
+        One score per compare string, in order.
+    """
+    processed_term = default_process(search_term)
+    if np is not None and len(compare_strings) > 1:
+        matrix = process.cdist(
+            [processed_term], compare_strings, scorer=fuzz.token_set_ratio,
+            processor=default_process, dtype=np.uint8, workers=1,
+        )
+        return matrix[0].tolist()
+    return [
+        round(fuzz.token_set_ratio(processed_term, default_process(compare_string)))
+        for compare_string in compare_strings
+    ]
+
+
+def _top_indices(scores: Sequence[int], limit: int) -> List[int]:
+    """Returns the indices of the `limit` best scores, best first, ties in original order."""
+    count = len(scores)
+    if np is not None and count > limit:
+        # Unique keys (-score, index) make the partial selection match a stable sort
+        keys = -np.asarray(scores, dtype=np.int64) * count + np.arange(count)
+        best = np.argpartition(keys, limit - 1)[:limit]
+        return best[np.argsort(keys[best])].tolist()
+    return sorted(range(count), key=lambda index: -scores[index])[:limit]
+
+
+def rank_batch(search_term: str, items_by_type: Dict[str, List[Record]],
+               limit: int, min_score: int = 0) -> Dict[str, List[Record]]:
+    """Ranks the candidates of several types against the search term at once.
+
+    All compare strings of all types are scored in a single call, then the top
+    `limit` items of each type are selected without fully sorting each list.
+    Candidates that were SearchResults keep their stale flag.
+
+    Args:
+        search_term: The search term.
+        items_by_type: Candidate items per type (track, album, artist, playlist).
+        limit: Maximum number of items kept per type.
+        min_score: Items scoring below this are dropped.
+
+    Returns:
+        The best items per type, best first, as SearchResults.
+    """
+    compare_strings = []
+    spans = {}
+    for item_type, items in items_by_type.items():
+        start = len(compare_strings)
+        compare_strings.extend(get_compare_string(item, item_type) for item in items)
+        spans[item_type] = (start, len(compare_strings))
+    scores = score_items(search_term, compare_strings) if compare_strings else []
+
+    ranked = {}
+    for item_type, items in items_by_type.items():
+        start, end = spans[item_type]
+        type_scores = scores[start:end]
+        ranked[item_type] = SearchResults(
+            (items[index] for index in _top_indices(type_scores, limit) if type_scores[index] >= min_score),
+            stale=getattr(items, "stale", False),
+        )
+    return ranked
+
+
+def top_k(search_term: str, items: Iterable[Record], item_type: str, k: Optional[int] = None,
+          min_score: int = 0, stop_score: int = 100) -> List[Record]:
+    """Streams items through a bounded heap and keeps the k best matches.
+
+    Items are consumed lazily, so `items` can be a generator walking result
+    pages: once k items scoring at least stop_score have been seen, no later
+    item can displace them (ties keep the earlier item) and ranking stops
+    without consuming the rest. Once the heap is full, candidates are scored
+    with a cutoff just above the current worst kept score, which lets
+    rapidfuzz skip most of the work for hopeless candidates.
+
+    Args:
+        search_term: The search term.
+        items: Candidate records, in API order.
+        item_type: The type of the items.
+        k: Maximum number of items to return, None keeps all matches.
+        min_score: Items scoring below this are dropped.
+        stop_score: Stop once the k kept items all score at least this much.
+
+    Returns:
+        The best items, best first, ties in original order.
+    """
+    if k is not None and k <= 0:
+        return []
+    processed_term = default_process(search_term)
+    # Min-heap of (score, -index, item): the worst kept item is on top
+    heap: List[Tuple[int, int, Record]] = []
+    for index, item in enumerate(items):
+        full = k is not None and len(heap) >= k
+        cutoff = heap[0][0] + 1 if full else min_score
+        score = round(fuzz.token_set_ratio(
+            processed_term, default_process(get_compare_string(item, item_type)), score_cutoff=cutoff,
+        ))
+        if score < cutoff or score < min_score:
+            continue
+        if full:
+            heapq.heapreplace(heap, (score, -index, item))
+        else:
+            heapq.heappush(heap, (score, -index, item))
+        if k is not None and len(heap) >= k and heap[0][0] >= stop_score:
+            break
+    return [item for score, negative_index, item in sorted(heap, key=lambda entry: (-entry[0], -entry[1]))]
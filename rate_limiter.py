@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from file_lock import LockFile
+
+# Deezer allows roughly 50 requests per 5 seconds
+DEFAULT_RATE = 50
+DEFAULT_PERIOD_SECONDS = 5.0
+
+
+class RateLimitTimeout(Exception):
+    """Raised when no request budget became available within the caller's timeout."""
+
+
+class TokenBucket:
+    """A token-bucket rate limiter shared by all Deezer requests.
+
+    The bucket holds up to `rate` tokens and refills at rate/period tokens per
+    second. Each request takes one token; callers wait (rather than receive a
+    quota error from Deezer) until one is available.
+
+    Plugin processes started by Flow Launcher can share one budget by passing
+    the same state_path: the bucket state is then kept in a small JSON file
+    guarded by a lock file.
+    """
+
+    def __init__(self, rate: int = DEFAULT_RATE, period: float = DEFAULT_PERIOD_SECONDS,
+                 state_path: Optional[str] = None):
+        """Initialize the bucket, full.
+
+        Args:
+            rate: Number of requests allowed per period (also the burst size).
+            period: Length of the period in seconds.
+            state_path: Optional file used to share the bucket between processes.
+        """
+        self.rate = rate
+        self.period = period
+        self.state_path = state_path
+        self.acquired = 0
+        self.waits = 0  # Acquisitions that had to wait
+        self.total_wait = 0.0  # Seconds spent waiting
+        self._tokens = float(rate)
+        self._updated = time.time()
+        self._lock = threading.Lock()
+
+    @property
+    def refill_rate(self) -> float:
+        """Tokens added per second."""
+        return self.rate / self.period
+
+    def _refill(self, tokens: float, updated: float, now: float) -> float:
+        return min(float(self.rate), tokens + max(0.0, now - updated) * self.refill_rate)
+
+    def _take(self) -> float:
+        """Takes a token if one is available.
+
+        Returns:
+            0 if a token was taken, otherwise the seconds until one will be available.
+        """
+        now = time.time()
+        tokens, updated = self._load_state()
+        tokens = self._refill(tokens, updated, now)
+        if tokens >= 1:
+            self._save_state(tokens - 1, now)
+            return 0.0
+        self._save_state(tokens, now)
+        return (1 - tokens) / self.refill_rate
+
+    def acquire(self, timeout: Optional[float] = None) -> float:
+        """Blocks until a request may be sent.
+
+        Args:
+            timeout: Maximum seconds to wait, None waits as long as needed.
+
+        Returns:
+            The number of seconds spent waiting.
+
+        Raises:
+            RateLimitTimeout: If the budget did not allow a request within the timeout.
+        """
+        start = time.monotonic()
+        while True:
+            with self._lock, self._file_lock():
+                wait = self._take()
+            waited = time.monotonic() - start
+            if wait == 0:
+                with self._lock:
+                    self.acquired += 1
+                    if waited > 0:
+                        self.waits += 1
+                        self.total_wait += waited
+                return waited
+            if timeout is not None and waited + wait > timeout:
+                raise RateLimitTimeout(f"No request budget within {timeout:.2f}s")
+            time.sleep(wait)
+
+    def drain(self) -> None:
+        """Empties the bucket, e.g. after Deezer reported the quota as exceeded."""
+        with self._lock, self._file_lock():
+            self._save_state(0.0, time.time())
+
+    def available(self) -> float:
+        """Returns the number of requests that can be sent right now without waiting."""
+        with self._lock, self._file_lock():
+            tokens, updated = self._load_state()
+        return self._refill(tokens, updated, time.time())
+
+    def wait_time(self) -> float:
+        """Returns the seconds the next request would have to wait."""
+        tokens = self.available()
+        return 0.0 if tokens >= 1 else (1 - tokens) / self.refill_rate
+
+    def stats(self) -> Dict[str, float]:
+        """Returns the current budget and wait-time metrics."""
+        return {
+            "available": self.available(),
+            "wait_time": self.wait_time(),
+            "acquired": self.acquired,
+            "waits": self.waits,
+            "total_wait": self.total_wait,
+        }
+
+    # --- Shared state handling ---
+
+    def _load_state(self) -> Tuple[float, float]:
+        if self.state_path:
+            try:
+                with open(self.state_path, "r", encoding="utf-8") as state_file:
+                    state = json.load(state_file)
+                return float(state["tokens"]), float(state["updated"])
+            except (OSError, ValueError, KeyError, TypeError):
+                return float(self.rate), time.time()  # First use or corrupt file: start full
+        return self._tokens, self._updated
+
+    def _save_state(self, tokens: float, updated: float) -> None:
+        self._tokens, self._updated = tokens, updated
+        if self.state_path:
+            tmp_path = f"{self.state_path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as state_file:
+                    json.dump({"tokens": tokens, "updated": updated}, state_file)
+                os.replace(tmp_path, self.state_path)
+            except OSError as e:
+                print(f"Error saving rate limiter state {self.state_path}: {e}")
+
+    def _file_lock(self) -> LockFile:
+        return LockFile(f"{self.state_path}.lock" if self.state_path else None)
+
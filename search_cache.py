@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, Optional, NamedTuple
+from urllib.parse import urlencode
+
+import json_decoder
+
+DEFAULT_TTL_SECONDS = 6 * 60 * 60
+DEFAULT_MAX_ENTRIES = 5000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    endpoint TEXT NOT NULL,
+    query TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at);
+CREATE INDEX IF NOT EXISTS entries_endpoint_query ON entries (endpoint, query);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS validators (
+    key TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    size INTEGER NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS entries_validators_ad AFTER DELETE ON entries BEGIN
+    DELETE FROM validators WHERE key = old.key;
+END;
+"""
+
+
+class Validators(NamedTuple):
+    """HTTP validators of a cached response, used to revalidate it conditionally."""
+    etag: Optional[str]
+    last_modified: Optional[str]
+    size: int  # Size of the response body in bytes
+
+
+class CacheEntry(NamedTuple):
+    """A cached response together with the query it answered."""
+    query: str
+    data: Dict[str, Any]
+    age: float
+
+
+def normalize_query(query: str) -> str:
+    """Normalizes a search term so equivalent queries share a cache entry.
+
+    Deezer search is case-insensitive and ignores extra whitespace.
+    """
+    return " ".join(query.lower().split())
+
+
+class SearchCache:
+    """A persistent cache of Deezer API responses stored in SQLite.
+
+    Flow Launcher starts a new plugin process for most queries, so the cache
+    lives on disk to survive between invocations. Entries expire after a TTL
+    and the least recently used ones are evicted once the cache grows past
+    its size cap. Hit and miss counters are persisted alongside the entries.
+    """
+
+    def __init__(self, path: str, ttl: float = DEFAULT_TTL_SECONDS, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """Open (or create) the cache database.
+
+        Args:
+            path: Path of the SQLite database file.
+            ttl: Seconds after which an entry is considered expired.
+            max_entries: Maximum number of entries kept before LRU eviction.
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Searches run on worker threads (see DeezerClient.search_many)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    @staticmethod
+    def make_key(endpoint: str, params: Optional[Dict[str, Any]] = None) -> str:
+        """Builds the cache key for a request.
+
+        Args:
+            endpoint: The API endpoint path (e.g., '/search/album').
+            params: Optional dictionary of query parameters.
+
+        Returns:
+            A string uniquely identifying the request.
+        """
+        params = dict(params or {})
+        if "q" in params:
+            params["q"] = normalize_query(str(params["q"]))
+        return f"{endpoint}?{urlencode(sorted(params.items()))}"
+
+    def get(self, endpoint: str, params: Optional[Dict[str, Any]] = None,
+            max_age: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Looks up a cached response.
+
+        Args:
+            endpoint: The API endpoint path.
+            params: Optional dictionary of query parameters.
+            max_age: Maximum entry age in seconds, defaults to the cache TTL.
+
+        Returns:
+            The cached JSON response, or None on a miss or expired entry.
+        """
+        entry = self.get_entry(endpoint, params, max_age=max_age)
+        return None if entry is None else entry.data
+
+    def get_entry(self, endpoint: str, params: Optional[Dict[str, Any]] = None,
+                  max_age: Optional[float] = None, count: bool = True) -> Optional[CacheEntry]:
+        """Looks up a cached response together with its age.
+
+        A max_age above the TTL lets callers accept expired entries, e.g. to
+        serve them while they are refreshed. Those are counted as stale hits.
+
+        Args:
+            endpoint: The API endpoint path.
+            params: Optional dictionary of query parameters.
+            max_age: Maximum entry age in seconds, defaults to the cache TTL.
+            count: Update the hit and miss counters. Internal reads, such as
+                the body of a response the API answered 304 for, pass False.
+
+        Returns:
+            The cached entry, or None on a miss or an entry older than max_age.
+        """
+        key = self.make_key(endpoint, params)
+        max_age = self.ttl if max_age is None else max_age
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT query, payload, created_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[2] > max_age:
+                if count:
+                    self._bump("misses")
+                return None
+            self._conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            age = now - row[2]
+            if count:
+                self._bump("stale_hits" if age > self.ttl else "hits")
+        return CacheEntry(row[0], json_decoder.loads(row[1]), age)
+
+    def find_prefix(self, endpoint: str, params: Optional[Dict[str, Any]] = None,
+                    max_age: Optional[float] = None, min_length: int = 1) -> Optional[CacheEntry]:
+        """Finds the longest cached query that the requested query extends.
+
+        When the user types "metallic" after "metalli", the response cached for
+        "metalli" is a good starting point for "metallic". An exact match counts
+        as its own prefix.
+
+        Args:
+            endpoint: The API endpoint path.
+            params: Query parameters; all parameters except 'q' must match exactly.
+            max_age: Maximum entry age in seconds, defaults to the cache TTL.
+            min_length: Minimum length of the cached query.
+
+        Returns:
+            The matching entry, or None if no cached query is a prefix.
+        """
+        params = dict(params or {})
+        query = normalize_query(str(params.get("q", "")))
+        max_age = self.ttl if max_age is None else max_age
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, query, payload, created_at FROM entries "
+                "WHERE endpoint = ? AND length(query) BETWEEN ? AND ? "
+                "AND substr(?, 1, length(query)) = query AND created_at >= ? "
+                "ORDER BY length(query) DESC",
+                (endpoint, min_length, len(query), query, now - max_age),
+            ).fetchall()
+            for key, prefix, payload, created_at in rows:
+                # Entries for other limit/index values etc. are not interchangeable
+                if key != self.make_key(endpoint, {**params, "q": prefix}):
+                    continue
+                self._conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+                self._bump("prefix_hits")
+                return CacheEntry(prefix, json_decoder.loads(payload), now - created_at)
+        return None
+
+    def set(self, endpoint: str, params: Optional[Dict[str, Any]], data: Dict[str, Any]) -> None:
+        """Stores a response and evicts old entries if the cache is full.
+
+        Args:
+            endpoint: The API endpoint path.
+            params: Optional dictionary of query parameters.
+            data: The JSON response to cache.
+        """
+        key = self.make_key(endpoint, params)
+        query = normalize_query(str((params or {}).get("q", "")))
+        payload = json.dumps(data, separators=(",", ":"))
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, endpoint, query, payload, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, endpoint, query, payload, now, now),
+            )
+            self._evict()
+
+    def get_validators(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Optional[Validators]:
+        """Returns the validators stored for a cached response, None if there are none."""
+        key = self.make_key(endpoint, params)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT validators.etag, validators.last_modified, validators.size FROM validators "
+                "JOIN entries ON entries.key = validators.key WHERE validators.key = ?",
+                (key,),
+            ).fetchone()
+        return None if row is None else Validators(*row)
+
+    def set_validators(self, endpoint: str, params: Optional[Dict[str, Any]], validators: Validators) -> None:
+        """Stores the ETag/Last-Modified validators of a response.
+
+        Args:
+            endpoint: The API endpoint path.
+            params: Optional dictionary of query parameters.
+            validators: The validators and body size of the response.
+        """
+        key = self.make_key(endpoint, params)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO validators (key, etag, last_modified, size) VALUES (?, ?, ?, ?)",
+                (key, *validators),
+            )
+
+    def record_revalidation(self, bytes_saved: int, latency: float) -> None:
+        """Counts a response confirmed unchanged by the API (HTTP 304).
+
+        Args:
+            bytes_saved: Size of the body that did not have to be downloaded again.
+            latency: Seconds the conditional request took.
+        """
+        with self._lock:
+            self._bump("not_modified")
+            self._bump("bytes_saved", bytes_saved)
+            self._bump("revalidation_ms", round(latency * 1000))
+
+    def _evict(self) -> None:
+        """Drops the least recently used entries above max_entries. Caller holds the lock."""
+        count = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM entries WHERE key IN "
+                "(SELECT key FROM entries ORDER BY accessed_at ASC LIMIT ?)",
+                (overflow,),
+            )
+
+    def _bump(self, counter: str, amount: int = 1) -> None:
+        """Increments a persisted counter. Caller holds the lock."""
+        self._conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (counter, amount),
+        )
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the hit/miss counters and the current number of entries."""
+        with self._lock:
+            counters = dict(self._conn.execute("SELECT name, value FROM counters").fetchall())
+            entries = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        return {
+            "hits": counters.get("hits", 0),
+            "misses": counters.get("misses", 0),
+            "prefix_hits": counters.get("prefix_hits", 0),
+            "stale_hits": counters.get("stale_hits", 0),
+            "not_modified": counters.get("not_modified", 0),
+            "bytes_saved": counters.get("bytes_saved", 0),
+            "revalidation_ms": counters.get("revalidation_ms", 0),
+            "entries": entries,
+        }
+
+    def clear(self) -> None:
+        """Removes all cached entries and resets the counters."""
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.execute("DELETE FROM counters")
+            self._conn.execute("DELETE FROM validators")
+
+    def close(self) -> None:
+        """Closes the underlying database connection."""
+        with self._lock:
+            self._conn.close()
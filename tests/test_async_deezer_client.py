@@ -0,0 +1,178 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from async_deezer_client import AsyncDeezerClient
+from circuit_breaker import CircuitBreaker
+from deezer_client import DeezerClient
+from models import Artist, Track
+from search_cache import SearchCache, Validators
+
+# --- Fixtures ---
+
+@pytest.fixture(autouse=True)
+def no_backoff(mocker):
+    """Makes retry backoff sleeps instant."""
+    mocker.patch("deezer_client.random.uniform", return_value=0)
+
+def _client(handler, **kwargs) -> AsyncDeezerClient:
+    """Builds a client whose requests are answered by handler(request), kwargs configure its DeezerClient."""
+    return AsyncDeezerClient(DeezerClient(**kwargs), transport=httpx.MockTransport(handler))
+
+def _json(payload, status_code=200) -> "httpx.Response":
+    return httpx.Response(status_code, content=json.dumps(payload).encode())
+
+# --- Test Cases ---
+
+def test_search_parses_records():
+    """Test search requests the typed endpoint and returns records."""
+    requests_seen = []
+
+    def handler(request):
+        requests_seen.append(request)
+        return _json({"data": [{"id": 119, "name": "Metallica", "link": "l"}]})
+
+    async def scenario():
+        async with _client(handler) as client:
+            return await client.search_artists("metallica")
+
+    assert asyncio.run(scenario()) == [Artist(119, "Metallica", "l")]
+    assert requests_seen[0].url.path == "/search/artist"
+    assert requests_seen[0].url.params["q"] == "metallica"
+
+def test_search_many_runs_types_concurrently():
+    """Test search_many returns every requested type, duplicates dropped."""
+    def handler(request):
+        return _json({"data": [{"id": 1, "title": request.url.path}]})
+
+    async def scenario():
+        async with _client(handler) as client:
+            return await client.search_many("x", ["track", "album", "track"])
+
+    results = asyncio.run(scenario())
+    assert list(results) == ["track", "album"]
+    assert results["track"] == [Track(1, "/search/track", "", "", None)]
+
+def test_identical_requests_are_coalesced():
+    """Test concurrent identical searches share one HTTP request."""
+    calls = []
+
+    async def handler(request):
+        calls.append(request)
+        await asyncio.sleep(0)
+        return _json({"data": []})
+
+    async def scenario():
+        async with _client(handler) as client:
+            await asyncio.gather(client.search("x"), client.search("x"))
+            return client.coalesced
+
+    assert asyncio.run(scenario()) == 1
+    assert len(calls) == 1
+
+def test_retries_transient_errors_then_succeeds():
+    """Test 5xx responses are retried."""
+    responses = [_json({}, status_code=503), _json({"data": [{"id": 1}]})]
+
+    async def scenario():
+        async with _client(lambda request: responses.pop(0)) as client:
+            return await client.search("x")
+
+    assert [item.id for item in asyncio.run(scenario())] == [1]
+
+def test_failures_open_breaker_and_serve_stale_cache(tmp_path, mocker):
+    """Test failing requests open the breaker and fall back to expired cache entries."""
+    mock_time = mocker.patch("search_cache.time.time", return_value=1000.0)
+    cache = SearchCache(str(tmp_path / "cache.sqlite3"))
+    cache.set("/search/track", {"q": "x"}, {"data": [{"id": 1}]})
+    mock_time.return_value = 5000.0
+
+    def handler(request):
+        raise httpx.ConnectError("refused")
+
+    async def scenario():
+        async with _client(handler, cache=cache, max_retries=0,
+                           breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60)) as client:
+            first = await client.search("x")
+            second = await client.search("y")
+            return first, second, client.client.breaker.state
+
+    first, second, state = asyncio.run(scenario())
+    assert [item.id for item in first] == [1]
+    assert second == []
+    assert state == CircuitBreaker.OPEN
+    cache.close()
+
+def test_deezer_error_returns_no_items():
+    """Test an error in the JSON body is not treated as results."""
+    async def scenario():
+        async with _client(lambda request: _json({"error": {"type": "Exception", "message": "no"}})) as client:
+            return await client.search("x")
+
+    assert asyncio.run(scenario()) == []
+
+def test_aclose_cancels_prefetches():
+    """Test pending background searches are cancelled on close."""
+    async def handler(request):
+        await asyncio.Event().wait()  # Never answers
+
+    async def scenario():
+        client = _client(handler)
+        client.prefetch("x", ["track", "album"])
+        await asyncio.sleep(0)
+        pending = list(client._background)
+        await client.aclose()
+        return pending
+
+    assert all(task.cancelled() for task in asyncio.run(scenario()))
+
+def test_expired_entry_is_revalidated_in_background_task(tmp_path, mocker):
+    """Test an expired entry is served at once and refreshed with a conditional request in a background task."""
+    mock_time = mocker.patch("search_cache.time.time", return_value=1000.0)
+    cache = SearchCache(str(tmp_path / "cache.sqlite3"), ttl=60)
+    cache.set("/search/track", {"q": "x"}, {"data": [{"id": 1}]})
+    cache.set_validators("/search/track", {"q": "x"}, Validators('"v1"', None, 20))
+    mock_time.return_value = 1100.0
+    requests_seen = []
+
+    def handler(request):
+        requests_seen.append(request)
+        return httpx.Response(304)
+
+    async def scenario():
+        async with _client(handler, cache=cache) as client:
+            results = await client.search("x")
+            await asyncio.gather(*client._background)
+            return results
+
+    results = asyncio.run(scenario())
+    assert [item.id for item in results] == [1]
+    assert results.stale
+    assert requests_seen[0].headers["If-None-Match"] == '"v1"'
+    assert cache.stats()["not_modified"] == 1
+    cache.close()
+
+def test_blocking_calls_run_off_the_event_loop(tmp_path):
+    """Test cache lookups and rate-limiter calls are made from worker threads, not the loop's thread."""
+    cache = SearchCache(str(tmp_path / "cache.sqlite3"))
+    threads = set()
+    get_entry = cache.get_entry
+
+    def recording_get_entry(*args, **kwargs):
+        threads.add(threading.get_ident())
+        return get_entry(*args, **kwargs)
+
+    cache.get_entry = recording_get_entry
+
+    async def scenario():
+        async with _client(lambda request: _json({"data": []}), cache=cache) as client:
+            await client.search("x")
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(scenario())
+    assert threads and loop_thread not in threads
+    cache.close()
@@ -0,0 +1,63 @@
+import pytest
+import requests
+
+import cassette
+from benchmarks.fake_deezer_api import FakeDeezerApi
+from deezer_client import DeezerClient
+
+# --- Fixtures ---
+
+@pytest.fixture
+def store(tmp_path):
+    """Provides an empty cassette store."""
+    cassette_store = cassette.CassetteStore(str(tmp_path / "cassette.sqlite3"))
+    yield cassette_store
+    cassette_store.close()
+
+@pytest.fixture
+def recorded(store):
+    """Records two artist searches from a fake API, which is stopped afterwards."""
+    with FakeDeezerApi(latency=0) as api:
+        client = DeezerClient(api_base=api.base_url)
+        adapter = cassette.mount(client.session, store, cassette.RECORD, client.api_base)
+        expected = [client.search(query, "artist") for query in ("metallica", "daft punk")]
+    assert adapter.recorded == 2
+    return api.base_url, expected
+
+# --- Test Cases ---
+
+def test_replay_matches_recording(store, recorded):
+    """Test replayed searches return the recorded results without the API running."""
+    base_url, expected = recorded
+    client = DeezerClient(api_base=base_url)
+    adapter = cassette.mount(client.session, store, cassette.REPLAY, client.api_base)
+    assert [client.search(query, "artist") for query in ("metallica", "daft punk")] == expected
+    assert adapter.replayed == 2
+    assert store.queries() == ["metallica", "daft punk"]
+
+def test_replay_miss_fails_fast(store, recorded, mocker):
+    """Test a request missing from the cassette fails without retries."""
+    sleep = mocker.patch("deezer_client.time.sleep")
+    client = DeezerClient(api_base=recorded[0])
+    adapter = cassette.mount(client.session, store, cassette.REPLAY, client.api_base)
+    assert client.search("metallica", "track") == []
+    assert adapter.misses == 1
+    sleep.assert_not_called()
+
+def test_bodies_are_compressed(store):
+    """Test stored bodies round-trip and take less space than the response."""
+    body = b'{"data": [' + b", ".join([b'{"id": 1, "title": "Master of Puppets"}'] * 50) + b"]}"
+    store.put("GET /search/track?q=x", "x", 200, {"ETag": '"v1"'}, body)
+    assert store.get("GET /search/track?q=x") == (200, {"ETag": '"v1"'}, body)
+    stored = store._conn.execute("SELECT LENGTH(body) FROM interactions").fetchone()[0]
+    assert stored < len(body) / 5
+
+def test_replay_answers_matching_etag_with_304(store):
+    """Test conditional requests are answered like the API would."""
+    store.put(cassette.interaction_key("GET", "https://api.deezer.com/search/track?q=x"), "x", 200,
+              {"ETag": '"v1"'}, b'{"data": []}')
+    session = requests.Session()
+    cassette.mount(session, store, cassette.REPLAY, "https://api.deezer.com")
+    response = session.get("https://api.deezer.com/search/track", params={"q": "x"}, headers={"If-None-Match": '"v1"'})
+    assert response.status_code == 304
+    assert session.get("https://api.deezer.com/search/track", params={"q": "x"}).json() == {"data": []}
@@ -0,0 +1,52 @@
+from circuit_breaker import CircuitBreaker
+
+# --- Test Cases ---
+
+def test_breaker_opens_after_threshold():
+    """Test the breaker opens after the configured number of consecutive failures."""
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    assert breaker.allow() is True
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.allow() is False
+    assert breaker.rejected == 1
+
+def test_success_resets_failure_count():
+    """Test a success in between failures keeps the breaker closed."""
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_half_open_trial_call(mocker):
+    """Test one trial call is allowed after the reset timeout, and its outcome decides the state."""
+    mock_monotonic = mocker.patch("circuit_breaker.time.monotonic", return_value=100.0)
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    assert breaker.allow() is False
+
+    mock_monotonic.return_value = 131.0
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow() is True
+    assert breaker.allow() is False  # Only one trial call
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    mock_monotonic.return_value = 162.0
+    assert breaker.allow() is True
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_unreported_trial_call_is_retried(mocker):
+    """Test a new trial call is allowed if the previous one never reported back."""
+    mock_monotonic = mocker.patch("circuit_breaker.time.monotonic", return_value=100.0)
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    mock_monotonic.return_value = 131.0
+    assert breaker.allow() is True
+    mock_monotonic.return_value = 150.0
+    assert breaker.allow() is False
+    mock_monotonic.return_value = 162.0
+    assert breaker.allow() is True
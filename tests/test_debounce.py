@@ -0,0 +1,41 @@
+import threading
+
+from debounce import QueryDebouncer
+
+# --- Test Cases ---
+
+def test_latest_query_runs():
+    """Test a query with no newer query is run."""
+    debouncer = QueryDebouncer(window=0)
+    ticket = debouncer.begin("metallica")
+    assert debouncer.wait(ticket) is True
+    assert debouncer.discard(ticket) is False
+
+def test_superseded_query_is_dropped():
+    """Test a query superseded during the window never reaches the network."""
+    debouncer = QueryDebouncer(window=0.05)
+    first = debouncer.begin("met")
+    threading.Timer(0.01, debouncer.begin, args=("meta",)).start()
+    assert debouncer.wait(first) is False
+    assert debouncer.dropped == 1
+
+def test_superseded_in_flight_response_is_discarded():
+    """Test a response for a query superseded while in flight is discarded."""
+    debouncer = QueryDebouncer(window=0)
+    first = debouncer.begin("met")
+    assert debouncer.wait(first) is True
+    debouncer.begin("meta")
+    assert debouncer.discard(first) is True
+    assert debouncer.discarded == 1
+
+def test_state_file_shared_between_processes(tmp_path):
+    """Test debouncers sharing a state file see each other's queries."""
+    state_path = str(tmp_path / "latest_query")
+    first_process = QueryDebouncer(window=0, state_path=state_path)
+    second_process = QueryDebouncer(window=0, state_path=state_path)
+
+    first = first_process.begin("met")
+    second = second_process.begin("meta")
+
+    assert first_process.is_stale(first) is True
+    assert second_process.is_stale(second) is False
@@ -1,10 +1,23 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
 import pytest
 import requests
 from unittest.mock import MagicMock  # Use unittest.mock if pytest-mock isn't explicitly installed or preferred
 
 # Assuming deezer_client.py is in the parent directory relative to tests/
 # Adjust the import path if your structure is different
-from deezer_client import DeezerClient, DEEZER_API_BASE
+from circuit_breaker import CircuitBreaker
+from deezer_client import DeezerClient, BACKGROUND_WORKERS, DEEZER_API_BASE, CircuitOpenError
+from models import Album
+from rate_limiter import TokenBucket
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 # --- Fixtures ---
 
@@ -37,7 +50,7 @@ def test_client_init_with_token():
 def test_make_request_success(client, mock_session_get):
     """Test _make_request handles a successful API call."""
     mock_response = MagicMock()
-    mock_response.json.return_value = {"data": [{"id": 1, "title": "Test"}]}
+    mock_response.content = json.dumps({"data": [{"id": 1, "title": "Test"}]}).encode()
     mock_response.raise_for_status.return_value = None  # Simulate successful status
     mock_session_get.return_value = mock_response
 
@@ -46,7 +59,7 @@ def test_make_request_success(client, mock_session_get):
     result = client._make_request(endpoint, params=params)
 
     expected_url = f"{DEEZER_API_BASE}{endpoint}"
-    mock_session_get.assert_called_once_with(expected_url, params=params)
+    mock_session_get.assert_called_once_with(expected_url, params=params, timeout=client.timeout)
     assert result == {"data": [{"id": 1, "title": "Test"}]}
 
 def test_make_request_http_error(client, mock_session_get):
@@ -59,10 +72,56 @@ def test_make_request_http_error(client, mock_session_get):
     with pytest.raises(requests.exceptions.HTTPError):
         client._make_request(endpoint)
 
+@pytest.fixture
+def mock_sleep(mocker):
+    """Skips retry backoff sleeps."""
+    return mocker.patch('deezer_client.time.sleep')
+
+def test_make_request_retries_transient_errors(client, mock_session_get, mock_sleep):
+    """Test _make_request retries timeouts and succeeds on a later attempt."""
+    mock_response = MagicMock()
+    mock_response.content = json.dumps({"data": []}).encode()
+    mock_session_get.side_effect = [requests.exceptions.Timeout("read timeout"), mock_response]
+
+    assert client._make_request("/search/track") == {"data": []}
+    assert mock_session_get.call_count == 2
+    mock_sleep.assert_called_once()
+
+def test_make_request_gives_up_after_max_retries(client, mock_session_get, mock_sleep):
+    """Test _make_request raises once the retries are used up."""
+    mock_session_get.side_effect = requests.exceptions.ConnectionError("refused")
+    with pytest.raises(requests.exceptions.ConnectionError):
+        client._make_request("/search/track")
+    assert mock_session_get.call_count == client.max_retries + 1
+
+def test_make_request_does_not_retry_client_errors(client, mock_session_get, mock_sleep):
+    """Test 4xx errors are not retried."""
+    mock_response = MagicMock()
+    mock_response.status_code = 404
+    mock_response.raise_for_status.side_effect = requests.exceptions.HTTPError("404", response=mock_response)
+    mock_session_get.return_value = mock_response
+    with pytest.raises(requests.exceptions.HTTPError):
+        client._make_request("/search/track")
+    assert mock_session_get.call_count == 1
+    mock_sleep.assert_not_called()
+
+def test_make_request_circuit_breaker_short_circuits(mock_session_get, mock_sleep):
+    """Test the open circuit breaker rejects requests without touching the network."""
+    client = DeezerClient(max_retries=0, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+    mock_session_get.side_effect = requests.exceptions.ConnectionError("refused")
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            client._make_request("/search/track")
+
+    with pytest.raises(CircuitOpenError):
+        client._make_request("/search/track")
+    assert mock_session_get.call_count == 2
+    assert client.search("test", "track") == []
+
 def test_make_request_deezer_api_error(client, mock_session_get):
     """Test _make_request handles a Deezer-specific API error in the JSON response."""
     mock_response = MagicMock()
-    mock_response.json.return_value = {"error": {"type": "OAuthException", "message": "Invalid token"}}
+    mock_response.content = json.dumps({"error": {"type": "OAuthException", "message": "Invalid token"}}).encode()
     mock_response.raise_for_status.return_value = None
     mock_session_get.return_value = mock_response
 
@@ -70,6 +129,20 @@ def test_make_request_deezer_api_error(client, mock_session_get):
     with pytest.raises(ValueError, match="Deezer API Error: Invalid token \(Type: OAuthException\)"):
         client._make_request(endpoint)
 
+def test_make_request_invalid_json(client, mock_session_get):
+    """Test an undecodable body raises a request error and does not trip the breaker."""
+    mock_session_get.return_value.status_code = 200
+    mock_session_get.return_value.content = b"<html>Bad gateway</html>"
+    with pytest.raises(requests.exceptions.InvalidJSONError):
+        client._make_request("/search/track")
+    assert client.breaker.failures == 0
+
+def test_make_request_uses_custom_decoder(mock_session_get):
+    """Test a decoder passed to the client decodes response bodies."""
+    client = DeezerClient(decoder=lambda content: {"decoded": content})
+    mock_session_get.return_value.content = b"raw"
+    assert client._make_request("/search/track") == {"decoded": b"raw"}
+
 def test_search_calls_make_request(client, mocker):
     """Test that the search method calls _make_request with correct parameters."""
     mock_make_request = mocker.patch.object(client, '_make_request', return_value={"data": [{"id": 1}]})
@@ -81,7 +154,7 @@ def test_search_calls_make_request(client, mocker):
     expected_endpoint = f"/search/{search_type}"
     expected_params = {"q": query}
     mock_make_request.assert_called_once_with(expected_endpoint, params=expected_params)
-    assert results == [{"id": 1}]
+    assert results == [Album(1, "", "", None)]
 
 def test_search_invalid_type_uses_general_search(client, mocker):
     """Test search falls back to general /search if type is invalid."""
@@ -135,4 +208,223 @@ def test_get_item_url_no_link(client):
 def test_get_item_url_empty_dict(client):
     """Test get_item_url returns None for an empty dictionary."""
     item = {}
-    assert client.get_item_url(item) is None 
\ No newline at end of file
+    assert client.get_item_url(item) is None
+
+def test_search_many_returns_results_per_type(client, mocker):
+    """Test search_many runs one search per type and maps the results by type."""
+    def fake_search(query, search_type="track", limit=None):
+        return [{"id": search_type}]
+    mock_search = mocker.patch.object(client, 'search', side_effect=fake_search)
+
+    results = client.search_many("test", ["track", "album", "artist", "track"])
+
+    assert results == {
+        "track": [{"id": "track"}],
+        "album": [{"id": "album"}],
+        "artist": [{"id": "artist"}],
+    }
+    assert mock_search.call_count == 3
+
+def test_search_many_single_type_skips_pool(client, mocker):
+    """Test search_many calls search directly when only one type is requested."""
+    mock_search = mocker.patch.object(client, 'search', return_value=[])
+    assert client.search_many("test", ["artist"]) == {"artist": []}
+    mock_search.assert_called_once_with("test", search_type="artist", limit=None)
+    assert client._executor is None
+
+def test_search_many_skips_cancelled_searches(client, mocker):
+    """Test DeezerClient.search_many skips searches once cancelled."""
+    mock_search = mocker.patch.object(client, 'search', return_value=[{"id": 1}])
+
+    results = client.search_many("test", ["track", "album"], cancelled=lambda: True)
+
+    assert results == {"track": [], "album": []}
+    mock_search.assert_not_called()
+
+def test_make_request_waits_for_rate_limiter(client, mock_session_get, mocker):
+    """Test every request takes a token from the rate limiter first."""
+    mock_acquire = mocker.patch.object(client.rate_limiter, 'acquire', return_value=0.0)
+    mock_session_get.return_value.content = json.dumps({"data": []}).encode()
+    client._make_request("/search/track")
+    mock_acquire.assert_called_once_with(timeout=client.max_rate_limit_wait)
+
+def test_make_request_retries_quota_exceeded(client, mock_session_get, mocker):
+    """Test a Deezer quota error drains the bucket and retries the request."""
+    mocker.patch.object(client.rate_limiter, 'acquire', return_value=0.0)
+    mock_drain = mocker.patch.object(client.rate_limiter, 'drain')
+    quota_response = MagicMock()
+    quota_response.content = json.dumps({"error": {"type": "Exception", "message": "Quota limit exceeded", "code": 4}}).encode()
+    ok_response = MagicMock()
+    ok_response.content = json.dumps({"data": [{"id": 1}]}).encode()
+    mock_session_get.side_effect = [quota_response, ok_response]
+
+    assert client._make_request("/search/track") == {"data": [{"id": 1}]}
+    mock_drain.assert_called_once()
+
+def test_make_request_coalesces_identical_requests(client, mocker):
+    """Test concurrent identical requests share one HTTP call and its result."""
+    release = threading.Event()
+    started = threading.Event()
+    def slow_send(endpoint, params=None):
+        started.set()
+        release.wait(timeout=5)
+        return {"data": [{"id": 1}]}
+    mock_send = mocker.patch.object(client, '_send_request', side_effect=slow_send)
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(client._make_request("/search/track", {"q": "x"})))
+    leader.start()
+    started.wait(timeout=5)
+    follower = threading.Thread(target=lambda: results.append(client._make_request("/search/track", {"q": "x"})))
+    follower.start()
+    while client.coalesced == 0:
+        time.sleep(0.001)  # Wait until the follower has joined the in-flight request
+    release.set()
+    leader.join(timeout=5)
+    follower.join(timeout=5)
+
+    mock_send.assert_called_once()
+    assert client.coalesced == 1
+    assert results[0] is results[1]
+    assert client._inflight == {}
+
+def test_make_request_coalesced_error_reaches_followers(client, mocker):
+    """Test followers of a failed in-flight request receive its exception."""
+    pending = Future()
+    client._inflight[("/search/track", (("q", "x"),))] = pending
+    pending.set_exception(requests.exceptions.ConnectionError("refused"))
+    with pytest.raises(requests.exceptions.ConnectionError):
+        client._make_request("/search/track", {"q": "x"})
+    assert client.coalesced == 1
+
+def test_search_passes_limit(client, mocker):
+    """Test search sends the limit parameter only when given."""
+    mock_make_request = mocker.patch.object(client, '_make_request', return_value={"data": []})
+    client.search("test", "track", limit=3)
+    mock_make_request.assert_called_once_with("/search/track", params={"q": "test", "limit": 3})
+
+def _paged_responses(pages):
+    """Builds a fake _make_request serving the given pages of items by index."""
+    def fake_make_request(endpoint, params=None):
+        index = params.get("index", 0)
+        page_number = index // params["limit"]
+        response = {"data": pages[page_number], "total": sum(len(page) for page in pages)}
+        if page_number + 1 < len(pages):
+            response["next"] = f"{DEEZER_API_BASE}{endpoint}?index={index + params['limit']}"
+        return response
+    return fake_make_request
+
+def test_iter_search_walks_pages(client, mocker):
+    """Test iter_search yields the items of every page in order."""
+    pages = [[{"id": 1}, {"id": 2}], [{"id": 3}, {"id": 4}], [{"id": 5}]]
+    mock_make_request = mocker.patch.object(client, '_make_request', side_effect=_paged_responses(pages))
+
+    assert [item.id for item in client.iter_search("test", "track", limit=2)] == [1, 2, 3, 4, 5]
+    requested = sorted(call.kwargs["params"].get("index", 0) for call in mock_make_request.call_args_list)
+    assert requested == [0, 2, 4]
+
+def test_iter_search_max_items_stops_fetching(client, mocker):
+    """Test iter_search stops at max_items without fetching unneeded pages."""
+    pages = [[{"id": 1}, {"id": 2}], [{"id": 3}, {"id": 4}], [{"id": 5}]]
+    mock_make_request = mocker.patch.object(client, '_make_request', side_effect=_paged_responses(pages))
+
+    assert [item.id for item in client.iter_search("test", "track", limit=2, max_items=3)] == [1, 2, 3]
+    assert mock_make_request.call_count == 2
+
+def test_iter_search_stops_on_error(client, mocker):
+    """Test iter_search ends quietly when a page cannot be fetched."""
+    mocker.patch.object(client, '_make_request', side_effect=requests.exceptions.ConnectionError)
+    assert list(client.iter_search("test", "track")) == []
+
+def test_session_pool_sized_for_fan_out():
+    """Test the connection pool keeps one connection per concurrent and per background search."""
+    client = DeezerClient(max_workers=6)
+    assert client.session.get_adapter(DEEZER_API_BASE)._pool_maxsize == 6 + BACKGROUND_WORKERS
+
+def test_searches_never_wait_behind_prefetches(client, mocker):
+    """Test searches someone waits for run while prefetches occupy every background worker."""
+    release = threading.Event()
+
+    def fake_request(endpoint, params=None):
+        if params["q"] == "slow":
+            release.wait(5)
+        return {"data": [{"id": 1}]}
+
+    mocker.patch.object(client, '_make_request', side_effect=fake_request)
+    client.prefetch("slow", ["track", "album", "artist", "playlist"])
+    started = time.monotonic()
+    results = client.search_many("fast", ["track", "album"])
+    assert time.monotonic() - started < 1
+    assert [item.id for item in results["album"]] == [1]
+    release.set()
+    client.shutdown(wait=True)
+
+def test_warm_up_opens_one_connection_outside_the_executor(mocker):
+    """Test warm_up sends a single cheap request on its own thread, leaving search workers free."""
+    mock_head = mocker.patch('requests.Session.head')
+    client = DeezerClient(max_workers=2)
+    assert client.warm_up().result() is True
+    assert mock_head.call_count == 1
+    assert mock_head.call_args.args[0].startswith(DEEZER_API_BASE)
+    assert client._executor is None
+
+def test_warm_up_skipped_without_rate_limit_budget(mocker):
+    """Test warm-up never waits for, or uses up, budget needed by searches."""
+    mock_head = mocker.patch('requests.Session.head')
+    client = DeezerClient(rate_limiter=TokenBucket(rate=1))
+    client.rate_limiter.drain()
+    assert client.warm_up().result() is False
+    mock_head.assert_not_called()
+
+def test_warm_up_errors_are_not_raised(mocker):
+    """Test a failed warm-up request is reported, not raised."""
+    mock_head = mocker.patch('requests.Session.head', side_effect=requests.exceptions.ConnectionError("offline"))
+    client = DeezerClient(max_workers=1)
+    assert client.warm_up().result() is False
+    assert mock_head.call_count == 1
+
+def test_search_combined_derives_artists_and_albums(client, mocker):
+    """Test search_combined answers tracks, artists and albums from one generic search."""
+    tracks = [
+        {"id": 1, "title": "One", "artist": {"id": 119, "name": "Metallica"}, "album": {"id": 7, "title": "Justice"}},
+        {"id": 2, "title": "Two", "artist": {"id": 119, "name": "Metallica"}, "album": {"id": 8, "title": "Load"}},
+    ]
+    def fake_request(endpoint, params=None):
+        return {"data": tracks} if endpoint == "/search" else {"data": [{"id": 9, "title": "Metal"}]}
+    mock_make_request = mocker.patch.object(client, '_make_request', side_effect=fake_request)
+
+    results = client.search_combined("metallica", ["track", "artist", "album", "playlist"])
+    assert list(results) == ["track", "artist", "album", "playlist"]
+    assert [track.id for track in results["track"]] == [1, 2]
+    assert [artist.id for artist in results["artist"]] == [119]
+    assert [album.title for album in results["album"]] == ["Justice", "Load"]
+    assert [playlist.id for playlist in results["playlist"]] == [9]
+    assert sorted(call.args[0] for call in mock_make_request.call_args_list) == ["/search", "/search/playlist"]
+
+def test_search_combined_single_type_uses_typed_endpoint(client, mocker):
+    """Test a lone artist search still uses the artist endpoint."""
+    mock_make_request = mocker.patch.object(client, '_make_request', return_value={"data": []})
+    assert client.search_combined("metallica", ["artist"]) == {"artist": []}
+    mock_make_request.assert_called_once_with("/search/artist", params={"q": "metallica"})
+
+def test_search_combined_cancelled(client, mocker):
+    """Test a cancelled combined search sends no requests."""
+    mock_make_request = mocker.patch.object(client, '_make_request')
+    results = client.search_combined("x", ["track", "album"], cancelled=lambda: True)
+    assert results == {"track": [], "album": []}
+    mock_make_request.assert_not_called()
+
+def test_process_exits_without_waiting_for_prefetches():
+    """Test a one-shot process exits right after answering, dropping background searches still running."""
+    code = (
+        "import time, deezer_client; "
+        "client = deezer_client.DeezerClient(); "
+        "client.search = lambda *args, **kwargs: time.sleep(30); "
+        "client.prefetch('metallica', ['track', 'artist']); "
+        "print('answered')"
+    )
+    started = time.monotonic()
+    completed = subprocess.run([sys.executable, "-c", code], cwd=PLUGIN_DIR, capture_output=True, text=True,
+                               timeout=20)
+    assert completed.stdout.strip() == "answered"
+    assert time.monotonic() - started < 10
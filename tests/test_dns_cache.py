@@ -0,0 +1,81 @@
+import os
+import socket
+import threading
+
+import pytest
+
+from dns_cache import DnsCache
+
+ADDRESS = [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("192.0.2.1", 443))]
+
+# --- Fixtures ---
+
+@pytest.fixture
+def resolver(mocker):
+    """Mocks the system resolver."""
+    return mocker.patch("socket.getaddrinfo", return_value=ADDRESS)
+
+@pytest.fixture
+def mock_time(mocker):
+    """Controls the clock used for expiry."""
+    return mocker.patch("dns_cache.time.time", return_value=1000.0)
+
+# --- Test Cases ---
+
+def test_lookups_are_cached_until_ttl(resolver, mock_time):
+    """Test repeated lookups of a cached host only resolve once per TTL."""
+    cache = DnsCache(["api.deezer.com"], ttl=60)
+    cache.install()
+    try:
+        assert socket.getaddrinfo("api.deezer.com", 443) == ADDRESS
+        assert socket.getaddrinfo("api.deezer.com", 443) == ADDRESS
+        assert resolver.call_count == 1
+        mock_time.return_value = 1061.0
+        socket.getaddrinfo("api.deezer.com", 443)
+        assert resolver.call_count == 2
+    finally:
+        cache.uninstall()
+    assert socket.getaddrinfo is resolver
+
+def test_other_hosts_are_not_cached(resolver, mock_time):
+    """Test lookups for hosts outside the list always hit the resolver."""
+    cache = DnsCache(["api.deezer.com"])
+    cache.getaddrinfo("example.com", 443)
+    cache.getaddrinfo("example.com", 443)
+    assert resolver.call_count == 2
+
+def test_lookups_shared_through_state_file(tmp_path, resolver, mock_time):
+    """Test a new process reuses addresses resolved by an earlier one."""
+    state_path = str(tmp_path / "dns.json")
+    DnsCache(["api.deezer.com"], state_path=state_path).getaddrinfo("api.deezer.com", 443)
+    assert DnsCache(["api.deezer.com"], state_path=state_path).getaddrinfo("api.deezer.com", 443) == ADDRESS
+    assert resolver.call_count == 1
+
+def test_concurrent_saves_use_separate_temp_files(tmp_path, resolver, mock_time, mocker, capsys):
+    """Test threads saving the state file at the same time do not share a temp file."""
+    cache = DnsCache(["api.deezer.com"], state_path=str(tmp_path / "dns.json"))
+    both_written = threading.Barrier(2, timeout=5)
+    replace = os.replace
+
+    def replace_together(src, dst):
+        both_written.wait()
+        replace(src, dst)
+
+    mock_replace = mocker.patch("dns_cache.os.replace", side_effect=replace_together)
+    threads = [threading.Thread(target=cache.getaddrinfo, args=("api.deezer.com", port)) for port in (80, 443)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({call.args[0] for call in mock_replace.call_args_list}) == 2
+    assert "Error saving DNS cache" not in capsys.readouterr().out
+
+def test_expired_entry_served_when_resolver_fails(resolver, mock_time):
+    """Test an expired address is used if the resolver is unreachable."""
+    cache = DnsCache(["api.deezer.com"], ttl=60)
+    cache.getaddrinfo("api.deezer.com", 443)
+    mock_time.return_value = 2000.0
+    resolver.side_effect = socket.gaierror("no network")
+    assert cache.getaddrinfo("api.deezer.com", 443) == ADDRESS
+    with pytest.raises(socket.gaierror):
+        cache.getaddrinfo("api.deezer.com", 80)
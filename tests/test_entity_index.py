@@ -0,0 +1,98 @@
+import pytest
+
+from deezer_client import DeezerClient
+from entity_index import EntityIndex, trigrams
+from models import Album, Artist
+
+ARTISTS = [
+    Artist(119, "Metallica", "https://www.deezer.com/artist/119"),
+    Artist(3, "Megadeth", "https://www.deezer.com/artist/3"),
+]
+ALBUMS = [Album(7, "Ride the Lightning", "Metallica", None)]
+
+# --- Fixtures ---
+
+@pytest.fixture
+def index(tmp_path) -> EntityIndex:
+    """Provides an EntityIndex backed by a temporary database."""
+    entity_index = EntityIndex(str(tmp_path / "entities.sqlite3"))
+    yield entity_index
+    entity_index.close()
+
+# --- Test Cases ---
+
+def test_search_finds_added_entities_by_prefix(index):
+    """Test entities can be found by an incomplete last word."""
+    index.add(ARTISTS, "artist")
+    assert index.search("metall", "artist") == [ARTISTS[0]]
+    assert index.search("metall", "album") == []
+
+def test_search_matches_artist_in_compare_string(index):
+    """Test albums are found by their artist name as well as their title."""
+    index.add(ALBUMS, "album")
+    assert index.search("lightning metallica", "album") == ALBUMS
+
+def test_add_refreshes_existing_entities(index):
+    """Test re-adding an entity updates it instead of duplicating it."""
+    index.add(ARTISTS, "artist")
+    index.add([Artist(119, "Metallica", "new")], "artist")
+    assert index.count() == 2
+    assert index.search("metallica", "artist")[0].link == "new"
+
+def test_search_ignores_fts_syntax(index):
+    """Test FTS5 operators in the search term are treated as plain words."""
+    index.add(ARTISTS, "artist")
+    assert index.search('metallica" OR "x', "artist")[0] == ARTISTS[0]
+    assert index.search("", "artist") == []
+
+def test_trigrams_pad_word_boundaries():
+    """Test trigrams include padded word starts and ends."""
+    assert trigrams("Abc") == {" ab", "abc", "bc "}
+    assert trigrams("  ") == set()
+
+def test_search_tolerates_typos(index):
+    """Test trigram candidates find entities the word match misses."""
+    index.add(ARTISTS, "artist")
+    assert index.search("metalica", "artist")[0] == ARTISTS[0]
+    assert index.search("megadet", "artist")[0] == ARTISTS[1]
+    assert index.search("zzzzzz", "artist") == []
+
+def test_word_matches_rank_before_trigram_candidates(index):
+    """Test exact word matches are listed ahead of typo-tolerant candidates."""
+    index.add([Artist(1, "Metal Church", None), Artist(2, "Metallica", None)], "artist")
+    assert index.search("metallica", "artist", limit=2)[0].name == "Metallica"
+
+def test_evicted_entities_leave_trigram_index(tmp_path):
+    """Test evicting an entity removes its trigrams."""
+    index = EntityIndex(str(tmp_path / "entities.sqlite3"), max_entities=1)
+    index.add([ARTISTS[0]], "artist")
+    index.add([ARTISTS[1]], "artist")
+    with index._lock:
+        index._evict()
+        gram_ids = {row[0] for row in index._conn.execute("SELECT DISTINCT entity_id FROM trigrams")}
+    assert index.count() == 1
+    assert len(gram_ids) == 1
+    index.close()
+
+def test_like_fallback_without_fts(index):
+    """Test the LIKE scan used when SQLite lacks FTS5 finds the same entities."""
+    index.add(ARTISTS, "artist")
+    index.has_fts = False
+    assert index.search("metall", "artist") == [ARTISTS[0]]
+
+def test_client_indexes_search_results(index, mocker):
+    """Test DeezerClient adds fetched results to the index and searches it locally."""
+    client = DeezerClient(entity_index=index)
+    raw_artists = [artist._asdict() for artist in ARTISTS]
+    mocker.patch.object(client, '_make_request', return_value={"data": raw_artists})
+    client.search("metallica", "artist")
+    assert client.search_local("metal", "artist") == [ARTISTS[0]]
+
+def test_client_indexes_entities_embedded_in_generic_search(index, mocker):
+    """Test artists and albums embedded in generic search tracks are indexed too."""
+    client = DeezerClient(entity_index=index)
+    track = {"id": 1, "title": "One", "artist": {"id": 119, "name": "Metallica"}, "album": {"id": 7, "title": "Load"}}
+    mocker.patch.object(client, '_make_request', return_value={"data": [track]})
+    client.search("one", "all")
+    assert [artist.id for artist in client.search_local("metallica", "artist")] == [119]
+    assert [album.id for album in client.search_local("load", "album")] == [7]
@@ -0,0 +1,39 @@
+import pytest
+
+from benchmarks.fake_deezer_api import FakeDeezerApi
+from circuit_breaker import CircuitBreaker
+from deezer_client import DeezerClient
+
+# --- Fixtures ---
+
+@pytest.fixture
+def api():
+    """Runs a fake Deezer API without latency."""
+    with FakeDeezerApi(latency=0) as server:
+        yield server
+
+# --- Test Cases ---
+
+def test_client_searches_fake_api(api):
+    """Test DeezerClient talks to the API at api_base."""
+    client = DeezerClient(api_base=api.base_url)
+    results = client.search("metallica", "artist", limit=5)
+    assert [artist.name for artist in results][:2] == ["Metallica", "Metallica 1"]
+    assert api.requests["/search/artist"] == 1
+
+def test_error_rate_fails_requests(mocker):
+    """Test the fake API answers with server errors at the configured rate."""
+    mocker.patch("deezer_client.time.sleep")
+    with FakeDeezerApi(latency=0, error_rate=1.0) as api:
+        client = DeezerClient(api_base=api.base_url, max_retries=1, breaker=CircuitBreaker(failure_threshold=10))
+        assert client.search("metallica", "track") == []
+    assert api.errors == 2  # The request and its retry
+
+def test_benchmark_cached_mode(api):
+    """Test the query benchmark runs and serves the repeated corpus from the cache."""
+    from benchmarks.bench_query import run_mode
+
+    cold, warm = run_mode(api, "cached", ["abc"])
+    assert cold["keystrokes"] == warm["keystrokes"] == 3
+    assert cold["requests"] > 0
+    assert warm["requests"] == 0
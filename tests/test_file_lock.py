@@ -0,0 +1,46 @@
+import os
+import threading
+
+from file_lock import LockFile
+
+# --- Test Cases ---
+
+def test_lock_file_exists_while_held(tmp_path):
+    """Test the lock file is created on entry and removed on exit."""
+    path = str(tmp_path / "state" / "state.lock")
+    with LockFile(path):
+        assert os.path.exists(path)
+    assert not os.path.exists(path)
+
+def test_lock_excludes_other_holders(tmp_path):
+    """Test a second holder waits until the first one releases the lock."""
+    path = str(tmp_path / "state.lock")
+    events = []
+
+    def second_holder():
+        with LockFile(path):
+            events.append("second")
+
+    with LockFile(path):
+        waiter = threading.Thread(target=second_holder)
+        waiter.start()
+        waiter.join(0.05)
+        events.append("first")
+    waiter.join()
+    assert events == ["first", "second"]
+
+def test_stale_lock_is_taken_over(tmp_path, mocker):
+    """Test a lock left behind by a crashed process is taken over after STALE_LOCK_SECONDS."""
+    path = str(tmp_path / "state.lock")
+    open(path, "w").close()
+    now = {"t": 0.0}
+    mocker.patch("file_lock.time.monotonic", side_effect=lambda: now["t"])
+    mocker.patch("file_lock.time.sleep", side_effect=lambda seconds: now.update(t=now["t"] + 0.5))
+    with LockFile(path):
+        assert now["t"] > 2.0
+    assert not os.path.exists(path)
+
+def test_no_path_is_a_no_op():
+    """Test a lock without a path does not touch the filesystem."""
+    with LockFile(None) as lock:
+        assert lock.path is None
@@ -0,0 +1,30 @@
+import pytest
+
+import json_decoder
+from json_decoder import get_decoder
+
+PAYLOAD = b'{"data": [{"id": 1, "title": "One \\u00e9", "artist": {"name": "Metallica"}}], "total": 1}'
+
+# --- Test Cases ---
+
+@pytest.mark.parametrize("name", json_decoder.PREFERRED_DECODERS)
+def test_decoders_agree_with_stdlib(name):
+    """Test every installed decoder returns the same structure as json.loads."""
+    try:
+        _, decode = get_decoder(name)
+    except ImportError:
+        pytest.skip(f"{name} is not installed")
+    assert decode(PAYLOAD) == get_decoder("json")[1](PAYLOAD)
+    assert decode(PAYLOAD.decode()) == decode(PAYLOAD)
+    with pytest.raises(ValueError):
+        decode(b'{"data": [')
+
+def test_get_decoder_picks_first_installed():
+    """Test the default decoder is the first preferred one that imports."""
+    name, _ = get_decoder()
+    assert name in json_decoder.PREFERRED_DECODERS
+
+def test_get_decoder_unknown_name():
+    """Test unknown decoder names are rejected."""
+    with pytest.raises(ValueError):
+        get_decoder("yaml")
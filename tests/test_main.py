@@ -0,0 +1,127 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+pytest.importorskip("flowlauncher")
+
+from debounce import QueryDebouncer
+from main import DeezerControl
+from metrics import MetricsRecorder
+from models import Artist, SearchResults
+from search_cache import CacheEntry
+
+METALLICA = Artist(119, "Metallica", "https://www.deezer.com/artist/119")
+METAL_CHURCH = Artist(4371, "Metal Church", "https://www.deezer.com/artist/4371")
+
+# --- Fixtures ---
+
+@pytest.fixture
+def client():
+    """Provides a stubbed DeezerClient finding nothing locally, without a search cache."""
+    stub = MagicMock()
+    stub.cache = None
+    stub.search_local.return_value = []
+    stub.search_cached_prefix.return_value = None
+    stub.search_many.return_value = {}
+    stub.get_item_url.side_effect = lambda item: item.link
+    return stub
+
+@pytest.fixture
+def plugin(tmp_path, client):
+    """Provides a DeezerControl using the stubbed client, without debouncing."""
+    control = DeezerControl(dispatch=False, cache_dir=str(tmp_path))
+    control.debouncer = QueryDebouncer(0)
+    control.deezer = client
+    return control
+
+# --- Test Cases ---
+
+def test_predictions_are_listed_first(plugin, client):
+    """Test a result chosen for a longer query is listed before the API results for the prefix."""
+    plugin.query_log.record_choice("artist metallica", "artist", METALLICA)
+    client.search_many.return_value = {"artist": SearchResults([METAL_CHURCH, METALLICA])}
+    titles = [result["Title"] for result in plugin.query("artist metal")]
+    assert titles == ["Metallica", "Metal Church"]
+
+def test_predictions_still_search_the_typed_term(plugin, client):
+    """Test a prefix of a logged query is searched on the API, not only predicted."""
+    plugin.query_log.record_choice("artist metallica", "artist", METALLICA)
+    client.search_many.return_value = {"artist": SearchResults([METAL_CHURCH])}
+    plugin.query("artist metal")
+    client.search_many.assert_called_once()
+    assert client.search_many.call_args.args[:2] == ("metal", ["artist"])
+    client.prefetch.assert_not_called()
+
+def test_stats_open_the_search_cache(tmp_path):
+    """Test 'de stats' reports the search cache counters even before any search created a client."""
+    from search_cache import SearchCache
+    cache = SearchCache(str(tmp_path / "search_cache.sqlite3"))
+    cache.set("/search/track", {"q": "metallica"}, {"data": []})
+    cache.get("/search/track", {"q": "metallica"})
+    cache.close()
+    plugin = DeezerControl(dispatch=False, cache_dir=str(tmp_path))
+    titles = [result["Title"] for result in plugin.query("stats")]
+    assert "Search cache: 1 hits, 0 stale hits, 0 misses" in titles
+    assert plugin._deezer is None
+
+def test_stale_results_are_marked(plugin, client):
+    """Test results served from an expired cache entry say they may be out of date."""
+    client.search_many.return_value = {"artist": SearchResults([METALLICA], stale=True)}
+    result = plugin.query("artist metallica")[0]
+    assert result["SubTitle"] == "Artist (possibly stale)"
+
+def test_local_index_answer_is_refreshed_in_background(plugin, client):
+    """Test types answered from the local index skip the API wait but are still searched in the background."""
+    client.search_local.return_value = [
+        METALLICA, Artist(1, "Metallica Tribute", None), Artist(2, "Metallica Symphonic", None), METAL_CHURCH,
+    ]
+    titles = [result["Title"] for result in plugin.query("artist metallica")]
+    assert titles == ["Metallica", "Metallica Tribute", "Metallica Symphonic"]
+    client.search_many.assert_not_called()
+    client.prefetch.assert_called_once_with("metallica", ["artist"], limit=plugin.API_RESULT_LIMIT, combined=False)
+
+def test_prefix_cache_answers_without_the_api(plugin, client):
+    """Test a keystroke extending a cached query is answered from the cached results alone."""
+    client.search_cached_prefix.return_value = CacheEntry("metal", [
+        METAL_CHURCH, METALLICA, Artist(1, "Metallica Tribute", None), Artist(2, "Metallica Symphonic", None),
+    ], 0.0)
+    titles = [result["Title"] for result in plugin.query("artist metallica")]
+    assert titles[0] == "Metallica"
+    assert len(titles) == plugin.MAX_RESULTS_PER_TYPE
+    client.search_many.assert_not_called()
+    client.prefetch.assert_not_called()
+
+def test_superseded_query_is_dropped_before_searching(plugin, client, tmp_path, mocker):
+    """Test a query overtaken by a newer keystroke during the debounce wait never reaches the API."""
+    state_path = str(tmp_path / "latest_query")
+    plugin.debouncer = QueryDebouncer(0.01, state_path)
+    other_process = QueryDebouncer(0.01, state_path)
+    mocker.patch("debounce.time.sleep", side_effect=lambda seconds: other_process.begin("artist metallica"))
+    assert plugin.query("artist metal") == []
+    client.search_many.assert_not_called()
+    assert plugin.debouncer.dropped == 1
+
+def test_stats_list_stage_percentiles(plugin):
+    """Test 'de stats' lists one line of percentiles per recorded stage."""
+    plugin.metrics = MetricsRecorder(enabled=True)
+    plugin.metrics.record("api", 0.1)
+    results = plugin.query("stats")
+    assert results[0]["Title"].startswith("api: p50 ")
+    assert results[0]["SubTitle"] == "1 samples"
+
+def test_stats_say_when_metrics_are_off(plugin):
+    """Test 'de stats' explains how to turn metrics on when they are disabled."""
+    results = plugin.query("stats")
+    assert results[0]["Title"] == "Deezer Control: latency metrics are off"
+
+def test_handle_request_only_dispatches_rpc_methods(plugin, mocker):
+    """Test forwarded requests can call the plugin's RPC methods and nothing else."""
+    mock_stop = mocker.patch.object(plugin, "stop_desktop")
+    assert plugin.handle_request({"method": "stop_desktop", "parameters": []}) is None
+    mock_stop.assert_called_once_with()
+    assert plugin.handle_request({"method": "query", "parameters": ["stop"]})["result"][0]["JsonRPCAction"] == {
+        "method": "stop_desktop", "parameters": [],
+    }
+    for method_name in ("handle_request", "debug", "_run_query", "__init__"):
+        with pytest.raises(ValueError, match="Method not allowed"):
+            plugin.handle_request({"method": method_name, "parameters": []})
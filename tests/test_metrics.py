@@ -0,0 +1,116 @@
+import json
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from deezer_client import DeezerClient
+from dns_cache import DnsCache
+from metrics import Histogram, MetricsRecorder, NULL_METRICS, _bucket_index, _bucket_range
+
+# --- Fixtures ---
+
+@pytest.fixture
+def mock_time(mocker):
+    """Controls the clock used for window rotation."""
+    return mocker.patch("metrics.time.time", return_value=1000.0)
+
+@pytest.fixture
+def metrics_path(tmp_path):
+    """Provides a metrics file path in a temporary directory."""
+    return str(tmp_path / "metrics.json")
+
+# --- Test Cases ---
+
+@pytest.mark.parametrize("value", [0, 1, 31, 32, 33, 1000, 123456, 10 ** 9])
+def test_bucket_contains_value(value):
+    """Test every value falls inside the range of its bucket, within about 6%."""
+    low, high = _bucket_range(_bucket_index(value))
+    assert low <= value <= high
+    assert high - low <= max(1, value) / 16
+
+def test_histogram_percentiles():
+    """Test percentiles are reported within the bucket precision."""
+    histogram = Histogram()
+    for millis in range(1, 101):
+        histogram.record(millis / 1000)
+    assert histogram.total == 100
+    assert histogram.percentile(50) == pytest.approx(0.050, rel=0.07)
+    assert histogram.percentile(99) == pytest.approx(0.099, rel=0.07)
+    assert Histogram().percentile(50) is None
+
+def test_histogram_json_round_trip():
+    """Test a histogram survives serialization and merges by bucket."""
+    histogram = Histogram()
+    histogram.record(0.01)
+    restored = Histogram.from_json(json.loads(json.dumps(histogram.to_json())))
+    assert restored.merge(histogram).counts == {index: 2 for index in histogram.counts}
+
+def test_flush_merges_processes(metrics_path, mock_time):
+    """Test samples from several recorders add up in the metrics file."""
+    for seconds in (0.01, 0.02):
+        recorder = MetricsRecorder(metrics_path)
+        with recorder.stage("api"):
+            pass
+        recorder.record("api", seconds)
+        recorder.flush()
+    stage, samples, percentiles = MetricsRecorder(metrics_path).summary()[0]
+    assert (stage, samples) == ("api", 4)
+    assert set(percentiles) == {50, 95, 99}
+
+def test_windows_rotate_and_expire(metrics_path, mock_time):
+    """Test the previous window is kept and older samples are dropped."""
+    recorder = MetricsRecorder(metrics_path, window=60)
+    recorder.record("rank", 0.001)
+    recorder.flush()
+    mock_time.return_value = 1061.0
+    recorder.record("rank", 0.001)
+    recorder.flush()
+    assert recorder.histograms()["rank"].total == 2
+    mock_time.return_value = 1182.0
+    assert recorder.histograms() == {}
+
+def test_disabled_recorder_does_nothing(metrics_path):
+    """Test a disabled recorder neither keeps samples nor writes the file."""
+    recorder = MetricsRecorder(metrics_path, enabled=False)
+    with recorder.stage("query"):
+        pass
+    recorder.record("query", 0.1)
+    recorder.flush()
+    assert recorder.histograms() == {}
+    assert not NULL_METRICS.histograms()
+
+def test_client_times_http_and_decode(mocker):
+    """Test DeezerClient records the HTTP round trip and decoding of each request."""
+    response = MagicMock(status_code=200, content=json.dumps({"data": []}).encode())
+    mocker.patch("requests.Session.get", return_value=response)
+    recorder = MetricsRecorder()
+    DeezerClient(metrics=recorder)._make_request("/search/track", {"q": "x"})
+    assert {stage: histogram.total for stage, histogram in recorder.histograms().items()} == {
+        "rate_limit_wait": 1, "http": 1, "decode": 1,
+    }
+
+def test_concurrent_flushes_keep_every_sample(metrics_path, mock_time):
+    """Test flushes racing from several recorders never overwrite each other's samples."""
+    recorders = [MetricsRecorder(metrics_path) for _ in range(4)]
+
+    def flush_repeatedly(recorder):
+        for _ in range(10):
+            recorder.record("api", 0.01)
+            recorder.flush()
+
+    threads = [threading.Thread(target=flush_repeatedly, args=(recorder,)) for recorder in recorders]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert MetricsRecorder(metrics_path).histograms()["api"].total == 40
+
+def test_dns_cache_times_resolver_lookups(mocker):
+    """Test DnsCache records a dns sample for each lookup that reaches the resolver."""
+    mocker.patch("socket.getaddrinfo", return_value=[])
+    recorder = MetricsRecorder()
+    cache = DnsCache(["api.deezer.com"], metrics=recorder)
+    cache.getaddrinfo("api.deezer.com", 443)
+    cache.getaddrinfo("api.deezer.com", 443)
+    assert recorder.histograms()["dns"].total == 1
@@ -0,0 +1,46 @@
+from models import (
+    Album, Artist, Playlist, Track, embedded_albums, embedded_artists, parse_item, parse_items, record_from_fields,
+)
+
+RAW_TRACK = {
+    "id": 1, "title": "One", "link": "https://www.deezer.com/track/1", "preview": "x", "md5_image": "y",
+    "artist": {"id": 119, "name": "Metallica", "picture": "z"},
+    "album": {"id": 7, "title": "...And Justice for All", "cover": "w"},
+}
+
+# --- Test Cases ---
+
+def test_parse_item_keeps_only_used_fields():
+    """Test items are trimmed to the fields the plugin formats and ranks."""
+    assert parse_item(RAW_TRACK, "track") == Track(
+        1, "One", "Metallica", "...And Justice for All", "https://www.deezer.com/track/1"
+    )
+    assert parse_item({"id": 119, "name": "Metallica"}, "artist") == Artist(119, "Metallica", None)
+    assert parse_item({"id": 7, "title": "Load", "artist": {"name": "Metallica"}}, "album") == Album(
+        7, "Load", "Metallica", None
+    )
+    assert parse_item({"id": 2, "title": "Metal", "user": {"name": "Bob"}}, "playlist") == Playlist(
+        2, "Metal", "Bob", None
+    )
+
+def test_parse_item_missing_fields():
+    """Test missing or null fields become empty strings."""
+    assert parse_item({"id": 1, "artist": None}, "track") == Track(1, "", "", "", None)
+
+def test_parse_items_treats_unknown_types_as_tracks():
+    """Test items from the generic /search endpoint are parsed as tracks."""
+    assert parse_items([RAW_TRACK], "invalid_type")[0].artist_name == "Metallica"
+
+def test_record_from_fields_round_trip():
+    """Test records rebuild from their field values."""
+    track = parse_item(RAW_TRACK, "track")
+    assert record_from_fields(list(track), "track") == track
+
+def test_embedded_artists_and_albums_are_deduplicated():
+    """Test artists and albums embedded in tracks are collected once each, in order."""
+    second = {**RAW_TRACK, "id": 2, "album": {"id": 8, "title": "Load"}}
+    assert embedded_artists([RAW_TRACK, second]) == [Artist(119, "Metallica", "https://www.deezer.com/artist/119")]
+    assert embedded_albums([RAW_TRACK, second, {"id": 3}]) == [
+        Album(7, "...And Justice for All", "Metallica", "https://www.deezer.com/album/7"),
+        Album(8, "Load", "Metallica", "https://www.deezer.com/album/8"),
+    ]
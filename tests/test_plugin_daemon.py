@@ -0,0 +1,75 @@
+import json
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+import plugin_daemon
+from plugin_daemon import DaemonServer, DaemonUnavailable
+
+# --- Fixtures ---
+
+@pytest.fixture
+def server(tmp_path):
+    """Runs a DaemonServer with an echo handler on a background thread."""
+    def handler(rpc_request):
+        if rpc_request.get("method") == "query":
+            return {"result": [{"Title": rpc_request["parameters"][0]}], "debugMessage": ""}
+        return None
+    daemon_server = DaemonServer(handler, str(tmp_path))
+    thread = threading.Thread(target=daemon_server.run, daemon=True)
+    thread.start()
+    yield daemon_server
+    daemon_server.shutdown()
+    thread.join(timeout=5)
+
+# --- Test Cases ---
+
+def test_forward_returns_handler_response(server, tmp_path):
+    """Test a forwarded query returns the daemon's response payload."""
+    response = plugin_daemon.forward({"method": "query", "parameters": ["metallica"]}, str(tmp_path))
+    assert response == {"result": [{"Title": "metallica"}], "debugMessage": ""}
+
+def test_forward_action_returns_none(server, tmp_path):
+    """Test forwarded actions produce no output."""
+    assert plugin_daemon.forward({"method": "open_url", "parameters": ["x"]}, str(tmp_path)) is None
+
+def test_forward_rejects_wrong_token(server, tmp_path):
+    """Test requests without the daemon's token are refused."""
+    state_path = tmp_path / plugin_daemon.STATE_FILE_NAME
+    state = json.loads(state_path.read_text())
+    state["token"] = "wrong"
+    state_path.write_text(json.dumps(state))
+    with pytest.raises(DaemonUnavailable, match="invalid token"):
+        plugin_daemon.forward({"method": "query", "parameters": [""]}, str(tmp_path))
+
+def test_forward_without_daemon_raises(tmp_path):
+    """Test forward raises DaemonUnavailable when no daemon is running."""
+    with pytest.raises(DaemonUnavailable):
+        plugin_daemon.forward({"method": "query", "parameters": [""]}, str(tmp_path))
+    assert not plugin_daemon.is_running(str(tmp_path))
+
+def test_state_file_removed_on_shutdown(tmp_path):
+    """Test the daemon removes its state file when it stops."""
+    daemon_server = DaemonServer(lambda request: None, str(tmp_path), idle_timeout=0.1)
+    assert plugin_daemon.is_running(str(tmp_path))
+    daemon_server.run()  # Returns once the idle timeout fires
+    assert not (tmp_path / plugin_daemon.STATE_FILE_NAME).exists()
+
+def test_idle_task_runs_once_per_idle_period(tmp_path, mocker):
+    """Test the idle task runs after a request once the daemon has been idle for a while."""
+    mocker.patch("plugin_daemon.IDLE_TASK_DELAY_SECONDS", 0.05)
+    on_idle = MagicMock()
+    daemon_server = DaemonServer(lambda request: None, str(tmp_path), idle_timeout=0.3, on_idle=on_idle)
+    time.sleep(0.01)
+    daemon_server.touch()  # A request came in
+    daemon_server.run()
+    on_idle.assert_called_once()
+
+def test_start_daemon_backs_off(tmp_path, mocker):
+    """Test a second spawn within the backoff window is skipped."""
+    mock_popen = mocker.patch("subprocess.Popen")
+    assert plugin_daemon.start_daemon("main.py", str(tmp_path)) is True
+    assert plugin_daemon.start_daemon("main.py", str(tmp_path)) is False
+    mock_popen.assert_called_once()
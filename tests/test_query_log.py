@@ -0,0 +1,72 @@
+import pytest
+
+from models import Artist, Track
+from query_log import QueryLog
+
+METALLICA = Artist(119, "Metallica", "https://www.deezer.com/artist/119")
+ONE = Track(3135556, "One", "Metallica", "...And Justice for All", "https://www.deezer.com/track/3135556")
+
+# --- Fixtures ---
+
+@pytest.fixture
+def mock_time(mocker):
+    """Controls the clock used for decay."""
+    return mocker.patch("query_log.time.time", return_value=1000.0)
+
+@pytest.fixture
+def log(tmp_path, mock_time):
+    """Provides an empty query log with a one-day half-life."""
+    query_log = QueryLog(str(tmp_path / "query_log.sqlite3"), half_life=86400)
+    yield query_log
+    query_log.close()
+
+# --- Test Cases ---
+
+def test_predict_by_prefix(log):
+    """Test typed prefixes predict the results chosen for longer queries."""
+    log.record_choice("Metallica", "artist", METALLICA)
+    predictions = log.predict("met")
+    assert [(p.query, p.item_type, p.record) for p in predictions] == [("metallica", "artist", METALLICA)]
+    assert log.predict("mex") == []
+    assert log.predict("  ") == []
+
+def test_frequency_and_recency(log, mock_time):
+    """Test an old frequent choice loses against recent ones once it has decayed."""
+    log.record_choice("metallica", "artist", METALLICA)
+    log.record_choice("metallica", "artist", METALLICA)
+    mock_time.return_value = 1000.0 + 2 * 86400  # Two half-lives: weight 2 -> 0.5
+    log.record_choice("metallica one", "track", ONE)
+    assert [p.record for p in log.predict("metallica")] == [ONE, METALLICA]
+    assert log.likely_queries()[0] == ("metallica one", pytest.approx(1.0))
+
+def test_log_is_pruned(tmp_path, mock_time):
+    """Test only the best scoring choices are kept."""
+    log = QueryLog(str(tmp_path / "query_log.sqlite3"), max_entries=2)
+    log.record_choice("metallica", "artist", METALLICA)
+    log.record_choice("metallica", "artist", METALLICA)
+    log.record_choice("one", "track", ONE)
+    log.record_choice("metallica one", "track", ONE)
+    assert [query for query, _ in log.likely_queries()] == ["metallica", "metallica one"]
+    log.close()
+
+def test_plugin_predicts_and_prefetches(tmp_path, mocker):
+    """Test a chosen result is listed first for the first keystrokes of its query, and is prefetched."""
+    from benchmarks.bench_query import make_plugin
+    from benchmarks.fake_deezer_api import FakeDeezerApi
+    from search_cache import SearchCache
+
+    mocker.patch("webbrowser.open")
+    with FakeDeezerApi(latency=0) as api:
+        plugin = make_plugin(api.base_url, "concurrent", str(tmp_path))
+        chosen = plugin.query("artist metallica")[0]
+        plugin.open_url(*chosen["JsonRPCAction"]["parameters"])
+
+        results = plugin.query("artist me")
+        assert results[0]["Title"] == chosen["Title"]
+        assert api.requests["/search/artist"] == 2  # 'me' was searched as well
+
+        plugin.deezer.cache = SearchCache(str(tmp_path / "search_cache.sqlite3"))
+        plugin.deezer._background = None
+        plugin._prefetch_likely_queries()
+        plugin.deezer.background.shutdown(wait=True)
+        assert plugin.deezer.cache.get("/search/artist", {"q": "metallica"}) is not None
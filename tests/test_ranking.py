@@ -0,0 +1,80 @@
+import pytest
+
+import ranking
+from models import Album, Artist, Playlist, SearchResults, Track
+from ranking import get_compare_string, rank_batch, score_items
+
+ARTISTS = [Artist(1, "Metallica Tribute", None), Artist(2, "Megadeth", None),
+           Artist(3, "Metallica", None), Artist(4, "Metallica", None)]
+ALBUMS = [Album(5, "Ride the Lightning", "Metallica", None), Album(6, "Metallica", "Metallica", None)]
+
+# --- Fixtures ---
+
+@pytest.fixture(params=["numpy", "fallback"])
+def scoring_path(request, monkeypatch):
+    """Runs a test with vectorized NumPy scoring and with the item-by-item fallback."""
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(ranking, "np", None)
+    return request.param
+
+# --- Test Cases ---
+
+def test_get_compare_string_per_type():
+    """Test compare strings include the artist or creator where relevant."""
+    assert get_compare_string(ARTISTS[2], "artist") == "Metallica"
+    assert get_compare_string(ALBUMS[0], "album") == "Ride the Lightning Metallica"
+    assert get_compare_string(Playlist(1, "Metal", "Bob", None), "playlist") == "Metal Bob"
+    assert get_compare_string(Track(1, "One", "Metallica", "", None), "track") == "One Metallica"
+    assert get_compare_string(Track(1, "One", "", "", None), "unknown") == ""
+
+def test_score_items_ignores_case_and_punctuation(scoring_path):
+    """Test scoring preprocesses both the term and the candidates."""
+    assert score_items("METALLICA!", ["metallica", "Megadeth"])[0] == 100
+
+def test_rank_batch_keeps_top_items_per_type(scoring_path):
+    """Test rank_batch returns the best `limit` items per type, ties in API order."""
+    ranked = rank_batch("metallica", {"artist": ARTISTS, "album": ALBUMS}, limit=3)
+    assert ranked["artist"] == [ARTISTS[0], ARTISTS[2], ARTISTS[3]]
+    assert ranked["album"] == ALBUMS
+
+    ranked = rank_batch("lightning", {"artist": ARTISTS, "album": ALBUMS}, limit=1)
+    assert ranked["album"] == [ALBUMS[0]]
+    assert len(ranked["artist"]) == 1
+
+def test_rank_batch_min_score(scoring_path):
+    """Test items scoring below min_score are dropped."""
+    ranked = rank_batch("megadeth", {"artist": ARTISTS}, limit=10, min_score=90)
+    assert ranked["artist"] == [ARTISTS[1]]
+
+def test_rank_batch_empty_types(scoring_path):
+    """Test types without candidates rank to empty lists."""
+    assert rank_batch("metallica", {"track": []}, limit=3) == {"track": []}
+
+def test_rank_batch_keeps_stale_flag(scoring_path):
+    """Test ranked SearchResults stay flagged stale."""
+    ranked = rank_batch("metallica", {"artist": SearchResults(ARTISTS, stale=True), "album": ALBUMS}, limit=3)
+    assert ranked["artist"].stale
+    assert not ranked["album"].stale
+
+def test_top_k_matches_full_ranking():
+    """Test top_k returns the same items as ranking everything, cut to k."""
+    items = ARTISTS + [Artist(7, "Metal Church", None), Artist(8, "Metallica Cover Band", None)]
+    full = rank_batch("metallica", {"artist": items}, limit=len(items))["artist"]
+    assert ranking.top_k("metallica", items, "artist", k=3, stop_score=101) == full[:3]
+    assert ranking.top_k("metallica", items, "artist") == full
+
+def test_top_k_min_score():
+    """Test top_k drops items scoring below min_score."""
+    assert ranking.top_k("megadeth", ARTISTS, "artist", k=3, min_score=90) == [ARTISTS[1]]
+
+def test_top_k_stops_early_on_perfect_matches():
+    """Test top_k stops consuming items once k items reach stop_score."""
+    consumed = []
+    def stream():
+        for item in ARTISTS:
+            consumed.append(item)
+            yield item
+    assert ranking.top_k("metallica", stream(), "artist", k=1) == [ARTISTS[0]]
+    assert consumed == [ARTISTS[0]]
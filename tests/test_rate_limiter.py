@@ -0,0 +1,59 @@
+import pytest
+
+from rate_limiter import TokenBucket, RateLimitTimeout
+
+# --- Fixtures ---
+
+@pytest.fixture
+def clock(mocker):
+    """Fakes time so waiting is instant: sleeping advances both clocks."""
+    now = {"t": 1000.0}
+    mocker.patch("rate_limiter.time.time", side_effect=lambda: now["t"])
+    mocker.patch("rate_limiter.time.monotonic", side_effect=lambda: now["t"])
+    mocker.patch("rate_limiter.time.sleep", side_effect=lambda seconds: now.update(t=now["t"] + seconds))
+    return now
+
+# --- Test Cases ---
+
+def test_burst_up_to_rate_without_waiting(clock):
+    """Test a full bucket allows `rate` requests immediately."""
+    bucket = TokenBucket(rate=5, period=1.0)
+    assert [bucket.acquire() for _ in range(5)] == [0.0] * 5
+    assert bucket.available() == pytest.approx(0.0)
+    assert bucket.wait_time() == pytest.approx(0.2)
+
+def test_acquire_waits_for_refill(clock):
+    """Test an empty bucket makes the caller wait for the next token."""
+    bucket = TokenBucket(rate=5, period=1.0)
+    for _ in range(5):
+        bucket.acquire()
+    assert bucket.acquire() == pytest.approx(0.2)
+    stats = bucket.stats()
+    assert stats["acquired"] == 6
+    assert stats["waits"] == 1
+    assert stats["total_wait"] == pytest.approx(0.2)
+
+def test_acquire_timeout(clock):
+    """Test acquire gives up when the wait would exceed the timeout."""
+    bucket = TokenBucket(rate=1, period=10.0)
+    bucket.acquire()
+    with pytest.raises(RateLimitTimeout):
+        bucket.acquire(timeout=1.0)
+
+def test_drain_empties_bucket(clock):
+    """Test drain forces the next request to wait."""
+    bucket = TokenBucket(rate=5, period=1.0)
+    bucket.drain()
+    assert bucket.available() == pytest.approx(0.0)
+
+def test_state_shared_between_processes(clock, tmp_path):
+    """Test buckets sharing a state file share one budget."""
+    state_path = str(tmp_path / "rate_limit.json")
+    first_process = TokenBucket(rate=4, period=1.0, state_path=state_path)
+    second_process = TokenBucket(rate=4, period=1.0, state_path=state_path)
+    first_process.acquire()
+    first_process.acquire()
+    second_process.acquire()
+    assert second_process.available() == pytest.approx(1.0)
+    assert first_process.available() == pytest.approx(1.0)
+    assert not (tmp_path / "rate_limit.json.lock").exists()
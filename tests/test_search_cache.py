@@ -0,0 +1,223 @@
+import json
+
+import pytest
+import requests
+
+from deezer_client import DeezerClient
+from models import Track
+from search_cache import SearchCache
+
+# --- Fixtures ---
+
+@pytest.fixture
+def cache(tmp_path) -> SearchCache:
+    """Provides a SearchCache backed by a temporary database."""
+    search_cache = SearchCache(str(tmp_path / "cache.sqlite3"), ttl=60, max_entries=3)
+    yield search_cache
+    search_cache.close()
+
+# --- Test Cases ---
+
+def test_set_then_get_returns_response(cache):
+    """Test a stored response is returned on lookup."""
+    cache.set("/search/track", {"q": "test"}, {"data": [{"id": 1}]})
+    assert cache.get("/search/track", {"q": "test"}) == {"data": [{"id": 1}]}
+
+def test_get_normalizes_query(cache):
+    """Test queries differing only in case and whitespace share an entry."""
+    cache.set("/search/track", {"q": "Master  of Puppets"}, {"data": []})
+    assert cache.get("/search/track", {"q": " master of puppets "}) == {"data": []}
+
+def test_get_expired_entry_is_miss(cache, mocker):
+    """Test entries older than the TTL are not returned."""
+    mock_time = mocker.patch("search_cache.time.time", return_value=1000.0)
+    cache.set("/search/track", {"q": "test"}, {"data": []})
+    mock_time.return_value = 1061.0
+    assert cache.get("/search/track", {"q": "test"}) is None
+    assert cache.get("/search/track", {"q": "test"}, max_age=120) == {"data": []}
+
+def test_lru_eviction_keeps_recently_used(cache, mocker):
+    """Test the least recently used entry is evicted when the cache is full."""
+    mock_time = mocker.patch("search_cache.time.time", return_value=1000.0)
+    for index, query in enumerate(["a", "b", "c"]):
+        mock_time.return_value = 1000.0 + index
+        cache.set("/search/track", {"q": query}, {"data": [query]})
+    mock_time.return_value = 1010.0
+    cache.get("/search/track", {"q": "a"})  # 'a' is now the most recently used
+    mock_time.return_value = 1011.0
+    cache.set("/search/track", {"q": "d"}, {"data": ["d"]})
+
+    assert cache.get("/search/track", {"q": "b"}) is None
+    assert cache.get("/search/track", {"q": "a"}) is not None
+    assert cache.stats()["entries"] == 3
+
+def test_counters_persist_between_instances(tmp_path):
+    """Test hit/miss counters survive reopening the cache."""
+    path = str(tmp_path / "cache.sqlite3")
+    first = SearchCache(path)
+    first.set("/search/track", {"q": "test"}, {"data": []})
+    first.get("/search/track", {"q": "test"})
+    first.get("/search/track", {"q": "other"})
+    first.close()
+
+    second = SearchCache(path)
+    assert second.stats() == {
+        "hits": 1, "misses": 1, "prefix_hits": 0, "stale_hits": 0,
+        "not_modified": 0, "bytes_saved": 0, "revalidation_ms": 0, "entries": 1,
+    }
+    second.close()
+
+def test_client_search_uses_cache(cache, mocker):
+    """Test DeezerClient.search only hits the network on a cache miss."""
+    client = DeezerClient(cache=cache)
+    mock_make_request = mocker.patch.object(client, '_make_request', return_value={"data": [{"id": 1}]})
+
+    assert client.search("test", "track") == [Track(1, "", "", "", None)]
+    assert client.search("test", "track") == [Track(1, "", "", "", None)]
+    mock_make_request.assert_called_once_with("/search/track", params={"q": "test"})
+
+def test_find_prefix_returns_longest_prefix(cache):
+    """Test find_prefix picks the longest cached query the new query extends."""
+    cache.set("/search/artist", {"q": "met"}, {"data": ["met"]})
+    cache.set("/search/artist", {"q": "metalli"}, {"data": ["metalli"]})
+    cache.set("/search/album", {"q": "metallic"}, {"data": ["album"]})
+
+    entry = cache.find_prefix("/search/artist", {"q": "Metallic"})
+
+    assert entry.query == "metalli"
+    assert entry.data == {"data": ["metalli"]}
+    assert cache.stats()["prefix_hits"] == 1
+
+def test_find_prefix_respects_min_length_and_params(cache):
+    """Test find_prefix ignores short prefixes and entries with other parameters."""
+    cache.set("/search/artist", {"q": "me"}, {"data": []})
+    cache.set("/search/artist", {"q": "meta", "limit": 3}, {"data": []})
+    assert cache.find_prefix("/search/artist", {"q": "metal"}, min_length=3) is None
+    assert cache.find_prefix("/search/artist", {"q": "metal", "limit": 3}).query == "meta"
+
+def test_client_search_cached_prefix(cache):
+    """Test DeezerClient.search_cached_prefix looks up the typed search endpoint."""
+    client = DeezerClient(cache=cache)
+    cache.set("/search/track", {"q": "master of"}, {"data": [{"id": 1}]})
+    assert client.search_cached_prefix("master of pup", "track").data == [Track(1, "", "", "", None)]
+    assert client.search_cached_prefix("master of pup", "album") is None
+
+def test_client_search_cached_prefix_combined(cache):
+    """Test combined prefix lookups derive artists and albums from a cached generic search."""
+    client = DeezerClient(cache=cache)
+    tracks = [{"id": 1, "title": "One", "artist": {"id": 119, "name": "Metallica"}, "album": {"id": 7, "title": "Justice"}}]
+    cache.set("/search", {"q": "metal"}, {"data": tracks})
+    assert client.search_cached_prefix("metallica", "artist") is None
+    assert [artist.id for artist in client.search_cached_prefix("metallica", "artist", combined=True).data] == [119]
+    assert [album.id for album in client.search_cached_prefix("metallica", "album", combined=True).data] == [7]
+    assert client.search_cached_prefix("metallica", "playlist", combined=True) is None
+
+def test_client_prefetch_combined_sends_one_generic_search(cache, mocker):
+    """Test a combined prefetch refreshes tracks, artists and albums with a single request."""
+    client = DeezerClient(cache=cache)
+    mock_make_request = mocker.patch.object(client, '_make_request', return_value={"data": []})
+    client.prefetch("metallica", ["track", "artist", "album", "playlist"], combined=True)
+    client.shutdown(wait=True)
+    assert sorted(call.args[0] for call in mock_make_request.call_args_list) == ["/search", "/search/playlist"]
+
+def test_client_search_serves_stale_entry_on_failure(cache, mocker):
+    """Test search falls back to an expired cached response when the API fails."""
+    mock_time = mocker.patch("search_cache.time.time", return_value=1000.0)
+    cache.set("/search/track", {"q": "test"}, {"data": [{"id": 1}]})
+    mock_time.return_value = 5000.0
+    client = DeezerClient(cache=cache)
+    mocker.patch.object(client, '_make_request', side_effect=requests.exceptions.ConnectionError)
+
+    assert client.search("test", "track") == [Track(1, "", "", "", None)]
+
+def test_get_entry_reports_age_and_stale_hits(cache, mocker):
+    """Test get_entry returns the entry age and counts expired entries as stale hits."""
+    mock_time = mocker.patch("search_cache.time.time", return_value=1000.0)
+    cache.set("/search/track", {"q": "test"}, {"data": []})
+    mock_time.return_value = 1100.0
+    assert cache.get_entry("/search/track", {"q": "test"}) is None
+    entry = cache.get_entry("/search/track", {"q": "Test"}, max_age=200)
+    assert entry == ("test", {"data": []}, 100.0)
+    assert cache.stats()["stale_hits"] == 1
+
+def test_client_serves_expired_entry_while_revalidating(cache, mocker):
+    """Test an expired entry is returned at once, flagged stale, and refreshed in the background."""
+    mock_time = mocker.patch("search_cache.time.time", return_value=1000.0)
+    cache.set("/search/track", {"q": "test"}, {"data": [{"id": 1}]})
+    mock_time.return_value = 1100.0
+    client = DeezerClient(cache=cache, max_staleness=3600)
+    mock_make_request = mocker.patch.object(client, '_make_request', return_value={"data": [{"id": 2}]})
+
+    results = client.search("test", "track")
+    assert results == [Track(1, "", "", "", None)]
+    assert results.stale
+    client.shutdown(wait=True)
+    mock_make_request.assert_called_once_with("/search/track", params={"q": "test"})
+
+    refreshed = client.search("test", "track")
+    assert refreshed == [Track(2, "", "", "", None)]
+    assert not refreshed.stale
+
+def test_client_waits_for_api_beyond_max_staleness(cache, mocker):
+    """Test entries older than max_staleness are not served while the API works."""
+    mock_time = mocker.patch("search_cache.time.time", return_value=1000.0)
+    cache.set("/search/track", {"q": "test"}, {"data": [{"id": 1}]})
+    mock_time.return_value = 5000.0
+    client = DeezerClient(cache=cache, max_staleness=None)
+    mocker.patch.object(client, '_make_request', return_value={"data": [{"id": 2}]})
+    assert client.search("test", "track") == [Track(2, "", "", "", None)]
+
+def test_client_revalidates_each_entry_once(cache, mocker):
+    """Test concurrent stale hits on one entry start a single background refresh."""
+    mock_time = mocker.patch("search_cache.time.time", return_value=1000.0)
+    cache.set("/search/track", {"q": "test"}, {"data": []})
+    mock_time.return_value = 1100.0
+    client = DeezerClient(cache=cache)
+    mock_submit = mocker.patch.object(client.background, "submit")
+    client.search("test", "track")
+    client.search("test", "track")
+    mock_submit.assert_called_once()
+
+def _http_response(status_code, payload=None, headers=None):
+    """Builds a requests.Response with the given status, JSON body and headers."""
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = b"" if payload is None else json.dumps(payload).encode()
+    response.headers.update(headers or {})
+    return response
+
+def test_client_revalidates_with_validators(cache, mocker):
+    """Test expired entries are revalidated conditionally and a 304 is counted once, as not_modified."""
+    mock_time = mocker.patch("search_cache.time.time", return_value=1000.0)
+    mock_get = mocker.patch("requests.Session.get", return_value=_http_response(
+        200, {"data": [{"id": 1}]}, {"ETag": '"v1"', "Last-Modified": "Sat, 17 Oct 2026 10:00:00 GMT"},
+    ))
+    client = DeezerClient(cache=cache, max_staleness=None)
+    assert client.search("test", "track") == [Track(1, "", "", "", None)]
+    assert "headers" not in mock_get.call_args.kwargs
+
+    mock_time.return_value = 2000.0
+    mock_get.return_value = _http_response(304)
+    assert client.search("test", "track") == [Track(1, "", "", "", None)]
+    assert mock_get.call_args.kwargs["headers"] == {
+        "If-None-Match": '"v1"', "If-Modified-Since": "Sat, 17 Oct 2026 10:00:00 GMT",
+    }
+    stats = cache.stats()
+    assert stats["not_modified"] == 1
+    assert (stats["hits"], stats["stale_hits"]) == (0, 0)
+    assert stats["bytes_saved"] == len(json.dumps({"data": [{"id": 1}]}))
+
+    # The 304 refreshed the entry, so it is fresh again
+    assert client.search("test", "track") == [Track(1, "", "", "", None)]
+    assert mock_get.call_count == 2
+
+def test_client_stores_no_validators_for_api_errors(cache, mocker):
+    """Test validators of error responses are not paired with an older cached body."""
+    mocker.patch("requests.Session.get", return_value=_http_response(
+        200, {"error": {"type": "Exception", "message": "no"}}, {"ETag": '"err"'},
+    ))
+    client = DeezerClient(cache=cache)
+    cache.set("/search/track", {"q": "test"}, {"data": []})
+    with pytest.raises(ValueError):
+        client._make_request("/search/track", {"q": "test"})
+    assert cache.get_validators("/search/track", {"q": "test"}) is None
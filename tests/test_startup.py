@@ -0,0 +1,60 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cold-import budget for main.py, measured with 'python -X importtime'
+STARTUP_IMPORT_BUDGET_MS = 75
+# Modules that must only be imported on the code paths that use them
+HEAVY_MODULES = ["requests", "httpx", "thefuzz", "rapidfuzz", "numpy", "orjson", "msgspec", "pynput", "webbrowser"]
+
+pytest.importorskip("flowlauncher")
+
+# --- Helpers ---
+
+def _run_python(*args: str) -> subprocess.CompletedProcess:
+    """Runs a fresh interpreter in the plugin directory."""
+    return subprocess.run(
+        [sys.executable, *args], cwd=PLUGIN_DIR, capture_output=True, text=True, check=True,
+    )
+
+# --- Test Cases ---
+
+def test_main_import_skips_heavy_modules():
+    """Test importing main.py pulls in none of the heavy modules."""
+    code = (
+        "import json, sys, main; "
+        f"print(json.dumps([name for name in {HEAVY_MODULES!r} if name in sys.modules]))"
+    )
+    assert json.loads(_run_python("-c", code).stdout) == []
+
+def test_main_cold_import_within_budget():
+    """Test the cumulative import time of main.py stays under the startup budget."""
+    stderr = _run_python("-X", "importtime", "-c", "import main").stderr
+    # Lines look like: 'import time:  self [us] | cumulative | imported package'
+    cumulative_us = next(
+        int(line.split("|")[1])
+        for line in stderr.splitlines()
+        if line.startswith("import time:") and line.split("|")[2].strip() == "main"
+    )
+    assert cumulative_us / 1000 < STARTUP_IMPORT_BUDGET_MS
+
+@pytest.mark.parametrize("query", ["stop", ""])
+def test_in_process_request_skips_heavy_modules(tmp_path, query):
+    """Test answering a command in-process creates no client, opens no database and imports no heavy module."""
+    request = json.dumps({"method": "query", "parameters": [query]})
+    code = (
+        "import json, sys, main; "
+        f"sys.argv = ['main.py', {request!r}]; "
+        f"plugin = main.DeezerControl(cache_dir={str(tmp_path)!r}); "
+        f"print(json.dumps([name for name in {HEAVY_MODULES!r} if name in sys.modules]), "
+        "plugin._deezer is None and plugin._query_log is None)"
+    )
+    response, loaded = _run_python("-c", code).stdout.splitlines()
+    assert json.loads(response)["result"]
+    assert loaded == "[] True"
+    assert not list(tmp_path.glob("*.sqlite3"))
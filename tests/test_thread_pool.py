@@ -0,0 +1,41 @@
+import threading
+
+import pytest
+
+from thread_pool import DaemonThreadPoolExecutor
+
+# --- Fixtures ---
+
+@pytest.fixture
+def pool():
+    """Provides a two-worker pool, shut down after the test."""
+    executor = DaemonThreadPoolExecutor(max_workers=2, thread_name_prefix="test-pool")
+    yield executor
+    executor.shutdown(wait=True)
+
+# --- Test Cases ---
+
+def test_submit_returns_results_and_exceptions(pool):
+    """Test futures carry the result or the exception of their call."""
+    assert pool.submit(pow, 2, 10).result(timeout=5) == 1024
+    with pytest.raises(ZeroDivisionError):
+        pool.submit(lambda: 1 / 0).result(timeout=5)
+
+def test_workers_are_daemon_threads_up_to_max_workers(pool):
+    """Test work runs on at most max_workers daemon threads."""
+    release = threading.Event()
+    futures = [pool.submit(lambda: (release.wait(5), threading.current_thread())[1]) for _ in range(4)]
+    release.set()
+    threads = {future.result(timeout=5) for future in futures}
+    assert 1 <= len(threads) <= 2
+    assert all(thread.daemon for thread in threads)
+
+def test_shutdown_waits_for_queued_work_and_refuses_more(pool):
+    """Test shutdown(wait=True) lets queued work finish, and later submits fail."""
+    done = []
+    for index in range(5):
+        pool.submit(done.append, index)
+    pool.shutdown(wait=True)
+    assert sorted(done) == list(range(5))
+    with pytest.raises(RuntimeError):
+        pool.submit(done.append, 5)
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+import queue
+import threading
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, List, Optional, Tuple
+
+_WorkItem = Tuple[Future, Callable[..., Any], tuple, dict]
+
+
+class DaemonThreadPoolExecutor(Executor):
+    """A thread pool whose workers are daemon threads.
+
+    concurrent.futures.ThreadPoolExecutor joins its workers when the
+    interpreter exits, so a one-shot plugin process that scheduled a
+    background refresh could not exit (and Flow Launcher would not see its
+    output) until that refresh finished. Here work still running or queued at
+    exit is simply dropped; it only ever warms caches.
+
+    Workers are started on demand, up to max_workers, like ThreadPoolExecutor.
+    """
+
+    def __init__(self, max_workers: int, thread_name_prefix: str = "daemon-pool"):
+        """Initialize the pool.
+
+        Args:
+            max_workers: Maximum number of worker threads.
+            thread_name_prefix: Prefix of the worker thread names.
+        """
+        if max_workers <= 0:
+            raise ValueError("max_workers must be greater than 0")
+        self.max_workers = max_workers
+        self.thread_name_prefix = thread_name_prefix
+        self._queue: "queue.SimpleQueue[Optional[_WorkItem]]" = queue.SimpleQueue()
+        self._idle = threading.Semaphore(0)
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._shutdown = False
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """Schedules fn(*args, **kwargs) and returns a Future for its result."""
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            future: Future = Future()
+            self._queue.put((future, fn, args, kwargs))
+            if not self._idle.acquire(blocking=False) and len(self._threads) < self.max_workers:
+                thread = threading.Thread(
+                    target=self._work, name=f"{self.thread_name_prefix}_{len(self._threads)}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+        return future
+
+    def _work(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.put(None)  # Wake up the next worker too
+                return
+            future, fn, args, kwargs = item
+            if future.set_running_or_notify_cancel():
+                try:
+                    result = fn(*args, **kwargs)
+                except BaseException as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+            del item, future
+            self._idle.release()
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        """Stops accepting work; with wait, returns once the queued work is done."""
+        with self._lock:
+            self._shutdown = True
+            if cancel_futures:
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is not None:
+                        item[0].cancel()
+            self._queue.put(None)
+            threads = list(self._threads)
+        if wait:
+            for thread in threads:
+                thread.join()